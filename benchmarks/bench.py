@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Headless NeatCore benchmarks (no Qt required).
+Usage:
+  python -m benchmarks.bench [--files 2000] [--repeat 3] [--output bench.json]
+  python -m benchmarks.bench --root D:\\Photos --keep        # benchmark a real tree
+  python -m benchmarks.bench --compare old.json new.json    # diff two result files
+Each case is timed ``--repeat`` times on a synthetic tree (see synth.py) and
+the results are written as JSON so runs from different commits can be diffed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.scanner import iter_dir, _hash_file
+from core.duplicates import group_by_exact_hash, group_by_perceptual_hash
+from core.analyze import Analyzer
+from core.compress import compress_files
+from core.recommend import recommend_for_record
+
+from .synth import add_tree_args, generate_tree, tree_kwargs
+
+SCHEMA = 1
+
+# name -> (setup, timed body); setup runs untimed and its result feeds the body,
+# the body returns the number of items processed
+CASES: Dict[str, Tuple[Callable[[List[Dict]], Any], Callable[[Any], int]]] = {}
+
+
+def case(name: str, setup: Optional[Callable[[List[Dict]], Any]] = None):
+    def deco(fn):
+        CASES[name] = (setup or (lambda records: records), fn)
+        return fn
+    return deco
+
+
+def _fresh(records: List[Dict]) -> List[Dict]:
+    # Drop cached hashes so every repetition does the full work
+    return [{k: v for k, v in r.items() if not k.startswith("hash_") and k != "phash"} for r in records]
+
+
+def _with_analyses(records: List[Dict]) -> List[Tuple[Dict, Dict]]:
+    analyzer = Analyzer(enable_ai=False)
+    return [(r, analyzer.analyze_record(r)) for r in records]
+
+
+@case("hash_file")
+def bench_hash_file(records: List[Dict]) -> int:
+    for r in records:
+        _hash_file(r["path"])
+    return len(records)
+
+
+@case("group_by_exact_hash", setup=_fresh)
+def bench_exact(records: List[Dict]) -> int:
+    group_by_exact_hash(records)
+    return len(records)
+
+
+@case("group_by_perceptual_hash", setup=lambda records: [r for r in _fresh(records) if r.get("kind") == "image"])
+def bench_perceptual(images: List[Dict]) -> int:
+    group_by_perceptual_hash(images)
+    return len(images)
+
+
+@case("analyze_record")
+def bench_analyze(records: List[Dict]) -> int:
+    analyzer = Analyzer(enable_ai=False)
+    for r in records:
+        analyzer.analyze_record(r)
+    return len(records)
+
+
+@case("recommend_for_record", setup=_with_analyses)
+def bench_recommend(pairs: List[Tuple[Dict, Dict]]) -> int:
+    for r, a in pairs:
+        recommend_for_record(r, a, dup_count=0)
+    return len(pairs)
+
+
+def _zip_target(records: List[Dict]) -> Tuple[List[Dict], str]:
+    return records, os.path.join(tempfile.mkdtemp(prefix="neatcore-bench-zip-"), "out.zip")
+
+
+@case("compress_files", setup=_zip_target)
+def bench_compress(ctx: Tuple[List[Dict], str]) -> int:
+    # Timed together with reading every member back (CRC check), so a broken archive fails the run
+    records, zip_path = ctx
+    try:
+        done = sum(len(ok) for ok, _ in compress_files([r["path"] for r in records], zip_path))
+        with zipfile.ZipFile(zip_path) as zf:
+            bad = zf.testzip()
+            if bad is not None or len(zf.infolist()) != done:
+                raise RuntimeError(f"compress_files wrote a broken archive (first bad member: {bad})")
+    finally:
+        shutil.rmtree(os.path.dirname(zip_path), ignore_errors=True)
+    return done
+
+
+def _summary(times: List[float], items: int) -> Dict:
+    best = min(times)
+    return {
+        "runs": len(times),
+        "items": items,
+        "min_s": best,
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "items_per_s": (items / best) if best > 0 else None,
+    }
+
+
+def run_case(name: str, records: List[Dict], repeat: int) -> Dict:
+    setup, fn = CASES[name]
+    times: List[float] = []
+    items = 0
+    for _ in range(repeat):
+        ctx = setup(records)
+        t0 = time.perf_counter()
+        items = fn(ctx)
+        times.append(time.perf_counter() - t0)
+    return _summary(times, items)
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=here, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(root: str, repeat: int = 3, only: Optional[List[str]] = None, manifest: Optional[Dict] = None) -> Dict:
+    results: Dict[str, Dict] = {}
+
+    # Scanning is measured on its own and also provides records for the other cases
+    times = []
+    records: List[Dict] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        records = list(iter_dir(root))
+        times.append(time.perf_counter() - t0)
+    if not only or "iter_dir" in only:
+        results["iter_dir"] = _summary(times, len(records))
+    for name in CASES:
+        if only and name not in only:
+            continue
+        results[name] = run_case(name, records, repeat)
+
+    total_bytes = sum(r.get("size", 0) for r in records)
+    if "hash_file" in results and results["hash_file"]["min_s"] > 0:
+        results["hash_file"]["bytes_per_s"] = total_bytes / results["hash_file"]["min_s"]
+
+    return {
+        "schema": SCHEMA,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "tree": {k: v for k, v in (manifest or {"root": root}).items() if k != "near_duplicate_sets"},
+        "files": len(records),
+        "bytes": total_bytes,
+        "results": results,
+    }
+
+
+def compare(old: Dict, new: Dict) -> List[str]:
+    lines = [f"{'case':<28}{'old (s)':>12}{'new (s)':>12}{'change':>10}"]
+    for name, nres in new.get("results", {}).items():
+        ores = old.get("results", {}).get(name)
+        if not ores:
+            lines.append(f"{name:<28}{'-':>12}{nres['min_s']:>12.4f}{'new':>10}")
+            continue
+        delta = (nres["min_s"] - ores["min_s"]) / ores["min_s"] * 100 if ores["min_s"] else 0.0
+        lines.append(f"{name:<28}{ores['min_s']:>12.4f}{nres['min_s']:>12.4f}{delta:>+9.1f}%")
+    return lines
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark NeatCore core stages without Qt")
+    ap.add_argument("--root", help="Benchmark an existing folder instead of a synthetic tree")
+    ap.add_argument("--keep", action="store_true", help="Keep the generated synthetic tree")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="*", help="Subset of cases to run")
+    ap.add_argument("--output", "-o", help="Write JSON results to this file (default: stdout)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    add_tree_args(ap)
+    args = ap.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        print("\n".join(compare(old, new)))
+        return
+
+    tmp = None
+    manifest = None
+    root = args.root
+    if not root:
+        tmp = tempfile.mkdtemp(prefix="neatcore-bench-")
+        root = os.path.join(tmp, "tree")
+        manifest = generate_tree(root, **tree_kwargs(args))
+    try:
+        report = run(root, repeat=args.repeat, only=args.only, manifest=manifest)
+    finally:
+        if tmp and not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""In-process latency injection for exercising the network code paths locally.
+
+``inject_latency(root, ...)`` patches ``os.stat``, ``os.scandir`` and
+``open`` so every listing, stat and read under ``root`` sleeps first, the
+way a round trip to an SMB/NFS server would. Sleeping releases the GIL, so
+concurrent operations overlap just as they do against a real share. Paths
+outside ``root`` are untouched.
+
+    with inject_latency(tree, stat_ms=2, list_ms=5, read_ms=3):
+        records = list(iter_dir_adaptive(tree))
+
+``inject_seeks(positions, ...)`` models a spinning disk instead: reads of
+the given files sleep for a seek (settle time plus a square-root stroke
+curve, and half a rotation) whenever they do not continue where the head
+stopped, then for the transfer at the media rate.
+"""
+from __future__ import annotations
+
+import builtins
+import contextlib
+import os
+import time
+from typing import Dict, Iterator
+
+
+class _Entry:
+    """``os.DirEntry`` stand-in whose ``stat()`` pays the stat latency."""
+
+    def __init__(self, entry: os.DirEntry, delay: float) -> None:
+        self._entry = entry
+        self._delay = delay
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def inode(self) -> int:
+        return self._entry.inode()
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        time.sleep(self._delay)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __fspath__(self) -> str:
+        return self.path
+
+
+class _Scandir:
+    def __init__(self, it, delay: float) -> None:
+        self._it = it
+        self._delay = delay
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> _Entry:
+        return _Entry(next(self._it), self._delay)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._it.close()
+
+
+class _SlowFile:
+    """Wraps a binary file object; each ``read``/``readinto`` pays the read latency."""
+
+    def __init__(self, f, delay: float) -> None:
+        self._f = f
+        self._delay = delay
+
+    def read(self, *args):
+        time.sleep(self._delay)
+        return self._f.read(*args)
+
+    def readinto(self, b):
+        time.sleep(self._delay)
+        return self._f.readinto(b)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._f.close()
+
+
+@contextlib.contextmanager
+def inject_latency(root: str, stat_ms: float = 2.0, list_ms: float = 5.0, read_ms: float = 3.0) -> Iterator[None]:
+    """Add per-operation latency to everything under ``root`` while active."""
+    prefix = os.path.abspath(root)
+    stat_d, list_d, read_d = stat_ms / 1000.0, list_ms / 1000.0, read_ms / 1000.0
+    real_stat, real_scandir, real_open = os.stat, os.scandir, builtins.open
+
+    def under(path) -> bool:
+        if isinstance(path, int):
+            return False
+        try:
+            p = os.path.abspath(os.fsdecode(os.fspath(path)))
+        except TypeError:
+            return False
+        return p == prefix or p.startswith(prefix + os.sep)
+
+    def slow_stat(path, *args, **kwargs):
+        if under(path):
+            time.sleep(stat_d)
+        return real_stat(path, *args, **kwargs)
+
+    def slow_scandir(path="."):
+        it = real_scandir(path)
+        if not under(path):
+            return it
+        time.sleep(list_d)
+        return _Scandir(it, stat_d)
+
+    def slow_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if "b" in mode and "r" in mode and under(file):
+            time.sleep(stat_d)  # the open itself is a round trip too
+            return _SlowFile(f, read_d)
+        return f
+
+    os.stat, os.scandir, builtins.open = slow_stat, slow_scandir, slow_open
+    try:
+        yield
+    finally:
+        os.stat, os.scandir, builtins.open = real_stat, real_scandir, real_open
+
+
+class _SeekFile:
+    """Wraps a binary file at ``base`` on the modelled disk; reads move the head."""
+
+    def __init__(self, f, base: int, disk: "_Disk") -> None:
+        self._f = f
+        self._base = base
+        self._disk = disk
+
+    def read(self, *args):
+        pos = self._base + self._f.tell()
+        data = self._f.read(*args)
+        self._disk.access(pos, len(data))
+        return data
+
+    def readinto(self, b):
+        pos = self._base + self._f.tell()
+        n = self._f.readinto(b)
+        self._disk.access(pos, n or 0)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._f.close()
+
+
+class _Disk:
+    def __init__(self, span: int, seek_ms: float, settle_ms: float, rpm: int, mb_s: float) -> None:
+        self.span = max(1, span)
+        self.seek_s, self.settle_s = seek_ms / 1000.0, settle_ms / 1000.0
+        self.rotation_s = 30.0 / rpm  # half a revolution on average
+        self.rate = mb_s * 1024 * 1024
+        self.head = 0
+        self.seeks = 0
+        self.seek_bytes = 0
+        self.bytes = 0
+
+    def access(self, pos: int, n: int) -> None:
+        delay = n / self.rate
+        dist = abs(pos - self.head)
+        if dist:
+            self.seeks += 1
+            self.seek_bytes += dist
+            delay += self.settle_s + (self.seek_s - self.settle_s) * min(1.0, dist / self.span) ** 0.5
+            delay += self.rotation_s
+        time.sleep(delay)
+        self.head = pos + n
+        self.bytes += n
+
+
+@contextlib.contextmanager
+def inject_seeks(positions: Dict[str, int], seek_ms: float = 12.0, settle_ms: float = 1.0, rpm: int = 7200,
+                 mb_s: float = 150.0) -> Iterator[Dict[str, int]]:
+    """Model a hard disk holding the files of ``positions`` (path -> byte offset
+    of the file on the disk) while active. ``seek_ms`` is a full-stroke seek
+    across the span of the given offsets. Yields counters (``seeks``,
+    ``seek_bytes``, ``bytes``), filled in on exit."""
+    bases = {os.path.abspath(p): pos for p, pos in positions.items()}
+    disk = _Disk(max(bases.values(), default=0) - min(bases.values(), default=0),
+                 seek_ms, settle_ms, rpm, mb_s)
+    real_open = builtins.open
+    stats: Dict[str, int] = {}
+
+    def disk_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if "b" in mode and "r" in mode and not isinstance(file, int):
+            base = bases.get(os.path.abspath(os.fsdecode(os.fspath(file))))
+            if base is not None:
+                return _SeekFile(f, base, disk)
+        return f
+
+    builtins.open = disk_open
+    try:
+        yield stats
+    finally:
+        builtins.open = real_open
+        stats.update(seeks=disk.seeks, seek_bytes=disk.seek_bytes, bytes=disk.bytes)
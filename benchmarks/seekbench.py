@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Scan order vs on-disk order for exact-duplicate hashing on a modelled hard disk.
+Usage:
+  python -m benchmarks.seekbench [--files 800] [--seek-ms 12] [--rpm 7200] [--mb-s 150]
+Generates a synthetic tree (see synth.py) with many exact copies, then times
+``group_by_exact_hash`` with ``order="scan"`` and ``order="locality"`` while
+latency_fs.inject_seeks models a spinning disk. Each file sits at its real
+first-extent offset where FIEMAP reports one; otherwise files are laid out
+back to back in inode order. Both runs read the same bytes, so the
+difference is seek time.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from core.duplicates import group_by_exact_hash
+from core.locality import physical_key
+from core.scanner import iter_dir
+from core.telemetry import Telemetry
+
+from .latency_fs import inject_seeks
+from .synth import add_tree_args, generate_tree, tree_kwargs
+
+
+def _layout(records: List[Dict]) -> Dict[str, int]:
+    keys = sorted(physical_key(r["path"]) + (r["size"],) for r in records)
+    if all(k[1] == 0 for k in keys):
+        return {k[3]: k[2] for k in keys}
+    positions, offset = {}, 0
+    for k in keys:
+        positions[k[3]] = offset
+        offset += k[4]
+    return positions
+
+
+def _run(records: List[Dict], positions: Dict[str, int], order: str, args: argparse.Namespace) -> Dict:
+    recs = [{k: v for k, v in r.items() if not k.startswith("hash_")} for r in records]
+    telemetry = Telemetry()
+    with inject_seeks(positions, seek_ms=args.seek_ms, settle_ms=args.settle_ms, rpm=args.rpm,
+                      mb_s=args.mb_s) as disk:
+        t0 = time.perf_counter()
+        groups = group_by_exact_hash(recs, telemetry=telemetry, order=order)
+        seconds = time.perf_counter() - t0
+    stages = telemetry.snapshot()["stages"]
+    return {
+        "order": order,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(disk["bytes"] / 1024 / 1024 / seconds, 1) if seconds else None,
+        "files_hashed": stages.get("hash", {}).get("items", 0),
+        "seeks": disk["seeks"],
+        "seek_distance_mb": round(disk["seek_bytes"] / 1024 / 1024, 1),
+        "locality_s": round(stages.get("locality", {}).get("seconds", 0.0), 4),
+        "groups": sorted(sorted(r["path"] for r in g) for g in groups),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark on-disk-ordered hashing against a hard disk model")
+    ap.add_argument("--seek-ms", type=float, default=12.0, help="Full-stroke seek time")
+    ap.add_argument("--settle-ms", type=float, default=1.0, help="Track-to-track seek time")
+    ap.add_argument("--rpm", type=int, default=7200)
+    ap.add_argument("--mb-s", type=float, default=150.0, help="Sequential transfer rate")
+    ap.add_argument("--output", "-o", help="Write JSON results to this file (default: stdout)")
+    add_tree_args(ap)
+    ap.set_defaults(files=800, max_size=1024 * 1024, dup_ratio=0.3, near_dup_sets=0, image_ratio=0.0)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="neatcore-seekbench-")
+    root = os.path.join(tmp, "tree")
+    try:
+        manifest = generate_tree(root, **tree_kwargs(args))
+        records = list(iter_dir(root))
+        positions = _layout(records)
+        scan = _run(records, positions, "scan", args)
+        locality = _run(records, positions, "locality", args)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    same = scan.pop("groups") == locality.pop("groups")
+    report = {
+        "tree": {k: v for k, v in manifest.items() if k != "near_duplicate_sets"},
+        "disk": {"seek_ms": args.seek_ms, "settle_ms": args.settle_ms, "rpm": args.rpm, "mb_s": args.mb_s},
+        "scan": scan,
+        "locality": locality,
+        "speedup": scan["seconds"] / locality["seconds"] if locality["seconds"] else None,
+        "same_groups": same,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
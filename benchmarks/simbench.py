@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Precision / recall of perceptual duplicate matching on a labelled set.
+Usage:
+  python -m benchmarks.simbench [--files 600] [--near-dup-sets 60] [--threshold 5] [--color]
+Generates a synthetic tree (see synth.py) whose near-duplicate image sets are
+known, then runs ``group_by_perceptual_hash`` with the per-image pHash
+method and with the cascade (core/imagesim.py). Every pair of images placed
+in one group counts as a predicted pair. True pairs are the generated
+near-duplicate sets plus byte-identical copies of an image.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Set, Tuple
+
+from core.duplicates import group_by_perceptual_hash
+from core.scanner import iter_dir
+
+from .synth import add_tree_args, generate_tree, tree_kwargs
+
+Pair = Tuple[str, str]
+
+
+def _pairs(groups: List[List[str]]) -> Set[Pair]:
+    return {tuple(sorted(p)) for g in groups for p in itertools.combinations(g, 2)}
+
+
+def _truth(root: str, manifest: Dict, images: List[Dict]) -> Set[Pair]:
+    sets = [[os.path.join(root, p) for p in g] for g in manifest["near_duplicate_sets"]]
+    by_digest: Dict[str, List[str]] = {}
+    for r in images:
+        with open(r["path"], "rb") as f:
+            by_digest.setdefault(hashlib.md5(f.read()).hexdigest(), []).append(r["path"])
+    return _pairs(sets + [g for g in by_digest.values() if len(g) > 1])
+
+
+def _score(name: str, images: List[Dict], truth: Set[Pair], **kwargs) -> Dict:
+    recs = [{k: v for k, v in r.items() if k != "phash"} for r in images]
+    t0 = time.perf_counter()
+    groups = group_by_perceptual_hash(recs, **kwargs)
+    seconds = time.perf_counter() - t0
+    predicted = _pairs([[r["path"] for r in g] for g in groups])
+    tp = len(predicted & truth)
+    return {
+        "method": name,
+        "seconds": round(seconds, 3),
+        "images_per_s": round(len(recs) / seconds, 1) if seconds else None,
+        "groups": len(groups),
+        "predicted_pairs": len(predicted),
+        "true_positives": tp,
+        "precision": round(tp / len(predicted), 4) if predicted else None,
+        "recall": round(tp / len(truth), 4) if truth else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precision/recall of pHash vs cascaded perceptual matching")
+    ap.add_argument("--threshold", type=int, default=5, help="pHash bits allowed to differ")
+    ap.add_argument("--color", action="store_true", help="Also confirm cascade pairs by colour histogram")
+    ap.add_argument("--output", "-o", help="Write JSON results to this file (default: stdout)")
+    add_tree_args(ap)
+    ap.set_defaults(files=600, near_dup_sets=60, near_dup_size=3, image_ratio=0.9, dup_ratio=0.05,
+                    max_size=64 * 1024)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="neatcore-simbench-")
+    root = os.path.join(tmp, "tree")
+    try:
+        manifest = generate_tree(root, **tree_kwargs(args))
+        images = [r for r in iter_dir(root) if r.get("kind") == "image"]
+        truth = _truth(root, manifest, images)
+        results = [
+            _score("phash", images, truth, threshold=args.threshold, method="phash"),
+            _score("cascade", images, truth, threshold=args.threshold, method="cascade", use_color=args.color),
+        ]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "images": len(images),
+        "true_pairs": len(truth),
+        "threshold": args.threshold,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
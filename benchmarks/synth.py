@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Generate reproducible synthetic file trees for benchmarking.
+Usage:
+  python -m benchmarks.synth OUT_DIR [--files 2000] [--depth 3] [--seed 0]
+The same parameters and seed always produce the same names, sizes, contents
+and mtimes, so timings from different commits are comparable.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from PIL import Image, ImageEnhance, ImageFilter
+
+SIZE_DISTS = ("lognormal", "uniform", "small", "large")
+DOC_EXTS = [".txt", ".md", ".pdf", ".docx"]
+MEDIA_EXTS = [".mp4", ".mp3", ".zip", ".bin", ".log"]
+DAY = 86400.0
+
+
+def _draw_size(rng: random.Random, dist: str, max_size: int) -> int:
+    if dist == "uniform":
+        size = rng.randint(1, max_size)
+    elif dist == "small":
+        size = rng.randint(1, 16 * 1024)
+    elif dist == "large":
+        size = rng.randint(max_size // 2, max_size)
+    else:
+        # Most files small, a long tail of big ones (typical user folders)
+        size = int(rng.lognormvariate(10.0, 1.6))
+    return max(1, min(size, max_size))
+
+
+def _make_dirs(rng: random.Random, root: str, depth: int, fanout: int) -> List[str]:
+    dirs = [root]
+    frontier = [root]
+    for level in range(depth):
+        nxt: List[str] = []
+        for d in frontier:
+            for i in range(rng.randint(1, fanout)):
+                name = "Downloads" if (level == 0 and i == 0) else f"dir_{level}_{i}"
+                sub = os.path.join(d, name)
+                os.makedirs(sub, exist_ok=True)
+                nxt.append(sub)
+        dirs.extend(nxt)
+        frontier = nxt
+    return dirs
+
+
+def _base_image(rng: random.Random, w: int, h: int) -> Image.Image:
+    # Smooth gradient plus a few blocks: cheap to build, distinct pHash per seed
+    img = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    for _ in range(6):
+        x0, y0 = rng.randrange(w), rng.randrange(h)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        img.paste(color, (x0, y0, min(w, x0 + w // 4), min(h, y0 + h // 4)))
+    return img
+
+
+def _variant(rng: random.Random, img: Image.Image) -> Image.Image:
+    # Near-duplicate: small brightness shift, slight blur or rescale
+    choice = rng.randrange(3)
+    if choice == 0:
+        return ImageEnhance.Brightness(img).enhance(1.0 + rng.uniform(-0.08, 0.08))
+    if choice == 1:
+        return img.filter(ImageFilter.GaussianBlur(radius=0.6))
+    w, h = img.size
+    return img.resize((int(w * 0.9), int(h * 0.9))).resize((w, h))
+
+
+def generate_tree(root: str,
+                  files: int = 2000,
+                  depth: int = 3,
+                  fanout: int = 4,
+                  size_dist: str = "lognormal",
+                  max_size: int = 8 * 1024 * 1024,
+                  dup_ratio: float = 0.1,
+                  image_ratio: float = 0.2,
+                  near_dup_sets: int = 20,
+                  near_dup_size: int = 3,
+                  image_size: int = 256,
+                  seed: int = 0) -> Dict:
+    """Create a synthetic tree under ``root`` and return its manifest."""
+    if size_dist not in SIZE_DISTS:
+        raise ValueError(f"unknown size distribution: {size_dist}")
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    dirs = _make_dirs(rng, root, depth, fanout)
+    now = time.time()
+    written: List[str] = []
+    total_bytes = 0
+
+    def place(name: str) -> str:
+        path = os.path.join(rng.choice(dirs), name)
+        written.append(path)
+        return path
+
+    def touch(path: str) -> None:
+        age = rng.uniform(0, 400) * DAY
+        os.utime(path, (now - age, now - age))
+
+    # Near-duplicate image sets
+    near_sets: List[List[str]] = []
+    for s in range(near_dup_sets):
+        base = _base_image(rng, image_size, image_size)
+        group = []
+        for v in range(near_dup_size):
+            img = base if v == 0 else _variant(rng, base)
+            path = place(f"IMG_{s:04d}_{v}.jpg")
+            img.save(path, "JPEG", quality=90 - v * 5)
+            total_bytes += os.path.getsize(path)
+            touch(path)
+            group.append(path)
+        near_sets.append(group)
+
+    remaining = max(0, files - near_dup_sets * near_dup_size)
+    n_images = int(remaining * image_ratio)
+    originals: List[str] = []
+    dup_count = 0
+    for i in range(remaining):
+        if originals and rng.random() < dup_ratio:
+            # Exact duplicate of an earlier file, under a new name
+            src = rng.choice(originals)
+            ext = os.path.splitext(src)[1]
+            path = place(f"copy_{i:06d}{ext}")
+            with open(src, "rb") as fi, open(path, "wb") as fo:
+                fo.write(fi.read())
+            dup_count += 1
+        elif i < n_images:
+            prefix = "Screenshot" if rng.random() < 0.25 else "photo"
+            path = place(f"{prefix}_{i:06d}.png")
+            side = rng.choice([image_size // 2, image_size, image_size * 2])
+            _base_image(rng, side, side).save(path, "PNG")
+            originals.append(path)
+        else:
+            ext = rng.choice(DOC_EXTS + MEDIA_EXTS)
+            path = place(f"file_{i:06d}{ext}")
+            size = _draw_size(rng, size_dist, max_size)
+            with open(path, "wb") as fo:
+                fo.write(rng.randbytes(size))
+            originals.append(path)
+        total_bytes += os.path.getsize(path)
+        touch(path)
+
+    return {
+        "root": root,
+        "seed": seed,
+        "files": len(written),
+        "dirs": len(dirs),
+        "bytes": total_bytes,
+        "exact_duplicates": dup_count,
+        "near_duplicate_sets": [[os.path.relpath(p, root) for p in g] for g in near_sets],
+        "params": {
+            "files": files, "depth": depth, "fanout": fanout, "size_dist": size_dist,
+            "max_size": max_size, "dup_ratio": dup_ratio, "image_ratio": image_ratio,
+            "near_dup_sets": near_dup_sets, "near_dup_size": near_dup_size,
+            "image_size": image_size,
+        },
+    }
+
+
+def add_tree_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--fanout", type=int, default=4)
+    ap.add_argument("--size-dist", choices=SIZE_DISTS, default="lognormal")
+    ap.add_argument("--max-size", type=int, default=8 * 1024 * 1024)
+    ap.add_argument("--dup-ratio", type=float, default=0.1)
+    ap.add_argument("--image-ratio", type=float, default=0.2)
+    ap.add_argument("--near-dup-sets", type=int, default=20)
+    ap.add_argument("--near-dup-size", type=int, default=3)
+    ap.add_argument("--image-size", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def tree_kwargs(args: argparse.Namespace) -> Dict:
+    return {
+        "files": args.files, "depth": args.depth, "fanout": args.fanout,
+        "size_dist": args.size_dist, "max_size": args.max_size,
+        "dup_ratio": args.dup_ratio, "image_ratio": args.image_ratio,
+        "near_dup_sets": args.near_dup_sets, "near_dup_size": args.near_dup_size,
+        "image_size": args.image_size, "seed": args.seed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic NeatCore benchmark tree")
+    ap.add_argument("out")
+    add_tree_args(ap)
+    args = ap.parse_args()
+    manifest = generate_tree(args.out, **tree_kwargs(args))
+    print(json.dumps({k: v for k, v in manifest.items() if k != "near_duplicate_sets"}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
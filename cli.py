@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""Headless NeatCore engine: scan, dedupe, analyze and recommend without Qt.
+Usage:
+  python cli.py PATH [PATH ...] [--duplicates] [--perceptual [--similarity phash|cascade]] [--documents] [--ai] [--no-fast]
+                [--confidence full|sampled|verify] [--keep resolution,sharpness,age,path] [--sniff]
+                [--network auto|on|off]
+                [--max-memory MB [--spill-dir DIR]]
+                [--format ndjson|summary] [--output FILE] [--scan-only]
+NDJSON output is one JSON object per line, written as results are produced:
+  {"type": "record", ...}           scan-only mode, one per file
+  {"type": "result", ...}           analysis + recommendation, one per file
+  {"type": "duplicate_group", ...}  one per exact/probable/perceptual/document group
+  {"type": "cluster", ...}          groups joined transitively, with the kept file
+  {"type": "folder_group", ...}     one per set of identical/similar folders (--duplicates)
+  {"type": "summary", ...}          always last
+Exit codes: 0 success, 1 unexpected error, 2 bad arguments/paths,
+3 finished but some paths could not be read, 130 interrupted.
+Without --duplicates/--perceptual/--documents the run is fully streaming (constant memory);
+duplicate detection keeps one lightweight record per file until grouping ends,
+unless --max-memory is given: then records spill to a temporary SQLite store
+and exact grouping runs as external sorts there (see core/spill.py);
+clusters then come in store order rather than largest first.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+from core.scanner import iter_dir, FAST_EXCLUDE_DIR_NAMES
+from core.analyze import Analyzer
+from core.memo import AnalysisCache
+from core.docsim import SignatureCache, group_similar_documents
+from core.dupgraph import DEFAULT_RANKING, KEEPER_RANKINGS, SIMILAR_KINDS
+from core.duplicates import build_dup_map, group_by_perceptual_hash, CONFIDENCE_LEVELS, PERCEPTUAL_METHODS
+from core.dirdups import find_duplicate_folders
+from core.spill import SpillStore
+from core.recommend import recommend_for_record
+from core.sniff import Sniffer
+from core.netio import detect_remote, iter_dir_adaptive
+from core.telemetry import Telemetry, maybe_timed
+from core.utils import human_size
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_INTERRUPTED = 130
+
+
+class Emitter:
+    """Writes NDJSON lines (or nothing, in summary mode) and keeps totals."""
+
+    def __init__(self, fh: IO[str], ndjson: bool, flush_every: int = 200) -> None:
+        self.fh = fh
+        self.ndjson = ndjson
+        self.flush_every = flush_every
+        self._pending = 0
+        self.files = 0
+        self.bytes = 0
+        self.actions: Dict[str, int] = {}
+        self.action_bytes: Dict[str, int] = {}
+        self.groups = 0
+        self.reclaimable = 0
+        # Folder groups overlap the file groups: counted apart, never added to ``reclaimable``
+        self.folder_groups = 0
+        self.folder_reclaimable = 0
+
+    def emit(self, obj: Dict) -> None:
+        if not self.ndjson:
+            return
+        self.fh.write(json.dumps(obj, ensure_ascii=False, default=str))
+        self.fh.write("\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.fh.flush()
+            self._pending = 0
+
+    def count(self, rec: Dict, action: Optional[str] = None) -> None:
+        self.files += 1
+        size = rec.get("size", 0)
+        self.bytes += size
+        if action:
+            self.actions[action] = self.actions.get(action, 0) + 1
+            self.action_bytes[action] = self.action_bytes.get(action, 0) + size
+
+
+def _records(base: str, exclude: List[str], telemetry: Telemetry, network: str) -> Iterator[Dict]:
+    remote, latency = detect_remote(base) if network == "auto" else (network == "on", 0.0)
+    if remote:
+        telemetry.meta.setdefault("remote_roots", {})[base] = round(latency * 1000, 2)
+        return iter_dir_adaptive(base, exclude_dir_names=exclude, telemetry=telemetry)
+    return iter_dir(base, exclude_dir_names=exclude, telemetry=telemetry)
+
+
+def _scan(paths: List[str], fast: bool, telemetry: Telemetry, progress: bool,
+          sniffer: Optional[Sniffer] = None, network: str = "auto") -> Iterator[Dict]:
+    exclude = FAST_EXCLUDE_DIR_NAMES if fast else []
+    seen = 0
+    batch: List[Dict] = []
+    for base in paths:
+        for rec in _records(base, exclude, telemetry, network):
+            seen += 1
+            if progress and seen % 5000 == 0:
+                print(f"scanned {seen} files…", file=sys.stderr)
+            if sniffer is None:
+                yield rec
+                continue
+            # Sniff in batches so the reads overlap
+            batch.append(rec)
+            if len(batch) >= 100:
+                sniffer.sniff_batch(batch)
+                yield from batch
+                batch = []
+    if batch:
+        sniffer.sniff_batch(batch)
+        yield from batch
+
+
+def _result(rec: Dict, analysis: Dict, reco: Dict, dup_count: int, dup_probable: bool, dup_keeper: bool) -> Dict:
+    return {
+        "type": "result",
+        "path": rec["path"],
+        "kind": rec.get("kind"),
+        "size": rec.get("size", 0),
+        "mtime": rec.get("mtime"),
+        "label": analysis.get("label"),
+        "confidence": round(float(analysis.get("confidence", 0.0)), 4),
+        "quality": analysis.get("quality") or {},
+        "dup_count": dup_count,
+        "dup_probable": dup_probable,
+        "dup_keeper": dup_keeper,
+        "action": reco.get("primary_action"),
+        "reasons": reco.get("reasons", []),
+        "score": reco.get("score", 0),
+    }
+
+
+def _emit_group(out: Emitter, kind: str, grp: List[Dict]) -> None:
+    sizes = [r.get("size", 0) for r in grp]
+    # Similar images and documents are not byte copies: nothing is reclaimable for sure
+    exact = kind not in SIMILAR_KINDS
+    reclaim = sum(sizes) - max(sizes) if exact else 0
+    out.groups += 1
+    out.reclaimable += reclaim
+    out.emit({"type": "duplicate_group", "kind": kind, "paths": [r["path"] for r in grp],
+              "size": sizes[0] if exact else None, "reclaimable": reclaim})
+
+
+def _emit_cluster(out: Emitter, c: Dict) -> None:
+    out.emit({"type": "cluster", "id": c["id"], "keeper": c["keeper"], "kinds": c["kinds"],
+              "paths": [r["path"] for r in c["members"]]})
+
+
+def _analyze_and_emit(args: argparse.Namespace, out: Emitter, telemetry: Telemetry,
+                      rows: Iterator[Tuple[Dict, int, bool, bool]]) -> None:
+    cache = AnalysisCache() if args.cache else None
+    analyzer = Analyzer(enable_ai=args.ai, telemetry=telemetry, cache=cache)
+    try:
+        for rec, dup_count, dup_probable, dup_keeper in rows:
+            with maybe_timed(telemetry, "analyze"):
+                analysis = analyzer.analyze_record(rec)
+            with maybe_timed(telemetry, "recommend"):
+                reco = recommend_for_record(rec, analysis, dup_count=dup_count, dup_probable=dup_probable,
+                                            dup_keeper=dup_keeper)
+            out.count(rec, reco.get("primary_action"))
+            out.emit(_result(rec, analysis, reco, dup_count, dup_probable, dup_keeper))
+    finally:
+        if cache is not None:
+            cache.close()
+            telemetry.meta["analysis_cache"] = dict(cache.hits)
+
+
+def run_bounded(args: argparse.Namespace, records: Iterator[Dict], out: Emitter, telemetry: Telemetry) -> None:
+    """Duplicates and analysis within ``--max-memory``: records live in a spill store, not a list.
+    Perceptual and document grouping still hold the image or document records; folder groups are not computed."""
+    with SpillStore(memory_mb=args.max_memory, directory=args.spill_dir) as store:
+        store.add_many(records)
+        telemetry.meta["spill"] = {"files": len(store), "memory_mb": store.memory_mb}
+        if args.duplicates:
+            for kind, grp in store.group_exact(confidence=args.confidence, telemetry=telemetry):
+                _emit_group(out, kind, grp)
+        if args.perceptual:
+            images = list(store.records(kind="image"))
+            if args.fast and len(images) > 3000:
+                images = images[::2][:3000]
+            ids = {id(rec): rid for rid, rec in images}
+            for grp in group_by_perceptual_hash([rec for _, rec in images], threshold=4 if args.fast else 5,
+                                                telemetry=telemetry, method=args.similarity):
+                store.link([ids[id(r)] for r in grp], "perceptual")
+                _emit_group(out, "perceptual", grp)
+            del images, ids
+        if args.documents:
+            docs = list(store.records(kind="document"))
+            ids = {id(rec): rid for rid, rec in docs}
+            for grp in group_similar_documents([rec for _, rec in docs], cache=SignatureCache(), telemetry=telemetry):
+                store.link([ids[id(r)] for r in grp], "document")
+                _emit_group(out, "document", grp)
+            del docs, ids
+        for c in store.clusters(ranking=args.keep, telemetry=telemetry):
+            _emit_cluster(out, c)
+        _analyze_and_emit(args, out, telemetry, store.iter_records())
+
+
+def run(args: argparse.Namespace, out: Emitter, telemetry: Telemetry,
+        sniffer: Optional[Sniffer] = None) -> None:
+    records = _scan(args.paths, args.fast, telemetry, args.progress, sniffer, args.network)
+
+    if args.scan_only:
+        for rec in records:
+            out.count(rec)
+            out.emit(dict(type="record", **rec))
+        return
+    grouping = args.duplicates or args.perceptual or args.documents
+    if args.max_memory and grouping:
+        run_bounded(args, records, out, telemetry)
+        return
+
+    dup_map: Dict[str, int] = {}
+    probable: set = set()
+    keepers: set = set()
+    if grouping:
+        # Grouping needs every candidate; keep records, but nothing else, until it ends
+        recs = list(records)
+        groups: List[Tuple[str, List[Dict]]] = []
+        clusters: List[Dict] = []
+        dup_map = build_dup_map(recs, use_exact=args.duplicates, use_perceptual=args.perceptual,
+                                fast_mode=args.fast, telemetry=telemetry, groups_out=groups,
+                                confidence=args.confidence, probable=probable, perceptual_method=args.similarity,
+                                use_documents=args.documents, doc_cache=SignatureCache() if args.documents else None,
+                                keepers=keepers, clusters_out=clusters, keeper_ranking=args.keep)
+        for kind, grp in groups:
+            _emit_group(out, kind, grp)
+        for c in clusters:
+            _emit_cluster(out, c)
+        if args.duplicates:
+            with maybe_timed(telemetry, "folders"):
+                folder_groups = find_duplicate_folders(recs, args.paths)
+            for g in folder_groups:
+                out.folder_groups += 1
+                out.folder_reclaimable += g["reclaimable"]
+                out.emit(dict(type="folder_group", **g))
+        records = iter(recs)
+
+    _analyze_and_emit(args, out, telemetry,
+                      ((rec, dup_map.get(rec["path"], 0), rec["path"] in probable, rec["path"] in keepers)
+                       for rec in records))
+
+
+def _summary(out: Emitter, telemetry: Telemetry, missing: List[str], sniffer: Optional[Sniffer]) -> Dict:
+    snap = telemetry.snapshot()
+    summary = {
+        "type": "summary",
+        "files": out.files,
+        "bytes": out.bytes,
+        "actions": out.actions,
+        "action_bytes": out.action_bytes,
+        "duplicate_groups": out.groups,
+        "reclaimable_bytes": out.reclaimable,
+        "folder_groups": out.folder_groups,
+        "folder_reclaimable_bytes": out.folder_reclaimable,
+        "missing_paths": missing,
+        "elapsed_s": round(snap["elapsed_s"], 3),
+    }
+    if sniffer is not None:
+        summary["sniff"] = {k: v for k, v in sniffer.stats.items() if k != "seconds"}
+    return summary
+
+
+def _print_summary(summary: Dict, fh: IO[str]) -> None:
+    print(f"Files:      {summary['files']} ({human_size(summary['bytes'])})", file=fh)
+    for action, n in sorted(summary["actions"].items()):
+        print(f"  {action:<18}{n:>8}  {human_size(summary['action_bytes'].get(action, 0))}", file=fh)
+    if summary["duplicate_groups"]:
+        print(f"Duplicate groups: {summary['duplicate_groups']} "
+              f"(reclaimable {human_size(summary['reclaimable_bytes'])})", file=fh)
+    if summary["folder_groups"]:
+        print(f"Duplicate folders: {summary['folder_groups']} groups "
+              f"(reclaimable {human_size(summary['folder_reclaimable_bytes'])})", file=fh)
+    if summary.get("sniff", {}).get("reclassified"):
+        print(f"Reclassified by content: {summary['sniff']['reclassified']}", file=fh)
+    for p in summary["missing_paths"]:
+        print(f"Not found: {p}", file=fh)
+    print(f"Elapsed:    {summary['elapsed_s']:.2f} s", file=fh)
+
+
+def _ranking(text: str) -> Tuple[str, ...]:
+    names = tuple(n.strip() for n in text.split(",") if n.strip())
+    bad = [n for n in names if n not in KEEPER_RANKINGS]
+    if bad or not names:
+        raise argparse.ArgumentTypeError(f"expected a list of {', '.join(KEEPER_RANKINGS)}")
+    return names
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="neatcore", description="Headless NeatCore scan/analyze engine")
+    ap.add_argument("paths", nargs="+", help="Folders to scan")
+    ap.add_argument("--duplicates", action="store_true", help="Find exact duplicates (MD5)")
+    ap.add_argument("--perceptual", action="store_true", help="Find similar images (pHash)")
+    ap.add_argument("--similarity", choices=PERCEPTUAL_METHODS, default="cascade",
+                    help="Similar-image matching: cascaded small-decode hashes (default) or full-decode pHash")
+    ap.add_argument("--documents", action="store_true",
+                    help="Find near-duplicate documents by text (txt, md, rtf, docx, xlsx, pptx; pdf with pypdf)")
+    ap.add_argument("--keep", type=_ranking, default=DEFAULT_RANKING, metavar="RANKING",
+                    help="Which file of a duplicate cluster to keep: comma-separated criteria from "
+                         f"{', '.join(KEEPER_RANKINGS)}, most important first (default: %(default)s)")
+    ap.add_argument("--confidence", choices=CONFIDENCE_LEVELS, default="full",
+                    help="Large files (>= 256 MB): full hash, sampled blocks only (probable), "
+                         "or sampled then verified")
+    ap.add_argument("--ai", action="store_true", help="Enable CLIP classification if installed")
+    ap.add_argument("--no-cache", dest="cache", action="store_false",
+                    help="Do not reuse or store image analysis results by content hash across runs")
+    ap.add_argument("--no-fast", dest="fast", action="store_false",
+                    help="Do not skip heavy/system/build folders")
+    ap.add_argument("--network", choices=("auto", "on", "off"), default="auto",
+                    help="Adaptive parallel I/O for network shares: detect by latency (auto), always, never")
+    ap.add_argument("--sniff", action="store_true",
+                    help="Identify unknown/generic extensions (.dat, .bin, none) by their first bytes")
+    ap.add_argument("--max-memory", type=int, default=0, metavar="MB",
+                    help="Keep duplicate detection within about MB of RAM by spilling records to disk "
+                         "(for tens of millions of files)")
+    ap.add_argument("--spill-dir", help="Folder for the temporary spill store (default: system temp)")
+    ap.add_argument("--scan-only", action="store_true", help="Only list files, no analysis")
+    ap.add_argument("--format", choices=("ndjson", "summary"), default="ndjson")
+    ap.add_argument("--output", "-o", help="Write output to FILE instead of stdout")
+    ap.add_argument("--telemetry", help="Write per-stage timings as JSON to this file")
+    ap.add_argument("--progress", action="store_true", help="Report scan progress on stderr")
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    existing = [p for p in args.paths if os.path.isdir(p)]
+    missing = [p for p in args.paths if not os.path.isdir(p)]
+    if not existing:
+        print("No readable folders given.", file=sys.stderr)
+        return EXIT_USAGE
+    args.paths = existing
+
+    fh = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    telemetry = Telemetry()
+    out = Emitter(fh, ndjson=(args.format == "ndjson"))
+    sniffer = Sniffer(telemetry=telemetry) if args.sniff else None
+    code = EXIT_PARTIAL if missing else EXIT_OK
+    try:
+        run(args, out, telemetry, sniffer)
+        telemetry.finish()
+        summary = _summary(out, telemetry, missing, sniffer)
+        if args.format == "ndjson":
+            out.emit(summary)
+        else:
+            _print_summary(summary, fh)
+    except KeyboardInterrupt:
+        code = EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # Downstream consumer (e.g. `head`) closed the pipe; stop quietly
+        sys.stderr.close()
+        return code
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        code = EXIT_ERROR
+    finally:
+        try:
+            fh.flush()
+        except Exception:
+            pass
+        if fh is not sys.stdout:
+            fh.close()
+        if sniffer is not None:
+            sniffer.close()
+        if args.telemetry:
+            telemetry.export_json(args.telemetry)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .utils import windows_long_path
+
+# Each step yields (paths that succeeded, [(path, error message)])
+ActionStep = Tuple[List[str], List[Tuple[str, str]]]
+
+
+def _stopped(should_stop: Optional[Callable[[], bool]]) -> bool:
+    return should_stop is not None and should_stop()
+
+
+def trash_files(paths: List[str], batch_size: int = 200,
+                should_stop: Optional[Callable[[], bool]] = None) -> Iterator[ActionStep]:
+    """Send files to the Recycle Bin in batches (one send2trash call per batch)."""
+    from send2trash import send2trash
+
+    for i in range(0, len(paths), batch_size):
+        if _stopped(should_stop):
+            return
+        batch: List[str] = []
+        missing: List[Tuple[str, str]] = []
+        for p in paths[i:i + batch_size]:
+            if os.path.lexists(windows_long_path(p)):
+                batch.append(p)
+            else:
+                missing.append((p, "File not found"))
+        if not batch:
+            yield [], missing
+            continue
+        try:
+            send2trash([windows_long_path(p) for p in batch])
+            yield batch, missing
+        except Exception:
+            # Something in the batch failed; retry one by one to find out what
+            ok: List[str] = []
+            errs: List[Tuple[str, str]] = list(missing)
+            for p in batch:
+                if not os.path.lexists(windows_long_path(p)):
+                    # Already trashed by the batch call before it failed
+                    ok.append(p)
+                    continue
+                try:
+                    send2trash(windows_long_path(p))
+                    ok.append(p)
+                except Exception as e:
+                    errs.append((p, str(e)))
+            yield ok, errs
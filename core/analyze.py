@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List
 
+from .memo import AnalysisCache, content_key
+from .telemetry import Telemetry, maybe_timed
+from .thumbs import ThumbnailCache
 from .utils import (
     safe_open_image,
     image_brightness,
@@ -10,11 +13,20 @@ from .utils import (
     estimate_sharpness,
 )
 
+# Bump when features, labels or heuristics change: cached results of older versions are then ignored
+ANALYZER_VERSION = 1
+
 
 class Analyzer:
-    def __init__(self, enable_ai: bool = False) -> None:
+    def __init__(self, enable_ai: bool = False, telemetry: Optional[Telemetry] = None,
+                 thumbs: Optional[ThumbnailCache] = None, cache: Optional[AnalysisCache] = None) -> None:
         # Defer transformers import until actually needed to avoid heavy deps at startup
         self.enable_ai = enable_ai
+        self.telemetry = telemetry
+        # Preview thumbnails are made from the image decoded here, so the pane never decodes it again
+        self.thumbs = thumbs
+        # Results by content hash (see memo.py): copies are analysed once, and not again next run
+        self.cache = cache
         self._clip_model = None
         self._clip_proc = None
         self.labels = ["screenshot", "document", "photo", "meme", "wallpaper"]
@@ -26,33 +38,77 @@ class Analyzer:
             return True
         try:
             from transformers import CLIPProcessor, CLIPModel  # type: ignore
-            self._clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-            self._clip_proc = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+            with maybe_timed(self.telemetry, "clip.load"):
+                self._clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
+                self._clip_proc = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
             return True
         except Exception:
             # Fallback if model load fails or transformers/torch unavailable
             self.enable_ai = False
             return False
 
-    def classify_image(self, path: str) -> Dict:
-        img = safe_open_image(path)
-        if img is None:
-            return {"label": "unknown", "confidence": 0.0, "quality": {}}
+    def _decode(self, path: str, rec: Optional[Dict], should_stop: Optional[Callable[[], bool]]):
+        with maybe_timed(self.telemetry, "decode"):
+            img = safe_open_image(path, should_stop=should_stop)
+        if img is None or (should_stop is not None and should_stop()):
+            return None
+
+        if self.thumbs is not None and rec is not None:
+            size, mtime = rec.get("size", 0), rec.get("mtime", 0.0)
+            if not self.thumbs.has(path, size, mtime):
+                with maybe_timed(self.telemetry, "thumb"):
+                    try:
+                        self.thumbs.put_image(path, size, mtime, img)
+                    except Exception:
+                        pass
+            if should_stop is not None and should_stop():
+                return None
+        return img
 
-        # Heuristic quality features
-        w, h = image_resolution(img)
-        bright = image_brightness(img)
-        sharp = estimate_sharpness(img)
+    def _clip_label(self, img) -> Optional[List]:
+        try:
+            with maybe_timed(self.telemetry, "clip"):
+                inputs = self._clip_proc(text=self.labels, images=img, return_tensors="pt", padding=True)
+                outputs = self._clip_model(**inputs)
+            probs = outputs.logits_per_image.softmax(dim=1)[0]
+            idx = int(probs.argmax())
+            return [self.labels[idx], float(probs[idx])]
+        except Exception:
+            return None
 
-        quality = {
-            "width": w,
-            "height": h,
-            "brightness": float(bright),
-            "sharpness": float(sharp),
-            "is_small": (w < 800 or h < 600),
-            "is_dark": bright < 50.0,
-            "is_low_sharpness": sharp < 5.0,
-        }
+    def classify_image(self, path: str, rec: Optional[Dict] = None,
+                       should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        unknown = {"label": "unknown", "confidence": 0.0, "quality": {}}
+        # Content results (quality, CLIP label) are shared by every copy of the same bytes
+        key = None
+        if self.cache is not None and rec is not None:
+            hv = content_key(rec, telemetry=self.telemetry, should_stop=should_stop)
+            if hv:
+                key = f"{hv}:v{ANALYZER_VERSION}"
+        content = self.cache.get(key) if key else None
+        img = None
+        if content is None:
+            img = self._decode(path, rec, should_stop)
+            if img is None:
+                return unknown
+            # Heuristic quality features
+            with maybe_timed(self.telemetry, "features"):
+                w, h = image_resolution(img)
+                bright = image_brightness(img)
+                sharp = estimate_sharpness(img)
+            content = {"quality": {
+                "width": w,
+                "height": h,
+                "brightness": float(bright),
+                "sharpness": float(sharp),
+                "is_small": (w < 800 or h < 600),
+                "is_dark": bright < 50.0,
+                "is_low_sharpness": sharp < 5.0,
+            }}
+            if key:
+                self.cache.put(key, content)
+        quality = dict(content["quality"])
+        w, h = quality["width"], quality["height"]
 
         # Simple screenshot heuristic
         lname = os.path.basename(path).lower()
@@ -62,17 +118,18 @@ class Analyzer:
             return {"label": "screenshot", "confidence": 0.7, "quality": quality}
 
         # Optional CLIP classification
-        if self._ensure_clip():
-            try:
-                from PIL import Image  # local import
-                inputs = self._clip_proc(text=self.labels, images=img, return_tensors="pt", padding=True)
-                outputs = self._clip_model(**inputs)
-                probs = outputs.logits_per_image.softmax(dim=1)[0]
-                idx = int(probs.argmax())
-                conf = float(probs[idx])
-                return {"label": self.labels[idx], "confidence": conf, "quality": quality}
-            except Exception:
-                pass
+        if self._ensure_clip() and not (should_stop is not None and should_stop()):
+            labels = ",".join(self.labels)
+            clip = content.get("clip", {}).get(labels)
+            if clip is None:
+                if img is None:
+                    img = self._decode(path, rec, should_stop)
+                clip = self._clip_label(img) if img is not None else None
+                if clip is not None and key and not (should_stop is not None and should_stop()):
+                    content = dict(content, clip=dict(content.get("clip", {}), **{labels: clip}))
+                    self.cache.put(key, content)
+            if clip is not None:
+                return {"label": clip[0], "confidence": clip[1], "quality": quality}
 
         # Fallback heuristics
         if w >= 1600 and h >= 900 and not quality["is_dark"] and not quality["is_low_sharpness"]:
@@ -83,12 +140,14 @@ class Analyzer:
             return {"label": "photo", "confidence": 0.4, "quality": quality}
         return {"label": "unknown", "confidence": 0.0, "quality": quality}
 
-    def analyze_record(self, rec: Dict) -> Dict:
+    def analyze_record(self, rec: Dict, should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """Classification and quality for one record. If ``should_stop()`` turns
+        true part way through, the result is incomplete and should be discarded."""
         kind = rec.get("kind", "other")
         out = {"kind": kind, "label": kind, "confidence": 0.0, "quality": {}}
 
         if kind == "image":
-            res = self.classify_image(rec["path"])
+            res = self.classify_image(rec["path"], rec, should_stop=should_stop)
             out.update(res)
         elif kind == "document":
             out.update({"label": "document", "confidence": 0.5, "quality": {}})
@@ -0,0 +1,109 @@
+"""Periodic checkpoints of a scan + analysis run, so an interrupted run can resume.
+
+A checkpoint is an ordinary session file (see session.py) in the user cache
+folder. It is named after the folders and options of the run, so only a run
+with the same settings picks it up. It holds the records scanned so far (with
+any hashes and pHashes) and the analysis payloads finished so far; ``meta``
+says whether the scan itself had completed. A checkpoint is removed once its
+run completes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .session import load_session, read_header, save_session
+from .utils import normalize_path, user_cache_dir
+
+CHECKPOINT_INTERVAL = 30.0
+# Checkpoints of runs that never finished are dropped after this long
+MAX_AGE_DAYS = 30
+
+
+def checkpoint_key(folders: List[str], options: Dict) -> str:
+    spec = {"folders": sorted(normalize_path(f) for f in folders), "options": options}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class Checkpoint:
+    """One run's checkpoint file. ``save`` is cheap to call often: use ``due()``
+    first; the interval stretches if saving itself gets slow."""
+
+    def __init__(self, key: str, directory: Optional[str] = None, interval: float = CHECKPOINT_INTERVAL) -> None:
+        self.directory = directory if directory is not None else user_cache_dir("checkpoints")
+        self.path = os.path.join(self.directory, key + ".ncs")
+        self.interval = interval
+        self._last = time.monotonic()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last >= self.interval
+
+    def save(self, records: List[Dict], analyses: Dict[str, Dict], meta: Dict) -> bool:
+        """Write the checkpoint atomically; False if it could not be written
+        (a failed checkpoint never stops the run)."""
+        t0 = time.monotonic()
+        tmp = f"{self.path}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            save_session(tmp, records, analyses, dict(meta, saved=time.time(), analysed=len(analyses)))
+            os.replace(tmp, self.path)
+            ok = True
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            ok = False
+        now = time.monotonic()
+        # Keep checkpointing under ~10% of the run time on very large trees
+        self.interval = max(self.interval, (now - t0) * 10)
+        self._last = now
+        return ok
+
+    def info(self) -> Optional[Dict]:
+        """Checkpoint meta plus ``count`` (records), read from the header only; None if unusable."""
+        try:
+            header = read_header(self.path)
+        except Exception:
+            return None
+        return dict(header.get("meta", {}), count=header.get("count", 0))
+
+    def load(self) -> Optional[Tuple[List[Dict], Dict[str, Dict], Dict]]:
+        """``(records, analyses, meta)``, or None if missing or unreadable."""
+        try:
+            return load_session(self.path)
+        except Exception:
+            return None
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        prune_checkpoints(self.directory)
+
+
+def prune_checkpoints(directory: Optional[str] = None, max_age_days: float = MAX_AGE_DAYS) -> int:
+    """Delete checkpoints older than ``max_age_days``; returns how many were removed."""
+    directory = directory if directory is not None else user_cache_dir("checkpoints")
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for e in entries:
+        try:
+            if e.is_file() and e.stat().st_mtime < cutoff:
+                os.remove(e.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,292 @@
+"""Streaming ZIP writer used by "Compress Selected".
+
+Members are read in fixed-size chunks so memory stays flat regardless of file
+size. Files that will not shrink (JPEG, video, archives, or anything whose
+sampled byte entropy is close to 8 bits) are STORED instead of deflated.
+Compressible members are compressed in worker threads into spooled temp
+files (zlib, bz2 and zstd release the GIL) and then spliced into the archive
+in the original order, so the output is the same as a serial run.
+
+Splicing writes the local header itself through ``zipfile`` internals. It is
+used only where ``can_splice`` finds them; LZMA members (whose zip header
+``zipfile`` builds privately) and builds lacking those internals go through
+the public ``ZipFile.open(zinfo, "w")`` instead, one member at a time.
+"""
+from __future__ import annotations
+
+import bz2
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .utils import windows_long_path
+
+ActionStep = Tuple[List[str], List[Tuple[str, str]]]
+
+CHUNK = 1024 * 1024
+# Compressed members are kept in memory up to this size, then spill to disk
+SPOOL_MAX = 8 * 1024 * 1024
+
+# Already-compressed containers and media: deflating them only burns CPU
+INCOMPRESSIBLE_EXTS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".avif",
+    ".mp4", ".m4v", ".mov", ".mkv", ".webm", ".avi", ".wmv", ".flv",
+    ".mp3", ".aac", ".m4a", ".ogg", ".opus", ".flac", ".wma",
+    ".zip", ".7z", ".rar", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".cab",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub", ".jar", ".apk",
+}
+# Above this many bits per byte a sample is treated as incompressible
+ENTROPY_LIMIT = 7.5
+SAMPLE_SIZE = 64 * 1024
+# Small files are cheap to deflate either way; sampling them costs more than it saves
+SAMPLE_MIN_SIZE = 256 * 1024
+
+METHODS: Dict[str, int] = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+if hasattr(zipfile, "ZIP_ZSTANDARD"):  # Python 3.14+
+    METHODS["zstd"] = zipfile.ZIP_ZSTANDARD
+
+
+def _check_method(method: int) -> None:
+    """Raise RuntimeError/NotImplementedError if zipfile cannot write ``method`` here."""
+    zipfile.ZipFile(io.BytesIO(), "w", compression=method).close()
+
+
+def available_methods() -> List[str]:
+    """Compression methods usable with this Python build, fastest first."""
+    out = []
+    for name in ("deflate", "zstd", "lzma", "bzip2"):
+        if name not in METHODS:
+            continue
+        try:
+            _check_method(METHODS[name])
+        except Exception:
+            continue
+        out.append(name)
+    return out
+
+
+def _compressor(method: int, level: Optional[int]):
+    """Raw compressor producing a ZIP member's data, or None where only zipfile can (LZMA)."""
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(9 if level is None else level)
+    if method == METHODS.get("zstd"):
+        from compression import zstd
+        return zstd.ZstdCompressor(level)
+    return None
+
+
+def can_splice(zf: zipfile.ZipFile, method: int) -> bool:
+    """True if members compressed elsewhere can be appended to ``zf`` (see ``_append_raw``)."""
+    return (_compressor(method, None) is not None and hasattr(zf, "start_dir") and hasattr(zf, "_writecheck")
+            and hasattr(zipfile.ZipInfo, "FileHeader"))
+
+
+def sample_entropy(path: str, size: int, samples: int = 3) -> float:
+    """Shannon entropy (bits per byte) of a few blocks spread over the file."""
+    if size <= 0:
+        return 0.0
+    counts = np.zeros(256, dtype=np.int64)
+    with open(windows_long_path(path), "rb") as fh:
+        step = max(0, size - SAMPLE_SIZE) // max(1, samples - 1)
+        for i in range(samples):
+            fh.seek(i * step)
+            block = fh.read(SAMPLE_SIZE)
+            if block:
+                counts += np.bincount(np.frombuffer(block, dtype=np.uint8), minlength=256)
+            if step == 0:
+                break
+    total = counts.sum()
+    if not total:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def should_store(path: str, size: int) -> bool:
+    """True if compressing ``path`` is unlikely to save space."""
+    if os.path.splitext(path)[1].lower() in INCOMPRESSIBLE_EXTS:
+        return True
+    if size < SAMPLE_MIN_SIZE:
+        return False
+    try:
+        return sample_entropy(path, size) >= ENTROPY_LIMIT
+    except OSError:
+        return False
+
+
+def _unique_arcname(name: str, used: set) -> str:
+    arc = name
+    i = 1
+    while arc.lower() in used:
+        stem, ext = os.path.splitext(name)
+        arc = f"{stem} ({i}){ext}"
+        i += 1
+    used.add(arc.lower())
+    return arc
+
+
+def _zinfo(arcname: str, st: os.stat_result, method: int, level: Optional[int] = None) -> zipfile.ZipInfo:
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.file_size = st.st_size
+    zinfo.compress_type = method
+    if level is not None and hasattr(zinfo, "compress_level"):  # Python 3.13+: used by ZipFile.open
+        zinfo.compress_level = level
+    return zinfo
+
+
+def _compress_to_spool(path: str, method: int, level: Optional[int]) -> Tuple[tempfile.SpooledTemporaryFile, int, int]:
+    """Compress ``path`` into a spooled temp file; returns (spool, crc, raw_size)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    comp = _compressor(method, level)
+    crc = 0
+    size = 0
+    try:
+        with open(windows_long_path(path), "rb") as fh:
+            while True:
+                buf = fh.read(CHUNK)
+                if not buf:
+                    break
+                crc = zlib.crc32(buf, crc)
+                size += len(buf)
+                spool.write(comp.compress(buf))
+        spool.write(comp.flush())
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, crc, size
+
+
+def _append_raw(zf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, spool, crc: int, size: int) -> None:
+    """Write an already-compressed member (what ZipFile.open('w') does, minus
+    compressing). Relies on zipfile internals: check ``can_splice`` first."""
+    zinfo.file_size = size
+    zinfo.CRC = crc
+    spool.seek(0, os.SEEK_END)
+    zinfo.compress_size = spool.tell()
+    spool.seek(0)
+    zinfo.flag_bits = 0
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zf.fp.seek(zf.start_dir)
+    zinfo.header_offset = zf.fp.tell()
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zf.fp.write(zinfo.FileHeader(zip64))
+    shutil.copyfileobj(spool, zf.fp, CHUNK)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+
+
+def _stream_member(zf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, path: str) -> None:
+    with open(windows_long_path(path), "rb") as src, \
+            zf.open(zinfo, "w", force_zip64=zinfo.file_size > zipfile.ZIP64_LIMIT) as dst:
+        shutil.copyfileobj(src, dst, CHUNK)
+
+
+def compress_files(paths: List[str], zip_path: str, method: str = "deflate", level: Optional[int] = None,
+                   workers: Optional[int] = None, batch_size: int = 20,
+                   should_stop: Optional[Callable[[], bool]] = None,
+                   stats: Optional[Dict] = None) -> Iterator[ActionStep]:
+    """Add files to a new ZIP archive; sources are left in place.
+
+    ``stats`` (if given) is filled with files, stored, bytes_in, bytes_out
+    (member payload), archive_bytes, seconds, mb_per_s and ratio (archive size
+    over input size) once the archive is closed.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown compression method: {method}")
+    ctype = METHODS[method]
+    _check_method(ctype)
+    workers = workers or min(8, os.cpu_count() or 1)
+    stats = stats if stats is not None else {}
+    stats.update(method=method, files=0, stored=0, bytes_in=0, bytes_out=0)
+    t0 = time.perf_counter()
+    used_names: set = set()
+    ok: List[str] = []
+    errs: List[Tuple[str, str]] = []
+    # Bounded window of in-flight members: each holds at most SPOOL_MAX in memory
+    window: Deque[Tuple[str, zipfile.ZipInfo, object]] = deque()
+    max_window = workers * 2
+
+    def record(p: str, zinfo: zipfile.ZipInfo) -> None:
+        stats["files"] += 1
+        stats["bytes_in"] += zinfo.file_size
+        stats["bytes_out"] += zinfo.compress_size
+        if zinfo.compress_type == zipfile.ZIP_STORED:
+            stats["stored"] += 1
+        ok.append(p)
+
+    def finish_one(zf: zipfile.ZipFile) -> None:
+        p, zinfo, fut = window.popleft()
+        try:
+            if fut is None:
+                _stream_member(zf, zinfo, p)
+            else:
+                spool, crc, size = fut.result()
+                with spool:
+                    _append_raw(zf, zinfo, spool, crc, size)
+            record(p, zinfo)
+        except Exception as e:
+            errs.append((p, str(e)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="neatcore-zip") as pool, \
+            zipfile.ZipFile(zip_path, "w", compression=ctype, allowZip64=True) as zf:
+        splice = can_splice(zf, ctype)
+        try:
+            for p in paths:
+                if should_stop is not None and should_stop():
+                    break
+                try:
+                    st = os.stat(windows_long_path(p))
+                    store = should_store(p, st.st_size)
+                    zinfo = _zinfo(_unique_arcname(os.path.basename(p), used_names), st,
+                                   zipfile.ZIP_STORED if store else ctype, level)
+                except Exception as e:
+                    errs.append((p, str(e)))
+                    continue
+                # Stored members (and all of them without splicing) are streamed when their turn comes
+                fut = pool.submit(_compress_to_spool, p, ctype, level) if splice and not store else None
+                window.append((p, zinfo, fut))
+                while len(window) >= max_window or (window and window[0][2] is None):
+                    finish_one(zf)
+                if len(ok) + len(errs) >= batch_size:
+                    yield ok, errs
+                    ok, errs = [], []
+            while window:
+                if should_stop is not None and should_stop():
+                    break
+                finish_one(zf)
+        finally:
+            # Cancelled or failed: drop queued work and any finished spools
+            for _, _, fut in window:
+                if fut is not None and not fut.cancel():
+                    try:
+                        fut.result()[0].close()
+                    except Exception:
+                        pass
+            window.clear()
+
+    secs = time.perf_counter() - t0
+    stats["seconds"] = secs
+    stats["archive_bytes"] = os.path.getsize(zip_path)
+    stats["mb_per_s"] = stats["bytes_in"] / (1024 * 1024) / secs if secs > 0 else 0.0
+    stats["ratio"] = stats["archive_bytes"] / stats["bytes_in"] if stats["bytes_in"] else 1.0
+    if ok or errs:
+        yield ok, errs
@@ -0,0 +1,137 @@
+"""Reclaim space from exact duplicates without deleting any path.
+
+Every duplicate in a group is replaced by a reflink (copy-on-write clone, on
+Btrfs/XFS and similar) or a hardlink to the group's keeper. Contents are
+compared byte for byte first. The link is created under a temporary name next
+to the duplicate and then ``os.replace``d over it, so the path never goes
+missing, even for a moment.
+"""
+from __future__ import annotations
+
+import errno
+import filecmp
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .utils import windows_long_path
+
+ActionStep = Tuple[List[str], List[Tuple[str, str]]]
+
+# ioctl(dest_fd, FICLONE, src_fd): whole-file clone (linux/fs.h)
+FICLONE = 0x40049409
+TMP_SUFFIX = ".neatcore-link"
+MODES = ("auto", "reflink", "hardlink")
+
+
+def exact_groups(records: List[Dict], algo: str = "md5") -> List[List[Dict]]:
+    """Exact duplicate groups from records already hashed by ``group_by_exact_hash``."""
+    key = f"hash_{algo}"
+    buckets: Dict[Tuple[int, str], List[Dict]] = {}
+    for r in records:
+        hv = r.get(key)
+        if hv and r.get("size", 0) > 0:
+            buckets.setdefault((r["size"], hv), []).append(r)
+    return [g for g in buckets.values() if len(g) > 1]
+
+
+def pick_keeper(group: List[Dict]) -> Dict:
+    """Oldest file wins (most likely the original); shorter path breaks ties."""
+    return min(group, key=lambda r: (r.get("mtime", 0.0), len(r["path"]), r["path"]))
+
+
+def _reflink(src: str, dst: str) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only supported on Linux")
+    import fcntl
+
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+
+
+def _link_one(keeper: str, dup: str, mode: str, no_reflink: Set[int]) -> Tuple[str, bool]:
+    """Replace ``dup`` with a link to ``keeper``. Returns the kind ("reflink",
+    "hardlink" or "already") and whether the duplicate's own data was freed:
+    not if another path still links to it."""
+    lk, ld = windows_long_path(keeper), windows_long_path(dup)
+    sk, sd = os.stat(lk), os.stat(ld)
+    if (sk.st_dev, sk.st_ino) == (sd.st_dev, sd.st_ino):
+        return "already", False
+    if sk.st_dev != sd.st_dev:
+        raise OSError(errno.EXDEV, "Keeper is on another volume")
+    if sk.st_size != sd.st_size or not filecmp.cmp(lk, ld, shallow=False):
+        raise OSError("Contents differ from the kept copy")
+    tmp = ld + TMP_SUFFIX
+    try:
+        kind = None
+        if mode in ("auto", "reflink") and sd.st_dev not in no_reflink:
+            try:
+                _reflink(lk, tmp)
+                # A clone is a separate inode: keep the duplicate's own metadata
+                os.chmod(tmp, sd.st_mode & 0o7777)
+                os.utime(tmp, ns=(sd.st_atime_ns, sd.st_mtime_ns))
+                kind = "reflink"
+            except OSError as e:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                if mode == "reflink":
+                    raise
+                # Remember unsupported filesystems so the rest go straight to hardlinks
+                if e.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY,
+                               getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)):
+                    no_reflink.add(sd.st_dev)
+        if kind is None:
+            os.link(lk, tmp)
+            kind = "hardlink"
+        os.replace(tmp, ld)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return kind, sd.st_nlink == 1
+
+
+def link_duplicates(groups: List[List[Dict]], mode: str = "auto", batch_size: int = 50,
+                    should_stop: Optional[Callable[[], bool]] = None,
+                    stats: Optional[Dict] = None) -> Iterator[ActionStep]:
+    """Replace every non-keeper in each group with a link to the keeper.
+
+    ``mode`` is "auto" (reflink, falling back to hardlink), "reflink" or
+    "hardlink". Steps report the duplicate paths that were replaced.
+    ``stats`` (if given) gets reflinked, hardlinked, already_linked and
+    bytes_reclaimed (sizes of duplicates whose data no other path linked to).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown link mode: {mode}")
+    stats = stats if stats is not None else {}
+    stats.update(reflinked=0, hardlinked=0, already_linked=0, bytes_reclaimed=0)
+    no_reflink: Set[int] = set()
+    ok: List[str] = []
+    errs: List[Tuple[str, str]] = []
+    for group in groups:
+        if should_stop is not None and should_stop():
+            break
+        keeper = pick_keeper(group)
+        for r in group:
+            if r is keeper:
+                continue
+            try:
+                kind, freed = _link_one(keeper["path"], r["path"], mode, no_reflink)
+                if kind == "already":
+                    stats["already_linked"] += 1
+                else:
+                    stats["reflinked" if kind == "reflink" else "hardlinked"] += 1
+                if freed:
+                    stats["bytes_reclaimed"] += r.get("size", 0)
+                ok.append(r["path"])
+            except Exception as e:
+                errs.append((r["path"], str(e)))
+        if len(ok) + len(errs) >= batch_size:
+            yield ok, errs
+            ok, errs = [], []
+    if ok or errs:
+        yield ok, errs
@@ -0,0 +1,226 @@
+"""Duplicate folders from Merkle digests of the scanned trees.
+
+A folder's digest hashes the sorted names and digests of its files and
+subfolders; a file's digest is its content hash. Identical subtrees get
+equal digests, so one bottom-up pass groups every copy of a backup at once,
+in time linear in files plus folders. Only the outermost copies are
+reported: the identical subfolders inside them are implied.
+
+A file without a content hash was never hashed because no other file had
+its size, so it is unique and gets a unique token. Files of sampled large
+files count, but make the folder group "probable". Empty folders are not in
+the records and are ignored.
+
+Near-identical folders are found by byte-weighted Jaccard similarity of
+their children's digests (files and subfolders, names ignored), with
+candidate pairs taken from an inverted index of those digests.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+from .utils import normalize_path
+
+# Digests held by more folders than this (empty files, boilerplate) are not used to pair folders
+MAX_POSTINGS = 64
+SIMILAR_THRESHOLD = 0.8
+
+
+class _Folder:
+    __slots__ = ("path", "files", "subdirs", "digest", "bytes", "count", "mtime", "probable")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.files: List[Tuple[str, str, int]] = []  # (name, token, size)
+        self.subdirs: List[str] = []
+        self.digest = ""
+        self.bytes = 0
+        self.count = 0
+        self.mtime = float("inf")
+        self.probable = False
+
+
+def _file_token(rec: Dict, algo: str) -> Tuple[str, bool]:
+    """``(token, probable)`` for a file's content."""
+    if not rec.get("size"):
+        return "empty", False
+    hv = rec.get(f"hash_{algo}")
+    if hv:
+        return "h:" + hv, False
+    sv = rec.get(f"hash_sample_{algo}")
+    if sv:
+        return f"s:{rec['size']}:{sv}", True
+    return "u:" + rec["path"], False
+
+
+def _under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip("\\/") + os.sep)
+
+
+def folder_digests(records: Iterable[Dict], roots: Optional[List[str]] = None,
+                   algo: str = "md5") -> Dict[str, _Folder]:
+    """Digest, size and file count of every folder at or below ``roots``
+    (default: the deepest folder holding all records)."""
+    folders: Dict[str, _Folder] = {}
+    records = list(records)
+    if roots:
+        tops = [normalize_path(r) for r in roots]
+    else:
+        common = os.path.commonpath([os.path.dirname(r["path"]) for r in records]) if records else ""
+        tops = [common] if common else []
+    for rec in records:
+        path = rec["path"]
+        d = os.path.dirname(path)
+        top = next((t for t in tops if _under(d, t)), None)
+        if top is None:
+            continue
+        token, probable = _file_token(rec, algo)
+        node = folders.get(d)
+        if node is None:
+            node = folders[d] = _Folder(d)
+            # Register the chain up to the root so every folder knows its subfolders
+            child, parent = d, os.path.dirname(d)
+            while child != top and parent != child:
+                pnode = folders.get(parent)
+                new = pnode is None
+                if new:
+                    pnode = folders[parent] = _Folder(parent)
+                pnode.subdirs.append(child)
+                if not new:
+                    break
+                child, parent = parent, os.path.dirname(parent)
+        node.files.append((os.path.basename(path), token, int(rec.get("size") or 0)))
+        node.probable |= probable
+        node.mtime = min(node.mtime, rec.get("mtime", 0.0))
+
+    # Deepest first, so every subfolder is digested before its parent
+    for node in sorted(folders.values(), key=lambda f: f.path.count(os.sep), reverse=True):
+        entries = [f"f\0{name}\0{token}" for name, token, _ in node.files]
+        node.bytes = sum(size for _, _, size in node.files)
+        node.count = len(node.files)
+        for sub in node.subdirs:
+            child = folders[sub]
+            entries.append(f"d\0{os.path.basename(sub)}\0{child.digest}")
+            node.bytes += child.bytes
+            node.count += child.count
+            node.mtime = min(node.mtime, child.mtime)
+            node.probable |= child.probable
+        entries.sort()
+        node.digest = hashlib.sha1("\n".join(entries).encode("utf-8", "surrogatepass")).hexdigest()
+    return folders
+
+
+def _keeper_order(f: _Folder) -> Tuple:
+    # Same rule as dedupe.pick_keeper: oldest contents, then shortest path
+    return (f.mtime, len(f.path), f.path)
+
+
+def find_duplicate_folders(records: Iterable[Dict], roots: Optional[List[str]] = None, algo: str = "md5",
+                           min_files: int = 2, similar: float = SIMILAR_THRESHOLD) -> List[Dict]:
+    """Folder-level duplicate groups, largest reclaimable first.
+
+    Each group is ``{"kind": "identical" | "probable" | "similar", "folders":
+    [keeper, copies...], "bytes", "files", "reclaimable", "similarity"}``.
+    For similar pairs ``bytes``/``files`` describe the keeper and
+    ``reclaimable`` is the size of the content the two have in common,
+    less identical subfolders already reported as their own group.
+    ``similar=0`` skips the near-identical search.
+    """
+    folders = folder_digests(records, roots, algo)
+    by_digest: DefaultDict[str, List[_Folder]] = defaultdict(list)
+    for f in folders.values():
+        if f.count >= min_files and f.bytes > 0:
+            by_digest[f.digest].append(f)
+    dup_digests = {d for d, fs in by_digest.items() if len(fs) > 1}
+
+    def covered(f: _Folder) -> bool:
+        # Inside a folder that is itself a copy: reported with that folder
+        parent = folders.get(os.path.dirname(f.path))
+        return parent is not None and parent is not f and parent.digest in dup_digests
+
+    groups: List[Dict] = []
+    for digest in dup_digests:
+        members = sorted(by_digest[digest], key=_keeper_order)
+        inner = [f for f in members if covered(f)]
+        outer = [f for f in members if not covered(f)]
+        # One covered copy stands in for all of them: removing the others is already counted
+        members = sorted(outer + inner[:1], key=_keeper_order)
+        if len(members) < 2:
+            continue
+        head = members[0]
+        groups.append({
+            "kind": "probable" if head.probable else "identical",
+            "folders": [f.path for f in members],
+            "bytes": head.bytes,
+            "files": head.count,
+            "reclaimable": head.bytes * (len(members) - 1),
+            "similarity": 1.0,
+        })
+    if similar > 0:
+        # Copies of one folder pair up alike: only each digest's keeper is compared
+        keepers = {min(fs, key=_keeper_order).path for fs in by_digest.values()}
+        groups.extend(_similar_pairs(folders, keepers, dup_digests, similar))
+    groups.sort(key=lambda g: g["reclaimable"], reverse=True)
+    return groups
+
+
+def _children(f: _Folder, folders: Dict[str, _Folder]) -> Dict[str, int]:
+    items: Dict[str, int] = {}
+    for _, token, size in f.files:
+        items[token] = max(items.get(token, 0), size)
+    for sub in f.subdirs:
+        c = folders[sub]
+        items["d:" + c.digest] = max(items.get("d:" + c.digest, 0), c.bytes)
+    return items
+
+
+def _similar_pairs(folders: Dict[str, _Folder], candidates: Set[str], dup_digests: Set[str],
+                   threshold: float) -> List[Dict]:
+    candidates = [folders[p] for p in candidates]
+    children = {f.path: _children(f, folders) for f in candidates}
+    postings: DefaultDict[str, List[str]] = defaultdict(list)
+    for path, items in children.items():
+        for token, size in items.items():
+            if size > 0 and not token.startswith("u:"):
+                postings[token].append(path)
+    shared: DefaultDict[Tuple[str, str], int] = defaultdict(int)
+    # Shared bytes not already counted by an identical-folder group
+    fresh: DefaultDict[Tuple[str, str], int] = defaultdict(int)
+    for token, paths in postings.items():
+        if len(paths) > MAX_POSTINGS:
+            continue
+        counted = token.startswith("d:") and token[2:] in dup_digests
+        for i, a in enumerate(paths):
+            for b in paths[i + 1:]:
+                key = (a, b) if a < b else (b, a)
+                size = min(children[a][token], children[b][token])
+                shared[key] += size
+                if not counted:
+                    fresh[key] += size
+    totals = {p: sum(items.values()) for p, items in children.items()}
+    pairs: Dict[Tuple[str, str], float] = {}
+    for (a, b), common in shared.items():
+        if _under(a, b) or _under(b, a) or folders[a].digest == folders[b].digest or not fresh[(a, b)]:
+            continue
+        sim = common / (totals[a] + totals[b] - common)
+        if sim >= threshold:
+            pairs[(a, b)] = sim
+    out: List[Dict] = []
+    for (a, b), sim in pairs.items():
+        pa, pb = os.path.dirname(a), os.path.dirname(b)
+        if (min(pa, pb), max(pa, pb)) in pairs:
+            # The parents already form a similar pair
+            continue
+        fa, fb = sorted((folders[a], folders[b]), key=_keeper_order)
+        out.append({
+            "kind": "similar",
+            "folders": [fa.path, fb.path],
+            "bytes": fa.bytes,
+            "files": fa.count,
+            "reclaimable": fresh[(a, b)],
+            "similarity": round(sim, 3),
+        })
+    return out
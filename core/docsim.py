@@ -0,0 +1,325 @@
+"""Near-duplicate documents from MinHash signatures and LSH banding.
+
+Text is pulled out cheaply: plain files are read directly, RTF has its
+control words stripped, and Office Open XML files (docx, xlsx, pptx) are
+zip archives whose text runs are taken from the XML parts by a regex, with
+no XML tree built. PDFs are read with ``pypdf`` when it is installed and
+skipped otherwise. Legacy binary Office files are not read.
+
+The words of each text are cut into overlapping ``SHINGLE_WORDS``-word
+shingles, and a ``NUM_PERM``-value MinHash signature is taken over them.
+The share of equal signature values estimates the Jaccard similarity of
+two shingle sets. Signatures are split into ``BANDS`` bands of ``ROWS``
+values; two documents become candidates when any band matches exactly, so
+pairs are found through hash buckets instead of comparing every pair. With
+16 x 8 a pair at Jaccard 0.8 is a candidate with ~99.8% probability, one
+at 0.5 with ~6%. Candidates are then confirmed on the full signature.
+
+Signatures depend only on file content, so ``SignatureCache`` stores them
+by MD5 on disk. A re-scan, or a moved or renamed copy, skips extraction.
+"""
+from __future__ import annotations
+
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .dupgraph import UnionFind
+from .scanner import _hash_file
+from .telemetry import Telemetry, maybe_timed
+from .utils import user_cache_dir
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILAR_THRESHOLD = 0.8
+# Fewer words than this say too little to call two documents alike
+MIN_WORDS = 10
+# Bigger documents are skipped; text beyond MAX_TEXT_CHARS is ignored
+MAX_DOC_BYTES = 64 * 1024 * 1024
+MAX_TEXT_CHARS = 2 * 1024 * 1024
+MAX_PDF_PAGES = 50
+# Buckets with more members are compared against their first member only
+MAX_BUCKET = 200
+TEXT_EXTS = {".txt", ".md"}
+OOXML_PARTS = {
+    ".docx": re.compile(r"word/(document|header\d*|footer\d*|footnotes)\.xml$"),
+    ".pptx": re.compile(r"ppt/slides/slide\d+\.xml$"),
+    ".xlsx": re.compile(r"xl/(sharedStrings|worksheets/sheet\d+)\.xml$"),
+}
+SUPPORTED_EXTS = TEXT_EXTS | set(OOXML_PARTS) | {".rtf", ".pdf"}
+
+_PRIME = (1 << 61) - 1
+# a * x + b stays below 2**64 for 32-bit shingle hashes x
+_rng = np.random.RandomState(0x6E6361)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_CHUNK = 4096
+
+_XML_TEXT = re.compile(r"<(?:\w+:)?(?:t|v)(?:\s[^>]*)?>([^<]*)</")
+_XML_BREAK = re.compile(r"</(?:\w+:)?(?:p|row|si)>")
+_RTF_HEX = re.compile(r"\\'([0-9a-fA-F]{2})")
+_RTF_CONTROL = re.compile(r"\\[a-zA-Z]+-?\d* ?|\\[^a-zA-Z]|[{}]")
+_WORD = re.compile(r"\w+")
+
+
+def _read_text(path: str) -> str:
+    with open(path, "rb") as f:
+        data = f.read(MAX_TEXT_CHARS * 2)
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16", errors="replace")
+    return data.decode("utf-8", errors="replace")
+
+
+def _read_rtf(path: str) -> str:
+    with open(path, "rb") as f:
+        raw = f.read(MAX_TEXT_CHARS * 2).decode("latin-1")
+    raw = _RTF_HEX.sub(lambda m: chr(int(m.group(1), 16)), raw)
+    return _RTF_CONTROL.sub(" ", raw)
+
+
+def _read_ooxml(path: str, ext: str) -> str:
+    wanted = OOXML_PARTS[ext]
+    parts: List[str] = []
+    budget = MAX_TEXT_CHARS * 4
+    with zipfile.ZipFile(path) as zf:
+        names = sorted((n for n in zf.namelist() if wanted.match(n)),
+                       key=lambda n: [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", n)])
+        for name in names:
+            if budget <= 0:
+                break
+            with zf.open(name) as f:
+                # Bounded read: a tiny archive may inflate to gigabytes
+                xml = f.read(budget).decode("utf-8", errors="replace")
+            budget -= len(xml)
+            xml = _XML_BREAK.sub("\n", xml)
+            parts.append(html.unescape(" ".join(_XML_TEXT.findall(xml))))
+    return "\n".join(parts)
+
+
+def _read_pdf(path: str) -> str:
+    try:
+        from pypdf import PdfReader  # type: ignore
+    except ImportError:
+        return ""
+    reader = PdfReader(path)
+    out: List[str] = []
+    for page in reader.pages[:MAX_PDF_PAGES]:
+        out.append(page.extract_text() or "")
+    return "\n".join(out)
+
+
+def extract_text(path: str, ext: str) -> str:
+    """Plain text of a document ("" if the type is unsupported or unreadable)."""
+    ext = ext.lower()
+    try:
+        if ext in TEXT_EXTS:
+            text = _read_text(path)
+        elif ext == ".rtf":
+            text = _read_rtf(path)
+        elif ext in OOXML_PARTS:
+            text = _read_ooxml(path, ext)
+        elif ext == ".pdf":
+            text = _read_pdf(path)
+        else:
+            return ""
+    except Exception:
+        return ""
+    return text[:MAX_TEXT_CHARS]
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """Distinct 32-bit hashes of the ``k``-word shingles of ``text`` (lower-cased words)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return np.empty(0, dtype=np.uint64)
+    tok = np.array([zlib.crc32(w.encode("utf-8", "surrogatepass")) for w in words], dtype=np.uint64)
+    n = len(tok) - k + 1
+    h = tok[:n].copy()
+    for j in range(1, k):
+        # FNV-style mix keeps word order within a shingle
+        h = ((h * np.uint64(0x01000193)) ^ tok[j:j + n]) & np.uint64(0xFFFFFFFF)
+    return np.unique(h)
+
+
+def minhash(shingle_hashes: np.ndarray) -> np.ndarray:
+    """``NUM_PERM`` minimum hash values (uint64) over ``shingle_hashes``."""
+    sig = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingle_hashes), _CHUNK):
+        x = shingle_hashes[start:start + _CHUNK, None]
+        np.minimum(sig, ((x * _PERM_A + _PERM_B) % _PRIME).min(axis=0), out=sig)
+    return sig
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class SignatureCache:
+    """MinHash signatures on disk, keyed by content hash. Documents without
+    usable text are stored too (as NULL), so they are not re-read either.
+    Past ``max_entries`` the least recently used quarter is dropped."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200_000) -> None:
+        self.path = path or os.path.join(user_cache_dir("docsim"), "signatures.db")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = {"hit": 0, "miss": 0}
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                # Opened lazily and shared by whichever worker thread runs grouping
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("CREATE TABLE IF NOT EXISTS sigs "
+                                   "(hash TEXT PRIMARY KEY, sig BLOB, used REAL)")
+            except (OSError, sqlite3.Error):
+                self._conn = None
+        return self._conn
+
+    def get_many(self, hashes: List[str]) -> Dict[str, Optional[np.ndarray]]:
+        """Cached ``hash -> signature`` (None: no usable text) for the known hashes."""
+        out: Dict[str, Optional[np.ndarray]] = {}
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return out
+            try:
+                for start in range(0, len(hashes), 500):
+                    part = hashes[start:start + 500]
+                    rows = conn.execute(f"SELECT hash, sig FROM sigs WHERE hash IN ({','.join('?' * len(part))})",
+                                        part).fetchall()
+                    for hv, blob in rows:
+                        out[hv] = np.frombuffer(blob, dtype=np.uint64) if blob is not None else None
+                    with conn:
+                        conn.executemany("UPDATE sigs SET used = ? WHERE hash = ?",
+                                         [(time.time(), hv) for hv, _ in rows])
+            except sqlite3.Error:
+                pass
+            self.hits["hit"] += len(out)
+            self.hits["miss"] += len(hashes) - len(out)
+        return out
+
+    def put_many(self, items: Dict[str, Optional[np.ndarray]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO sigs (hash, sig, used) VALUES (?, ?, ?)",
+                                     [(hv, sig.tobytes() if sig is not None else None, now)
+                                      for hv, sig in items.items()])
+                    (count,) = conn.execute("SELECT COUNT(*) FROM sigs").fetchone()
+                    if count > self.max_entries:
+                        conn.execute("DELETE FROM sigs WHERE hash IN "
+                                     "(SELECT hash FROM sigs ORDER BY used LIMIT ?)",
+                                     (count - self.max_entries * 3 // 4,))
+            except sqlite3.Error:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _doc_ext(rec: Dict) -> str:
+    return (rec.get("sniffed_ext") or rec.get("ext") or "").lower()
+
+
+def signatures(records: List[Dict], cache: Optional[SignatureCache] = None,
+               telemetry: Optional[Telemetry] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> List[Tuple[Dict, np.ndarray]]:
+    """``(record, signature)`` for every supported document with enough text.
+    Sets ``hash_md5`` on the records it hashes."""
+    docs = [r for r in records if r.get("kind") == "document" and _doc_ext(r) in SUPPORTED_EXTS
+            and 0 < r.get("size", 0) <= MAX_DOC_BYTES]
+    keyed: List[Tuple[Dict, str]] = []
+    for r in docs:
+        if should_stop is not None and should_stop():
+            return []
+        hv = r.get("hash_md5")
+        if hv is None:
+            hv = _hash_file(r["path"], algo="md5", telemetry=telemetry, should_stop=should_stop)
+            if hv is None:
+                continue
+            r["hash_md5"] = hv
+        keyed.append((r, hv))
+
+    known = cache.get_many(sorted({hv for _, hv in keyed})) if cache is not None else {}
+    fresh: Dict[str, Optional[np.ndarray]] = {}
+    out: List[Tuple[Dict, np.ndarray]] = []
+    for r, hv in keyed:
+        if hv in known:
+            sig = known[hv]
+        elif hv in fresh:
+            sig = fresh[hv]
+        else:
+            if should_stop is not None and should_stop():
+                break
+            with maybe_timed(telemetry, "docsim.extract", nbytes=r.get("size", 0)):
+                sh = shingles(extract_text(r["path"], _doc_ext(r)))
+                sig = minhash(sh) if len(sh) else None
+            fresh[hv] = sig
+        if sig is not None:
+            out.append((r, sig))
+    if cache is not None:
+        cache.put_many(fresh)
+    return out
+
+
+def group_similar_documents(records: List[Dict], threshold: float = SIMILAR_THRESHOLD,
+                            cache: Optional[SignatureCache] = None,
+                            telemetry: Optional[Telemetry] = None,
+                            should_stop: Optional[Callable[[], bool]] = None) -> List[List[Dict]]:
+    """Groups of documents whose texts are at least ``threshold`` alike
+    (estimated Jaccard similarity of word shingles), joined transitively."""
+    sigs = signatures(records, cache, telemetry, should_stop)
+    if len(sigs) < 2 or (should_stop is not None and should_stop()):
+        return []
+    with maybe_timed(telemetry, "docsim.match", items=len(sigs)):
+        uf = UnionFind(len(sigs))
+        # Equal signatures (same text) join directly; only one of each goes through LSH
+        first: Dict[bytes, int] = {}
+        for i, (_, sig) in enumerate(sigs):
+            j = first.setdefault(sig.tobytes(), i)
+            if j != i:
+                uf.union(i, j)
+        unique = sorted(first.values())
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        for i in unique:
+            bands = sigs[i][1].reshape(BANDS, ROWS)
+            for b in range(BANDS):
+                buckets.setdefault((b, bands[b].tobytes()), []).append(i)
+        checked = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > MAX_BUCKET:
+                pairs = [(members[0], j) for j in members[1:]]
+            else:
+                pairs = [(a, b) for k, a in enumerate(members) for b in members[k + 1:]]
+            for a, b in pairs:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                if similarity(sigs[a][1], sigs[b][1]) >= threshold:
+                    uf.union(a, b)
+    return [[sigs[i][0] for i in g] for g in uf.groups()]
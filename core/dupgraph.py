@@ -0,0 +1,207 @@
+"""Duplicate clusters: exact, perceptual and document matches as one graph.
+
+Every group found by a matcher is a set of edges between its members.
+A union-find (path halving, union by size) joins them in near-linear time,
+so A~B and B~C always end up in one cluster, whichever matcher saw which
+pair and in whatever order. Each cluster gets an id derived from its
+smallest member path, which is the same on every run over the same files.
+It also gets a keeper, chosen by a configurable ranking:
+
+* ``resolution``: most pixels first (images matched perceptually only);
+* ``sharpness``: highest gradient energy first (likewise);
+* ``age``: oldest modification time first, as ``dedupe.pick_keeper``;
+* ``path``: shortest, then alphabetically first path.
+
+Byte-identical members tie on resolution and sharpness, so image features
+are read only for clusters joined by perceptual edges: the image header for
+the size, and a draft decode (at most ``FEATURE_SIDE`` pixels) for sharpness.
+
+``NeighbourGraph`` keeps every perceptual candidate pair up to a maximum
+Hamming distance, with that distance, in arrays sorted by distance. Grouping
+at any threshold up to the maximum is then a prefix of the edge list fed to a
+union-find: milliseconds, with no image decoded again.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .telemetry import Telemetry, maybe_timed
+from .utils import estimate_sharpness
+
+KEEPER_RANKINGS = ("resolution", "sharpness", "age", "path")
+DEFAULT_RANKING = KEEPER_RANKINGS
+FEATURE_SIDE = 512
+# Perceptual edges are kept up to this many differing pHash bits
+MAX_EDGE_BITS = 10
+# Edge kinds whose members may differ in content (and so in quality)
+SIMILAR_KINDS = ("perceptual", "document")
+
+
+class UnionFind:
+    """Disjoint sets over ``0..n-1``; ``add`` grows the universe by one."""
+
+    def __init__(self, n: int = 0) -> None:
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> int:
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return ri
+        if self.size[ri] < self.size[rj]:
+            ri, rj = rj, ri
+        self.parent[rj] = ri
+        self.size[ri] += self.size[rj]
+        return ri
+
+    def groups(self) -> List[List[int]]:
+        """Sets with more than one member, each in ascending order."""
+        out: Dict[int, List[int]] = {}
+        for i in range(len(self.parent)):
+            out.setdefault(self.find(i), []).append(i)
+        return [g for g in out.values() if len(g) > 1]
+
+
+class NeighbourGraph:
+    """Perceptual candidate pairs ``(i, j)`` of ``records`` with their Hamming
+    distances, at most ``max_bits``, sorted by distance."""
+
+    def __init__(self, records: List[Dict], i: np.ndarray, j: np.ndarray, dist: np.ndarray,
+                 max_bits: int = MAX_EDGE_BITS) -> None:
+        order = np.argsort(dist, kind="stable")
+        self.records = records
+        self.i = np.asarray(i, dtype=np.int32)[order]
+        self.j = np.asarray(j, dtype=np.int32)[order]
+        self.dist = np.asarray(dist, dtype=np.uint8)[order]
+        self.max_bits = max_bits
+
+    def __len__(self) -> int:
+        return len(self.dist)
+
+    def groups(self, threshold: int) -> List[List[Dict]]:
+        """Connected groups using the edges at most ``threshold`` bits apart."""
+        if threshold > self.max_bits:
+            raise ValueError(f"Threshold {threshold} is above the stored maximum of {self.max_bits} bits")
+        n = int(np.searchsorted(self.dist, threshold, side="right"))
+        uf = UnionFind(len(self.records))
+        for a, b in zip(self.i[:n].tolist(), self.j[:n].tolist()):
+            uf.union(a, b)
+        return [[self.records[k] for k in g] for g in uf.groups()]
+
+    def linked(self) -> List[Dict]:
+        """Records with at least one stored edge (the only ones any threshold can group)."""
+        idx = np.unique(np.concatenate([self.i, self.j]))
+        return [self.records[k] for k in idx.tolist()]
+
+
+def cluster_id(paths: Iterable[str]) -> str:
+    return "d" + hashlib.sha1(min(paths).encode("utf-8", "surrogatepass")).hexdigest()[:12]
+
+
+def image_features(path: str) -> Tuple[int, float]:
+    """``(pixels, sharpness)`` of an image, or ``(0, 0.0)`` if unreadable."""
+    try:
+        img = Image.open(path)
+        w, h = img.size
+        img.draft("L", (FEATURE_SIDE, FEATURE_SIDE))
+        img = img.convert("L")
+        if max(img.size) > FEATURE_SIDE:
+            img.thumbnail((FEATURE_SIDE, FEATURE_SIDE))
+        return w * h, estimate_sharpness(img)
+    except Exception:
+        return 0, 0.0
+
+
+def _rank_key(rec: Dict, ranking: Sequence[str], feats: Dict[str, Tuple[int, float]]) -> Tuple:
+    key = []
+    pixels, sharp = feats.get(rec["path"], (0, 0.0))
+    for name in ranking:
+        if name == "resolution":
+            key.append(-pixels)
+        elif name == "sharpness":
+            key.append(-sharp)
+        elif name == "age":
+            key.append(rec.get("mtime", 0.0))
+        elif name == "path":
+            key.extend((len(rec["path"]), rec["path"]))
+    return tuple(key)
+
+
+def build_clusters(groups: Iterable[Tuple[str, List[Dict]]], ranking: Sequence[str] = DEFAULT_RANKING,
+                   telemetry: Optional[Telemetry] = None,
+                   should_stop: Optional[Callable[[], bool]] = None,
+                   features: Optional[Dict[str, Tuple[int, float]]] = None) -> List[Dict]:
+    """Connected components of ``(kind, records)`` groups (as from ``build_dup_map``'s
+    ``groups_out``), largest first.
+
+    Each cluster is ``{"id", "keeper": path, "members": [records, keeper first],
+    "kinds": [edge kinds], "probable": [paths matched on sampled blocks only]}``.
+    ``features`` (path -> ``image_features``) is used and filled in, so repeated
+    calls read each image once.
+    """
+    unknown = set(ranking) - set(KEEPER_RANKINGS)
+    if unknown:
+        raise ValueError(f"Unknown keeper ranking: {', '.join(sorted(unknown))}")
+    uf = UnionFind()
+    index: Dict[str, int] = {}
+    records: List[Dict] = []
+    edge_kinds: List[Tuple[int, str]] = []
+    probable = set()
+    for kind, grp in groups:
+        ids = []
+        for r in grp:
+            i = index.get(r["path"])
+            if i is None:
+                i = index[r["path"]] = uf.add()
+                records.append(r)
+            ids.append(i)
+        for j in ids[1:]:
+            uf.union(ids[0], j)
+        if ids:
+            edge_kinds.append((ids[0], kind))
+        if kind == "probable":
+            probable.update(r["path"] for r in grp)
+
+    kinds_of: Dict[int, set] = {}
+    for i, kind in edge_kinds:
+        kinds_of.setdefault(uf.find(i), set()).add(kind)
+
+    clusters: List[Dict] = []
+    with maybe_timed(telemetry, "dupgraph", items=len(records)):
+        for members in uf.groups():
+            if should_stop is not None and should_stop():
+                break
+            recs = [records[i] for i in members]
+            kinds = kinds_of.get(uf.find(members[0]), set())
+            feats: Dict[str, Tuple[int, float]] = {}
+            if "perceptual" in kinds and {"resolution", "sharpness"} & set(ranking):
+                feats = features if features is not None else {}
+                for r in recs:
+                    if r.get("kind") == "image" and r["path"] not in feats:
+                        feats[r["path"]] = image_features(r["path"])
+            recs.sort(key=lambda r: _rank_key(r, ranking, feats))
+            clusters.append({
+                "id": cluster_id(r["path"] for r in recs),
+                "keeper": recs[0]["path"],
+                "members": recs,
+                "kinds": sorted(kinds),
+                "probable": sorted(r["path"] for r in recs if r["path"] in probable),
+            })
+    clusters.sort(key=lambda c: (-len(c["members"]), c["id"]))
+    return clusters
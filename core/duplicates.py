@@ -1,41 +1,111 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, List, Tuple, Optional, DefaultDict
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, DefaultDict, Sequence
 from collections import defaultdict
 
-from PIL import Image
+import numpy as np
 from imagehash import phash
 
-from .scanner import _hash_file
-from .utils import is_image_ext
+from .scanner import _hash_file, _sample_fingerprint, SAMPLE_THRESHOLD
+from .netio import hash_files_adaptive
+from .locality import HASH_ORDERS, physical_order
+from .docsim import SignatureCache, group_similar_documents
+from .dupgraph import DEFAULT_RANKING, MAX_EDGE_BITS, NeighbourGraph, build_clusters, image_features
+from .imagesim import PREFILTER_BITS, cascade_graph, popcount
+from .thumbs import ThumbnailCache
+from .telemetry import Telemetry, maybe_timed
+from .utils import is_image_ext, safe_open_image
 
 
-def group_by_exact_hash(records: List[Dict], algo: str = "md5") -> List[List[Dict]]:
+# Duplicate confidence levels for large files (>= sample_threshold):
+#   "full"    - hash every byte (exact)
+#   "sampled" - compare sparse block fingerprints only ("probable duplicate")
+#   "verify"  - sample first, then fully hash just the files whose samples match (exact)
+CONFIDENCE_LEVELS = ("full", "sampled", "verify")
+# Perceptual matching: "phash" decodes each image fully and hashes it with imagehash;
+# "cascade" hashes small decodes in batches and confirms dHash candidates by pHash (see imagesim.py)
+PERCEPTUAL_METHODS = ("phash", "cascade")
+
+
+def group_by_exact_hash(records: List[Dict], algo: str = "md5",
+                        telemetry: Optional[Telemetry] = None,
+                        confidence: str = "full",
+                        sample_threshold: int = SAMPLE_THRESHOLD,
+                        probable_out: Optional[List[List[Dict]]] = None,
+                        should_stop: Optional[Callable[[], bool]] = None,
+                        order: str = "locality") -> List[List[Dict]]:
+    """Groups of identical files. With ``confidence="sampled"`` groups of large
+    files are matched on sampled blocks only; those groups are also appended
+    to ``probable_out``. Once ``should_stop()`` is true the result is partial;
+    hashes already computed stay on the records. Files are read in on-disk
+    order (``order="locality"``, see locality.py) or in scan order."""
+    if confidence not in CONFIDENCE_LEVELS:
+        raise ValueError(f"Unknown confidence level: {confidence}")
+    if order not in HASH_ORDERS:
+        raise ValueError(f"Unknown hash order: {order}")
+    stop = should_stop or (lambda: False)
+
+    def ordered(recs: List[Dict]) -> List[Dict]:
+        return physical_order(recs, telemetry, should_stop) if order == "locality" else recs
+
     # Pre-group by file size to avoid hashing unique sizes
     size_groups: DefaultDict[int, List[Dict]] = defaultdict(list)
     for r in records:
         size_groups[r.get("size", -1)].append(r)
+    candidates = [(size, group) for size, group in size_groups.items() if len(group) > 1 and size > 0]
     buckets: DefaultDict[str, List[Dict]] = defaultdict(list)
+    probable: List[List[Dict]] = []
     key = f"hash_{algo}"
-    for size, group in size_groups.items():
-        if len(group) < 2 or size <= 0:
-            continue
-        for r in group:
-            hv = r.get(key)
-            if hv is None:
-                hv = _hash_file(r["path"], algo=algo)
-                r[key] = hv
-            if hv:
-                buckets[hv].append(r)
-    return [items for items in buckets.values() if len(items) > 1]
-
-
-def compute_phash(path: str) -> Optional[int]:
+    skey = f"hash_sample_{algo}"
+    # Files on network shares: hash the full-read candidates concurrently, with larger reads
+    remote = [r for size, group in candidates if confidence == "full" or size < sample_threshold
+              for r in group if r.get("remote") and r.get(key) is None]
+    if remote:
+        hash_files_adaptive(remote, algo=algo, telemetry=telemetry, should_stop=should_stop)
+    # Large files: sampled blocks first, every candidate in one sweep
+    if confidence != "full":
+        for r in ordered([r for size, group in candidates if size >= sample_threshold
+                          for r in group if r.get(skey) is None]):
+            if stop():
+                break
+            r[skey] = _sample_fingerprint(r["path"], r["size"], algo=algo, telemetry=telemetry,
+                                          should_stop=should_stop)
+    full: List[Dict] = []
+    for size, group in candidates:
+        if confidence != "full" and size >= sample_threshold:
+            samples: DefaultDict[str, List[Dict]] = defaultdict(list)
+            for r in group:
+                if r.get(skey):
+                    samples[r[skey]].append(r)
+            matched = [g for g in samples.values() if len(g) > 1]
+            if confidence == "sampled":
+                probable.extend(matched)
+                continue
+            # Only files whose samples agree need a full read
+            group = [r for g in matched for r in g]
+        full.extend(group)
+    for r in ordered([r for r in full if r.get(key) is None]):
+        if stop():
+            break
+        r[key] = _hash_file(r["path"], algo=algo, telemetry=telemetry, should_stop=should_stop)
+    for r in full:
+        if r.get(key):
+            buckets[r[key]].append(r)
+    if probable_out is not None:
+        probable_out.extend(probable)
+    return [items for items in buckets.values() if len(items) > 1] + probable
+
+
+def compute_phash(path: str, telemetry: Optional[Telemetry] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> Optional[int]:
     try:
-        img = Image.open(path)
-        img.load()
-        return int(str(phash(img)), 16)
+        with maybe_timed(telemetry, "decode"):
+            img = safe_open_image(path, should_stop=should_stop)
+        if img is None:
+            return None
+        with maybe_timed(telemetry, "phash"):
+            return int(str(phash(img)), 16)
     except Exception:
         return None
 
@@ -44,39 +114,277 @@ def hamming_distance(a: int, b: int) -> int:
     return (a ^ b).bit_count()
 
 
-def group_by_perceptual_hash(records: List[Dict], threshold: int = 5) -> List[List[Dict]]:
+def perceptual_graph(records: List[Dict], max_bits: int = MAX_EDGE_BITS,
+                     telemetry: Optional[Telemetry] = None,
+                     should_stop: Optional[Callable[[], bool]] = None,
+                     method: str = "cascade", use_color: bool = False,
+                     thumbs: Optional[ThumbnailCache] = None) -> NeighbourGraph:
+    """Similar-image candidate pairs up to ``max_bits`` pHash bits apart, with their distances."""
+    if method not in PERCEPTUAL_METHODS:
+        raise ValueError(f"Unknown perceptual method: {method}")
     imgs = [r for r in records if r.get("kind") == "image" or is_image_ext(r.get("ext", ""))]
+    if method == "cascade":
+        return cascade_graph(imgs, max_bits=max_bits, use_color=use_color, thumbs=thumbs,
+                             telemetry=telemetry, should_stop=should_stop)
     # Compute phash and bucket by prefix to reduce comparisons
-    buckets: DefaultDict[int, List[Tuple[Dict, int]]] = defaultdict(list)
+    buckets: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
     PREFIX_BITS = 12  # 12-bit prefix bucket (~4096 buckets)
+    hashed: List[Dict] = []
     for r in imgs:
+        if should_stop is not None and should_stop():
+            return NeighbourGraph([], [], [], [], max_bits)
         hv = r.get("phash")
         if hv is None:
-            hv = compute_phash(r["path"]) or 0
+            hv = compute_phash(r["path"], telemetry=telemetry, should_stop=should_stop) or 0
             r["phash"] = hv if hv != 0 else None
         if hv:
             prefix = hv >> (64 - PREFIX_BITS)
-            buckets[prefix].append((r, hv))
+            buckets[prefix].append((len(hashed), hv))
+            hashed.append(r)
 
-    groups: List[List[Dict]] = []
+    # Every close pair within the window is an edge; components are the groups,
+    # so A~B~C stays together whichever pair is seen first
+    ei: List[int] = []
+    ej: List[int] = []
+    ed: List[int] = []
     for _, items in buckets.items():
         items.sort(key=lambda t: t[1])
         n = len(items)
-        visited = set()
         for i in range(n):
-            if i in visited:
-                continue
-            ri, hi = items[i]
-            group = [ri]
-            visited.add(i)
+            ki, hi = items[i]
             # Compare with a limited window around i to keep near neighbors
             for j in range(i + 1, min(i + 50, n)):
-                if j in visited:
-                    continue
-                rj, hj = items[j]
-                if hamming_distance(hi, hj) <= threshold:
-                    group.append(rj)
-                    visited.add(j)
-            if len(group) > 1:
-                groups.append(group)
-    return groups
+                d = hamming_distance(hi, items[j][1])
+                if d <= max_bits:
+                    ei.append(ki)
+                    ej.append(items[j][0])
+                    ed.append(d)
+    return NeighbourGraph(hashed, ei, ej, ed, max_bits)
+
+
+def group_by_perceptual_hash(records: List[Dict], threshold: int = 5,
+                             telemetry: Optional[Telemetry] = None,
+                             should_stop: Optional[Callable[[], bool]] = None,
+                             method: str = "cascade", use_color: bool = False,
+                             thumbs: Optional[ThumbnailCache] = None) -> List[List[Dict]]:
+    graph = perceptual_graph(records, max_bits=threshold, telemetry=telemetry, should_stop=should_stop,
+                             method=method, use_color=use_color, thumbs=thumbs)
+    return graph.groups(threshold)
+
+
+def build_dup_map(records: List[Dict],
+                  use_exact: bool = True,
+                  use_perceptual: bool = False,
+                  fast_mode: bool = True,
+                  telemetry: Optional[Telemetry] = None,
+                  groups_out: Optional[List[Tuple[str, List[Dict]]]] = None,
+                  confidence: str = "full",
+                  probable: Optional[set] = None,
+                  should_stop: Optional[Callable[[], bool]] = None,
+                  perceptual_method: str = "cascade",
+                  thumbs: Optional[ThumbnailCache] = None,
+                  use_documents: bool = False,
+                  doc_cache: Optional[SignatureCache] = None,
+                  keepers: Optional[set] = None,
+                  clusters_out: Optional[List[Dict]] = None,
+                  keeper_ranking: Sequence[str] = DEFAULT_RANKING,
+                  perceptual_threshold: Optional[int] = None,
+                  graph_out: Optional[List[NeighbourGraph]] = None,
+                  features: Optional[Dict[str, Tuple[int, float]]] = None) -> Dict[str, int]:
+    """Map path -> number of other files in its duplicate cluster.
+
+    Exact, perceptual and (with ``use_documents``) near-duplicate document
+    groups are merged into clusters by ``dupgraph.build_clusters``, so
+    transitive matches share one cluster. When ``groups_out`` is given, every
+    group found is appended to it as ``("exact" | "probable" | "perceptual" |
+    "document", records)``; ``clusters_out`` receives the clusters and
+    ``keepers`` the path kept in each (ranked by ``keeper_ranking``). Paths
+    whose duplicates were matched on sampled blocks only are added to
+    ``probable``.
+
+    Similar images are grouped at ``perceptual_threshold`` pHash bits (default
+    4 in fast mode, else 5). With ``graph_out``, edges up to ``MAX_EDGE_BITS``
+    are kept and the graph is appended there for regrouping at other
+    thresholds; the image features of every linked image are then read into
+    ``features`` up front (see ``dupgraph.build_clusters``).
+    """
+    groups: List[Tuple[str, List[Dict]]] = []
+    # Duplicates: exact (or probable, for sampled large files)
+    sampled: List[List[Dict]] = []
+    exact_groups = group_by_exact_hash(records, algo="md5", telemetry=telemetry, confidence=confidence,
+                                       probable_out=sampled, should_stop=should_stop) if use_exact else []
+    sampled_ids = {id(g) for g in sampled}
+    groups.extend(("probable" if id(g) in sampled_ids else "exact", g) for g in exact_groups)
+
+    # Perceptual duplicates (optional, image-only); limit for speed if fast_mode
+    if use_perceptual:
+        subset = records
+        if fast_mode and len(records) > 3000:
+            subset = [r for i, r in enumerate(records) if r.get("kind") == "image" and (i % 2 == 0)][:3000]
+        threshold = perceptual_threshold if perceptual_threshold is not None else (4 if fast_mode else 5)
+        graph = perceptual_graph(subset, max_bits=max(threshold, MAX_EDGE_BITS) if graph_out is not None else threshold,
+                                 telemetry=telemetry, should_stop=should_stop, method=perceptual_method, thumbs=thumbs)
+        groups.extend(("perceptual", g) for g in graph.groups(threshold))
+        if graph_out is not None:
+            graph_out.append(graph)
+            if features is not None and {"resolution", "sharpness"} & set(keeper_ranking):
+                # Any threshold may join these: read them now, not while regrouping
+                with maybe_timed(telemetry, "dupgraph.features"):
+                    for r in graph.linked():
+                        if should_stop is not None and should_stop():
+                            break
+                        if r["path"] not in features:
+                            features[r["path"]] = image_features(r["path"])
+
+    # Near-duplicate documents (same text, different files), see docsim.py
+    if use_documents:
+        d_groups = group_similar_documents(records, cache=doc_cache, telemetry=telemetry, should_stop=should_stop)
+        groups.extend(("document", g) for g in d_groups)
+
+    if groups_out is not None:
+        groups_out.extend(groups)
+    return _cluster_map(groups, keeper_ranking, telemetry, should_stop, features, probable, keepers, clusters_out)
+
+
+def _cluster_map(groups: List[Tuple[str, List[Dict]]], keeper_ranking: Sequence[str],
+                 telemetry: Optional[Telemetry], should_stop: Optional[Callable[[], bool]],
+                 features: Optional[Dict[str, Tuple[int, float]]], probable: Optional[set],
+                 keepers: Optional[set], clusters_out: Optional[List[Dict]]) -> Dict[str, int]:
+    clusters = build_clusters(groups, ranking=keeper_ranking, telemetry=telemetry, should_stop=should_stop,
+                              features=features)
+    dup_map: Dict[str, int] = {}
+    for c in clusters:
+        for r in c["members"]:
+            dup_map[r["path"]] = len(c["members"]) - 1
+        if probable is not None:
+            probable.update(c["probable"])
+        if keepers is not None:
+            keepers.add(c["keeper"])
+    if clusters_out is not None:
+        clusters_out.extend(clusters)
+    return dup_map
+
+
+def _cross_pairs(kept: List[Dict], fresh: List[Dict], max_bits: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairs ``(kept index, fresh index, pHash distance)`` within ``max_bits``.
+    Where every record has aHash and dHash (cascade), pairs must also pass the
+    cascade prefilter, as in ``cascade_graph``."""
+    none = np.empty(0, dtype=np.int64)
+    if not kept or not fresh:
+        return none, none, none
+    cascade = all(r.get("ahash") is not None and r.get("dhash") is not None for r in kept + fresh)
+    ph = np.array([r.get("phash") or 0 for r in kept], dtype=np.uint64)
+    if cascade:
+        ah = np.array([r["ahash"] for r in kept], dtype=np.uint64)
+        dh = np.array([r["dhash"] for r in kept], dtype=np.uint64)
+    ei, ej, ed = [], [], []
+    for j, r in enumerate(fresh):
+        dist = popcount(ph ^ np.uint64(r.get("phash") or 0))
+        ok = dist <= max_bits
+        if cascade:
+            ok &= ((popcount(ah ^ np.uint64(r["ahash"])) <= PREFILTER_BITS)
+                   | (popcount(dh ^ np.uint64(r["dhash"])) <= PREFILTER_BITS))
+        k = np.nonzero(ok)[0]
+        ei.append(k)
+        ej.append(np.full(len(k), j, dtype=np.int64))
+        ed.append(dist[k])
+    return np.concatenate(ei), np.concatenate(ej), np.concatenate(ed)
+
+
+def update_perceptual_graph(graph: NeighbourGraph, records: List[Dict], changed: Iterable[str],
+                            telemetry: Optional[Telemetry] = None,
+                            should_stop: Optional[Callable[[], bool]] = None,
+                            method: str = "cascade",
+                            thumbs: Optional[ThumbnailCache] = None) -> NeighbourGraph:
+    """``graph`` after the files at ``changed`` paths were added, modified,
+    renamed or removed. Only the changed images are hashed; they are matched
+    against the hashes stored on the other images, and the edges between
+    unchanged images are kept as they are."""
+    changed = set(changed)
+    live = {r["path"]: r for r in records}
+    keep_idx = [k for k, r in enumerate(graph.records) if live.get(r["path"]) is r and r["path"] not in changed]
+    kept = [graph.records[k] for k in keep_idx]
+    candidates = [live[p] for p in sorted(changed) if p in live]
+    fresh = perceptual_graph(candidates, max_bits=graph.max_bits, telemetry=telemetry, should_stop=should_stop,
+                             method=method, thumbs=thumbs)
+    with maybe_timed(telemetry, "phash.update", items=len(fresh.records)):
+        remap = np.full(len(graph.records), -1, dtype=np.int64)
+        remap[keep_idx] = np.arange(len(kept))
+        a, b = remap[graph.i], remap[graph.j]
+        ok = (a >= 0) & (b >= 0)
+        ci, cj, cd = _cross_pairs(kept, fresh.records, graph.max_bits)
+        off = len(kept)
+        i = np.concatenate([a[ok], fresh.i.astype(np.int64) + off, ci])
+        j = np.concatenate([b[ok], fresh.j.astype(np.int64) + off, cj + off])
+        dist = np.concatenate([graph.dist[ok], fresh.dist, cd])
+    return NeighbourGraph(kept + fresh.records, i, j, dist, graph.max_bits)
+
+
+def update_dup_map(records: List[Dict], changed: Iterable[str], groups: List[Tuple[str, List[Dict]]],
+                   graph: Optional[NeighbourGraph] = None,
+                   use_exact: bool = True,
+                   use_perceptual: bool = False,
+                   fast_mode: bool = True,
+                   telemetry: Optional[Telemetry] = None,
+                   groups_out: Optional[List[Tuple[str, List[Dict]]]] = None,
+                   confidence: str = "full",
+                   probable: Optional[set] = None,
+                   should_stop: Optional[Callable[[], bool]] = None,
+                   perceptual_method: str = "cascade",
+                   thumbs: Optional[ThumbnailCache] = None,
+                   use_documents: bool = False,
+                   doc_cache: Optional[SignatureCache] = None,
+                   keepers: Optional[set] = None,
+                   clusters_out: Optional[List[Dict]] = None,
+                   keeper_ranking: Sequence[str] = DEFAULT_RANKING,
+                   perceptual_threshold: Optional[int] = None,
+                   graph_out: Optional[List[NeighbourGraph]] = None,
+                   features: Optional[Dict[str, Tuple[int, float]]] = None) -> Dict[str, int]:
+    """``build_dup_map`` after files changed, from the previous run's
+    non-perceptual ``groups`` and perceptual ``graph`` (its ``groups_out`` and
+    ``graph_out``). ``changed`` holds every path added, modified or removed,
+    and both paths of a rename.
+
+    Exact groups are hashed and grouped again only in the size buckets of
+    changed files; the others are kept. Similar images go through
+    ``update_perceptual_graph``. Documents are regrouped from their cached
+    signatures. Clusters are then rebuilt from the groups. Without a
+    previous ``graph`` similar images are not matched.
+    """
+    changed = set(changed)
+    live = {r["path"]: r for r in records}
+
+    def intact(grp: List[Dict]) -> bool:
+        return all(live.get(r["path"]) is r and r["path"] not in changed for r in grp)
+
+    out: List[Tuple[str, List[Dict]]] = []
+    if use_exact:
+        old = [(k, g) for k, g in groups if k in ("exact", "probable")]
+        sizes = {live[p].get("size", 0) for p in changed if p in live}
+        sizes.update(r.get("size", 0) for _, g in old if not intact(g) for r in g if live.get(r["path"]) is r)
+        out.extend((k, g) for k, g in old if intact(g) and g[0].get("size", 0) not in sizes)
+        bucket = [r for r in records if r.get("size", 0) in sizes]
+        sampled: List[List[Dict]] = []
+        fresh = group_by_exact_hash(bucket, algo="md5", telemetry=telemetry, confidence=confidence,
+                                    probable_out=sampled, should_stop=should_stop)
+        sampled_ids = {id(g) for g in sampled}
+        out.extend(("probable" if id(g) in sampled_ids else "exact", g) for g in fresh)
+
+    if use_perceptual and graph is not None:
+        threshold = perceptual_threshold if perceptual_threshold is not None else (4 if fast_mode else 5)
+        graph = update_perceptual_graph(graph, records, changed, telemetry=telemetry, should_stop=should_stop,
+                                        method=perceptual_method, thumbs=thumbs)
+        out.extend(("perceptual", g) for g in graph.groups(threshold))
+        if graph_out is not None:
+            graph_out.append(graph)
+
+    if use_documents:
+        d_groups = group_similar_documents(records, cache=doc_cache, telemetry=telemetry, should_stop=should_stop)
+        out.extend(("document", g) for g in d_groups)
+
+    if groups_out is not None:
+        groups_out.extend(out)
+    if features is not None:
+        for p in changed:
+            features.pop(p, None)
+    return _cluster_map(out, keeper_ranking, telemetry, should_stop, features, probable, keepers, clusters_out)
@@ -0,0 +1,249 @@
+"""Cascaded perceptual matching: cheap hashes first, pHash to confirm.
+
+Every image is decoded once, as small as possible (JPEG DCT scaling via
+``draft``, or the cached preview thumbnail when there is one), and reduced
+to a 32x32 grey (or RGB, for colour checks) array. Hashes are computed in
+NumPy over whole batches of those arrays rather than per image through
+``imagehash``:
+
+* aHash / dHash: block means and column differences, a few adds per pixel;
+* pHash: the same DCT-II low-frequency test as ``imagehash.phash``, done as
+  two matrix products per batch;
+* colour histogram (optional): 4x4x4 RGB bins.
+
+The three hashes are stored on the records, so later calls (threshold
+changes, watcher updates) reuse them without decoding again.
+
+Matching is a cascade. Pairs whose dHash or aHash differ in at most
+``prefilter`` bits are found by multi-index hashing: the 64 bits are cut
+into ``prefilter + 1`` bands, any such pair agrees exactly on at least one
+band, and only hashes sharing a band are compared. Only those candidates are confirmed by pHash distance (and histogram
+intersection when enabled). ``cascade_graph`` keeps the confirmed pairs with
+their distances, so groups at any threshold up to its maximum come from the
+stored edges. ``python -m benchmarks.simbench`` measures precision and
+recall against ``group_by_perceptual_hash``.
+"""
+from __future__ import annotations
+
+import io
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .dupgraph import MAX_EDGE_BITS, NeighbourGraph
+from .telemetry import Telemetry, maybe_timed
+from .thumbs import ThumbnailCache
+
+SIDE = 32
+BATCH = 256
+# dHash/aHash bits that may differ for a pair to reach the pHash check
+PREFILTER_BITS = 12
+# Minimum histogram intersection (0..1) when colour confirmation is on
+COLOR_MIN = 0.75
+# Neighbours each hash is compared with per band (see near_pairs)
+BUCKET_LIMIT = 64
+_NONE = np.empty(0, dtype=np.int64)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    # Unnormalised DCT-II rows; the scale does not change the median test
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * k * (2 * i + 1) / (2 * n)).astype(np.float32)
+
+
+def _pool_matrix(n_out: int, n_in: int) -> np.ndarray:
+    """Area-averaging weights resampling ``n_in`` samples to ``n_out``."""
+    m = np.zeros((n_out, n_in), dtype=np.float32)
+    scale = n_in / n_out
+    for o in range(n_out):
+        lo, hi = o * scale, (o + 1) * scale
+        for i in range(int(lo), min(n_in, int(np.ceil(hi)))):
+            m[o, i] = min(hi, i + 1) - max(lo, i)
+    return m / m.sum(axis=1, keepdims=True)
+
+
+_DCT = _dct_matrix(SIDE)
+_ROWS8 = _pool_matrix(8, SIDE)
+_COLS9 = _pool_matrix(9, SIDE)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def load_small(path: str, rec: Optional[Dict] = None, thumbs: Optional[ThumbnailCache] = None,
+               color: bool = False) -> Optional[np.ndarray]:
+    """``SIDE``x``SIDE`` uint8 array of the image (grey, or RGB with ``color``),
+    decoded as cheaply as possible; None if unreadable."""
+    mode = "RGB" if color else "L"
+    try:
+        img = None
+        if thumbs is not None and rec is not None:
+            data = thumbs.get(path, rec.get("size", 0), rec.get("mtime", 0.0))
+            if data is not None:
+                img = Image.open(io.BytesIO(data))
+        if img is None:
+            img = Image.open(path)
+            # JPEG: decode at 1/2..1/8 scale straight from the DCT coefficients
+            img.draft(mode, (SIDE * 2, SIDE * 2))
+        img = img.convert(mode)
+        if min(img.size) > SIDE * 4:
+            # Cheap integer box reduction first; the final resample then only sees a few pixels per output
+            img = img.reduce(max(1, min(img.size) // (SIDE * 2)))
+        return np.asarray(img.resize((SIDE, SIDE), Image.LANCZOS), dtype=np.uint8)
+    except Exception:
+        return None
+
+
+def _gray(batch: np.ndarray) -> np.ndarray:
+    # ITU-R 601-2 luma, as PIL's "L" conversion
+    return batch.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) booleans, most significant first -> (N,) uint64 (``imagehash`` bit order)."""
+    return np.packbits(bits.reshape(len(bits), 64), axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def ahash(gray: np.ndarray) -> np.ndarray:
+    small = np.einsum("ri,nij,cj->nrc", _ROWS8, gray, _ROWS8)
+    return _pack(small > small.mean(axis=(1, 2), keepdims=True))
+
+
+def dhash(gray: np.ndarray) -> np.ndarray:
+    small = np.einsum("ri,nij,cj->nrc", _ROWS8, gray, _COLS9)
+    return _pack(small[:, :, 1:] > small[:, :, :-1])
+
+
+def phash(gray: np.ndarray) -> np.ndarray:
+    dct = np.einsum("ki,nij,lj->nkl", _DCT[:8], gray, _DCT[:8])
+    med = np.median(dct.reshape(len(dct), 64), axis=1)[:, None, None]
+    return _pack(dct > med)
+
+
+def color_hist(batch: np.ndarray) -> np.ndarray:
+    """(N, 64) normalised 4x4x4 RGB histograms."""
+    q = (batch >> 6).astype(np.int32)
+    idx = (q[..., 0] * 16 + q[..., 1] * 4 + q[..., 2]).reshape(len(batch), -1)
+    hist = np.zeros((len(batch), 64), dtype=np.float32)
+    np.add.at(hist, (np.repeat(np.arange(len(batch)), idx.shape[1]), idx.ravel()), 1.0)
+    return hist / idx.shape[1]
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1)
+
+
+def _bands(max_bits: int) -> List[Tuple[int, int]]:
+    """``max_bits + 1`` contiguous ``(shift, width)`` bit ranges covering 64 bits."""
+    n = min(64, max_bits + 1)
+    edges = [64 * k // n for k in range(n + 1)]
+    return [(lo, hi - lo) for lo, hi in zip(edges, edges[1:])]
+
+
+def _rotl(x: np.ndarray, s: int) -> np.ndarray:
+    if s == 0:
+        return x
+    return (x << np.uint64(s)) | (x >> np.uint64(64 - s))
+
+
+def near_pairs(hashes: np.ndarray, max_bits: int, bucket: int = BUCKET_LIMIT) -> np.ndarray:
+    """``(i, j)``, ``i < j``, whose hashes differ in at most ``max_bits`` bits (multi-index hashing).
+
+    The 64 bits are cut into ``max_bits + 1`` bands. Two hashes within
+    ``max_bits`` of each other agree exactly on at least one band
+    (pigeonhole), so only hashes sharing a band value are compared. Per band,
+    the hashes are sorted by that band and then by the following bits, and each
+    is compared with its next ``bucket`` neighbours of the same band value.
+    Buckets up to ``bucket + 1`` hashes are therefore compared exhaustively.
+    Larger ones (very common band values) only within that sorted window,
+    which bounds the work at about ``bands * bucket * n``.
+    """
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    n = len(hashes)
+    out: List[np.ndarray] = []
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    for shift, width in _bands(max_bits):
+        # The band becomes the top bits; the bits after it order hashes within a bucket
+        rot = _rotl(hashes, 64 - shift - width)
+        order = np.argsort(rot, kind="stable")
+        srt = rot[order]
+        keys = srt >> np.uint64(64 - width)
+        for d in range(1, min(bucket, n - 1) + 1):
+            same = keys[:-d] == keys[d:]
+            if not same.any():
+                break
+            # Rotation keeps Hamming distances, so the sorted copy can be compared directly
+            k = np.nonzero(same & (popcount(srt[:-d] ^ srt[d:]) <= max_bits))[0]
+            if len(k):
+                a, b = order[k], order[k + d]
+                out.append(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1))
+    if not out:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(out).astype(np.int64), axis=0)
+
+
+def cascade_graph(records: List[Dict], max_bits: int = MAX_EDGE_BITS, prefilter: int = PREFILTER_BITS,
+                  use_color: bool = False, thumbs: Optional[ThumbnailCache] = None,
+                  telemetry: Optional[Telemetry] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> NeighbourGraph:
+    """Candidate pairs among ``records`` whose pHash differs in at most
+    ``max_bits`` bits, with that distance. Sets ``ahash``, ``dhash`` and
+    ``phash`` (same bit layout as ``compute_phash``) on each image record;
+    records that already carry all three are not decoded again, unless
+    colour confirmation needs their histograms."""
+    kept: List[Dict] = []
+    h_parts = []
+    todo = records if use_color else [r for r in records if r.get("ahash") is None or r.get("dhash") is None]
+    if len(todo) < len(records):
+        pending = {id(r) for r in todo}
+        kept = [r for r in records if id(r) not in pending]
+    for start in range(0, len(todo), BATCH):
+        if should_stop is not None and should_stop():
+            return NeighbourGraph([], _NONE, _NONE, _NONE, max_bits)
+        arrays: List[np.ndarray] = []
+        decoded: List[Dict] = []
+        with maybe_timed(telemetry, "decode", items=min(BATCH, len(todo) - start)):
+            for r in todo[start:start + BATCH]:
+                arr = load_small(r["path"], r, thumbs, color=use_color)
+                if arr is not None:
+                    arrays.append(arr)
+                    decoded.append(r)
+        if not arrays:
+            continue
+        with maybe_timed(telemetry, "phash", items=len(arrays)):
+            batch = np.stack(arrays)
+            gray = _gray(batch) if use_color else batch.astype(np.float32)
+            for r, av, dv, pv in zip(decoded, ahash(gray).tolist(), dhash(gray).tolist(), phash(gray).tolist()):
+                r["ahash"], r["dhash"], r["phash"] = int(av), int(dv), int(pv) or None
+            if use_color:
+                h_parts.append(color_hist(batch))
+        kept.extend(decoded)
+    if not kept:
+        return NeighbourGraph([], _NONE, _NONE, _NONE, max_bits)
+    ah = np.array([r["ahash"] for r in kept], dtype=np.uint64)
+    dh = np.array([r["dhash"] for r in kept], dtype=np.uint64)
+    ph = np.array([r.get("phash") or 0 for r in kept], dtype=np.uint64)
+
+    with maybe_timed(telemetry, "phash.match", items=len(kept)):
+        pairs = np.unique(np.concatenate([near_pairs(ah, prefilter), near_pairs(dh, prefilter)]), axis=0)
+        a, b = pairs[:, 0], pairs[:, 1]
+        dist = popcount(ph[a] ^ ph[b])
+        ok = dist <= max_bits
+        if use_color:
+            hist = np.concatenate(h_parts)
+            ok &= np.minimum(hist[a], hist[b]).sum(axis=1) >= COLOR_MIN
+    return NeighbourGraph(kept, a[ok], b[ok], dist[ok], max_bits)
+
+
+def group_cascade(records: List[Dict], threshold: int = 5, prefilter: int = PREFILTER_BITS,
+                  use_color: bool = False, thumbs: Optional[ThumbnailCache] = None,
+                  telemetry: Optional[Telemetry] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> List[List[Dict]]:
+    """Groups of similar images among ``records`` (pHash within ``threshold`` bits)."""
+    graph = cascade_graph(records, max_bits=threshold, prefilter=prefilter, use_color=use_color, thumbs=thumbs,
+                          telemetry=telemetry, should_stop=should_stop)
+    return graph.groups(threshold)
@@ -0,0 +1,133 @@
+"""Read files in on-disk order, and tell the OS how they are being read.
+
+On a spinning disk each jump between files costs a seek (several ms), far
+more than reading a typical file. ``physical_order`` sorts records so a
+pass over them sweeps the disk in one direction. It uses the best key it can get:
+
+* Linux: the physical offset of the file's first extent (``FIEMAP`` ioctl);
+* elsewhere, or where FIEMAP is unsupported: the inode number, which most
+  file systems hand out roughly in allocation order;
+* no usable inode (e.g. FAT): directory, then file name.
+
+Records on different devices never interleave; each device is swept in turn.
+
+``advise`` wraps ``posix_fadvise``. Hashing a full file is one sequential
+pass: read-ahead is raised, and for large files the pages are dropped when
+done, so hashing terabytes does not evict everything else from the page
+cache. Smaller files are left cached because the analyzer reads images
+again. On Windows, ``sequential_opener`` opens with ``O_SEQUENTIAL`` (the
+``FILE_FLAG_SEQUENTIAL_SCAN`` hint) instead.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import sys
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .telemetry import Telemetry, maybe_timed
+
+# Orders for hashing jobs: "locality" sorts by physical position, "scan" keeps scan order
+HASH_ORDERS = ("locality", "scan")
+# Files at least this large have their pages dropped from the cache once hashed
+DROP_CACHE_MIN = 32 * 1024 * 1024
+
+_FS_IOC_FIEMAP = 0xC020660B
+# struct fiemap: fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+_FIEMAP = struct.Struct("=QQIIII")
+# struct fiemap_extent: fe_logical, fe_physical, fe_length, 2 reserved, fe_flags, 3 reserved
+_EXTENT = struct.Struct("=QQQQQIIII")
+# Extents whose physical offset is not meaningful: unknown, delayed allocation, inline data
+_NO_OFFSET = 0x2 | 0x4 | 0x200
+# Devices where FIEMAP failed once; they fall back to inode order
+_no_fiemap: Set[int] = set()
+
+_RANK_EXTENT, _RANK_INODE, _RANK_PATH = 0, 1, 2
+
+
+def first_extent(fd: int) -> Optional[int]:
+    """Physical byte offset of the first extent of an open file (Linux only), or None."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return None
+    buf = bytearray(_FIEMAP.size + _EXTENT.size)
+    _FIEMAP.pack_into(buf, 0, 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+    fcntl.ioctl(fd, _FS_IOC_FIEMAP, buf)
+    if _FIEMAP.unpack_from(buf)[3] < 1:
+        return None  # empty or sparse-only
+    extent = _EXTENT.unpack_from(buf, _FIEMAP.size)
+    if extent[5] & _NO_OFFSET:
+        return None
+    return extent[1]
+
+
+def physical_key(path: str) -> Tuple[int, int, int, str]:
+    """``(device, rank, position, path)``: sorts files on one device in on-disk order."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (sys.maxsize, _RANK_PATH, 0, path)
+    if st.st_dev not in _no_fiemap and fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            fd = -1
+        if fd >= 0:
+            try:
+                pos = first_extent(fd)
+                if pos is not None:
+                    return (st.st_dev, _RANK_EXTENT, pos, path)
+            except OSError:
+                _no_fiemap.add(st.st_dev)
+            finally:
+                os.close(fd)
+    if st.st_ino:
+        return (st.st_dev, _RANK_INODE, st.st_ino, path)
+    return (st.st_dev, _RANK_PATH, 0, path)
+
+
+def physical_order(records: List[Dict], telemetry: Optional[Telemetry] = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> List[Dict]:
+    """``records`` sorted for reading in one sweep per device. Remote files keep
+    their scan order (at the end). Stopping returns the remaining records unsorted."""
+    local = [r for r in records if not r.get("remote")]
+    remote = [r for r in records if r.get("remote")]
+    if len(local) < 2:
+        return local + remote
+    keys: Dict[str, Tuple[int, int, int, str]] = {}
+    with maybe_timed(telemetry, "locality", items=len(local)):
+        for r in local:
+            if should_stop is not None and should_stop():
+                return local + remote
+            if r["path"] not in keys:
+                keys[r["path"]] = physical_key(r["path"])
+        # Directory order for files without a position: (folder, name) rather than full path order
+        local.sort(key=lambda r: (keys[r["path"]][:3], os.path.dirname(r["path"]), r["path"]))
+    return local + remote
+
+
+def advise(fd: int, advice: str, length: int = 0) -> None:
+    """``posix_fadvise`` hint for the whole file where supported: ``"sequential"``
+    (plus no-reuse), ``"random"``, or ``"done"`` (drop cached pages once
+    ``length`` reaches ``DROP_CACHE_MIN``)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        if advice == "sequential":
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_NOREUSE)
+        elif advice == "random":
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_RANDOM)
+        elif advice == "done" and length >= DROP_CACHE_MIN:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except (OSError, AttributeError, ValueError):
+        pass
+
+
+def sequential_opener(path: str, flags: int) -> int:
+    """``open(..., opener=)`` adding the Windows sequential-scan hint where it exists."""
+    return os.open(path, flags | getattr(os, "O_SEQUENTIAL", 0))
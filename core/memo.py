@@ -0,0 +1,164 @@
+"""Analysis results by content: each distinct file content is analysed once.
+
+Keys are ``"<content md5>:v<ANALYZER_VERSION>"``, so byte-identical copies
+share one entry and a new analyzer version simply misses. Only results that
+depend on the bytes alone are stored: quality features, and CLIP labels per
+label set once AI has run. Anything derived from the name is recomputed per
+path.
+
+Two levels:
+
+* memory: an LRU of recent entries, so copies met in one run cost a lookup;
+* disk: SQLite under the user cache folder, kept across runs. Writes are
+  batched. Past ``max_mb`` of stored results the least recently used entries
+  are dropped down to three quarters of the budget.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .scanner import _hash_file
+from .telemetry import Telemetry
+from .utils import user_cache_dir
+
+FLUSH_EVERY = 200
+
+
+def content_key(rec: Dict, telemetry: Optional[Telemetry] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+    """MD5 of the record's file, from the record if duplicate grouping already
+    read it, else by hashing it (and storing it on the record)."""
+    hv = rec.get("hash_md5")
+    if hv is None and not rec.get("remote"):
+        hv = _hash_file(rec["path"], telemetry=telemetry, should_stop=should_stop)
+        if hv:
+            rec["hash_md5"] = hv
+    return hv
+
+
+class AnalysisCache:
+    """Content-keyed analysis results: memory LRU over a size-bounded SQLite file."""
+
+    def __init__(self, path: Optional[str] = None, max_mb: int = 64, memory_entries: int = 20_000) -> None:
+        self.path = path or os.path.join(user_cache_dir("analysis"), "results.db")
+        self.max_bytes = max_mb * 1024 * 1024
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        self._mem: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending: Dict[str, str] = {}
+        self._touched: Dict[str, float] = {}
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                # Used by whichever worker thread runs analysis
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, data TEXT, used REAL);
+                    CREATE INDEX IF NOT EXISTS results_used ON results (used);
+                """)
+                (self._bytes,) = self._conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM results").fetchone()
+            except (OSError, sqlite3.Error):
+                self._conn = None
+        return self._conn
+
+    def _remember(self, key: str, value: Dict) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+                self.hits["memory"] += 1
+                return value
+            data = self._pending.get(key)
+            if data is None:
+                conn = self._db()
+                if conn is not None:
+                    try:
+                        row = conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+                        data = row[0] if row else None
+                    except sqlite3.Error:
+                        data = None
+            if data is None:
+                self.hits["miss"] += 1
+                return None
+            self.hits["disk"] += 1
+            value = json.loads(data)
+            self._remember(key, value)
+            self._touched[key] = time.time()
+            if len(self._touched) >= FLUSH_EVERY:
+                self._flush()
+            return value
+
+    def put(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._remember(key, value)
+            self._pending[key] = json.dumps(value, separators=(",", ":"))
+            if len(self._pending) >= FLUSH_EVERY:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        pending, touched = self._pending, self._touched
+        self._pending, self._touched = {}, {}
+        conn = self._db()
+        if conn is None or not (pending or touched):
+            return
+        now = time.time()
+        try:
+            with conn:
+                old = self._sizes(conn, list(pending))
+                conn.executemany("INSERT OR REPLACE INTO results (key, data, used) VALUES (?, ?, ?)",
+                                 [(k, data, now) for k, data in pending.items()])
+                conn.executemany("UPDATE results SET used = ? WHERE key = ?",
+                                 [(t, k) for k, t in touched.items() if k not in pending])
+                self._bytes += sum(len(data) for data in pending.values()) - sum(old.values())
+                if self._bytes > self.max_bytes:
+                    self._evict(conn, self._bytes - self.max_bytes * 3 // 4)
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _sizes(conn: sqlite3.Connection, keys: List[str]) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            out.update(conn.execute(f"SELECT key, LENGTH(data) FROM results WHERE key IN ({','.join('?' * len(part))})",
+                                    part).fetchall())
+        return out
+
+    def _evict(self, conn: sqlite3.Connection, excess: int) -> None:
+        victims: List[Tuple[str]] = []
+        freed = 0
+        for key, n in conn.execute("SELECT key, LENGTH(data) FROM results ORDER BY used"):
+            if freed >= excess:
+                break
+            victims.append((key,))
+            freed += n
+        conn.executemany("DELETE FROM results WHERE key = ?", victims)
+        self._bytes -= freed
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,167 @@
+"""Move engine used by "Move Selected".
+
+The destination is listed once and collisions are resolved against that
+in-memory name set. Files on the same volume as the destination are renamed
+(atomic, no data copied). Everything else is copied by a small thread pool,
+using ``os.copy_file_range`` where the kernel offers it (which can also
+reflink or copy server-side) and ``shutil.copyfile`` otherwise (sendfile on
+Linux, fcopyfile on macOS). Each copy goes to a ``.neatcore-part`` file, is
+checked, renamed into place and only then is the source unlinked.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .utils import windows_long_path
+
+ActionStep = Tuple[List[str], List[Tuple[str, str]]]
+
+PART_SUFFIX = ".neatcore-part"
+# errno values meaning "copy_file_range cannot do this pair of files"
+_CFR_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF,
+                    getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL)}
+
+
+def _key(name: str) -> str:
+    # Case-insensitive where the OS is
+    return os.path.normcase(name)
+
+
+def list_names(folder: str) -> Set[str]:
+    """Names already present in ``folder``, normalised for collision checks."""
+    with os.scandir(windows_long_path(folder)) as it:
+        return {_key(e.name) for e in it}
+
+
+def reserve_name(base: str, names: Set[str]) -> str:
+    """Pick ``base`` or ``name (1).ext``, ``name (2).ext``… not in ``names`` and claim it."""
+    name = base
+    stem, ext = os.path.splitext(base)
+    i = 1
+    while _key(name) in names:
+        name = f"{stem} ({i}){ext}"
+        i += 1
+    names.add(_key(name))
+    return name
+
+
+def _copy_file_range(src_fd: int, dst_fd: int) -> bool:
+    """Kernel-side copy; False if unsupported for these files (nothing written)."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    while True:
+        try:
+            n = os.copy_file_range(src_fd, dst_fd, 1 << 30)
+        except OSError as e:
+            if copied == 0 and e.errno in _CFR_UNSUPPORTED:
+                return False
+            raise
+        if n == 0:
+            return True
+        copied += n
+
+
+def copy_data(src: str, dst: str) -> None:
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        if _copy_file_range(fs.fileno(), fd.fileno()):
+            return
+    shutil.copyfile(src, dst)
+
+
+def _copy_then_unlink(src: str, target: str, verify: bool) -> int:
+    """Copy ``src`` to ``target`` via a part file, then remove ``src``; returns bytes copied."""
+    lsrc = windows_long_path(src)
+    part = windows_long_path(target + PART_SUFFIX)
+    try:
+        copy_data(lsrc, part)
+        shutil.copystat(lsrc, part)
+        size = os.stat(lsrc).st_size
+        if verify and os.stat(part).st_size != size:
+            raise OSError(f"Size mismatch after copy ({os.stat(part).st_size} != {size})")
+        os.replace(part, windows_long_path(target))
+    except BaseException:
+        try:
+            os.unlink(part)
+        except OSError:
+            pass
+        raise
+    os.unlink(lsrc)
+    return size
+
+
+def move_files(paths: List[str], dest: str, batch_size: int = 50, workers: int = 4, verify: bool = True,
+               should_stop: Optional[Callable[[], bool]] = None,
+               stats: Optional[Dict] = None) -> Iterator[ActionStep]:
+    """Move files into ``dest``, renaming on collisions as ``name (1).ext``.
+
+    ``stats`` (if given) is filled with renamed, copied, bytes_copied, seconds
+    and mb_per_s (copy throughput).
+    """
+    stats = stats if stats is not None else {}
+    stats.update(renamed=0, copied=0, bytes_copied=0)
+    t0 = time.perf_counter()
+    names = list_names(dest)
+    dest_dev = os.stat(windows_long_path(dest)).st_dev
+    ok: List[str] = []
+    errs: List[Tuple[str, str]] = []
+    pending: Dict[Future, str] = {}
+    max_pending = workers * 4
+
+    def harvest(futs) -> None:
+        for fut in futs:
+            p = pending.pop(fut)
+            try:
+                stats["bytes_copied"] += fut.result()
+                stats["copied"] += 1
+                ok.append(p)
+            except Exception as e:
+                errs.append((p, str(e)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="neatcore-move") as pool:
+        for p in paths:
+            if should_stop is not None and should_stop():
+                break
+            try:
+                st = os.stat(windows_long_path(p))
+                target = os.path.join(dest, reserve_name(os.path.basename(p), names))
+                copy = st.st_dev != dest_dev
+                if not copy:
+                    try:
+                        os.rename(windows_long_path(p), windows_long_path(target))
+                        stats["renamed"] += 1
+                        ok.append(p)
+                    except OSError as e:
+                        # st_dev can match across bind mounts that still refuse renames
+                        if e.errno != errno.EXDEV:
+                            raise
+                        copy = True
+                if copy:
+                    pending[pool.submit(_copy_then_unlink, p, target, verify)] = p
+            except Exception as e:
+                errs.append((p, str(e)))
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                harvest(done)
+            else:
+                harvest([f for f in pending if f.done()])
+            if len(ok) + len(errs) >= batch_size:
+                yield ok, errs
+                ok, errs = [], []
+        # Copies already started are finished even when cancelled
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            harvest(done)
+            if len(ok) + len(errs) >= batch_size:
+                yield ok, errs
+                ok, errs = [], []
+    secs = time.perf_counter() - t0
+    stats["seconds"] = secs
+    stats["mb_per_s"] = stats["bytes_copied"] / (1024 * 1024) / secs if secs > 0 else 0.0
+    if ok or errs:
+        yield ok, errs
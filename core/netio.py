@@ -0,0 +1,266 @@
+"""Adaptive concurrency for high-latency (network) filesystems.
+
+On SMB/NFS every listing, stat and read waits for a round trip, so a serial
+scan spends most of its time idle. Here that work is spread over a thread
+pool. The number of operations in flight is tuned AIMD-style against
+measured throughput: it grows by ``step`` while throughput keeps rising, and
+is cut by ``backoff`` when throughput drops or operations fail. Remote files
+are also read in larger chunks.
+
+Roots are treated as remote when the OS reports a network filesystem or when
+a quick stat probe shows high per-operation latency.
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .scanner import _hash_file, make_record
+from .telemetry import Telemetry
+from .utils import normalize_path
+
+# Median stat latency above this marks a root as high-latency
+LATENCY_THRESHOLD = 0.002
+REMOTE_CHUNK = 4 * 1024 * 1024
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "ceph",
+                    "glusterfs", "fuse.rclone", "davfs", "webdav"}
+
+
+class AIMDController:
+    """Concurrency limit tuned by additive increase / multiplicative decrease.
+
+    Call ``record(items)`` as work completes; every ``interval`` seconds the
+    throughput of the last window is compared with the previous one.
+    """
+
+    def __init__(self, start: int = 4, min_limit: int = 1, max_limit: int = 64, step: int = 2,
+                 backoff: float = 0.7, interval: float = 0.5, tolerance: float = 0.05) -> None:
+        self.limit = start
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.step = step
+        self.backoff = backoff
+        self.interval = interval
+        self.tolerance = tolerance
+        self.history: List[Tuple[int, float]] = []  # (limit, throughput) per window
+        self._lock = threading.Lock()
+        self._window_start = time.perf_counter()
+        self._window_items = 0.0
+        self._prev: Optional[float] = None
+
+    def record(self, items: float = 1) -> None:
+        with self._lock:
+            self._window_items += items
+            now = time.perf_counter()
+            elapsed = now - self._window_start
+            if elapsed < self.interval:
+                return
+            rate = self._window_items / elapsed
+            self.history.append((self.limit, rate))
+            if self._prev is None or rate >= self._prev * (1 + self.tolerance):
+                # Still gaining: probe one step higher
+                self.limit = min(self.max_limit, self.limit + self.step)
+            elif rate < self._prev * (1 - self.tolerance * 3):
+                self.limit = max(self.min_limit, int(self.limit * self.backoff))
+            self._prev = rate
+            self._window_start = now
+            self._window_items = 0.0
+
+    def failed(self) -> None:
+        """An operation timed out or errored: back off immediately."""
+        with self._lock:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+
+
+def _fs_type(path: str) -> Optional[str]:
+    """Filesystem type of the mount holding ``path`` (Linux), if known."""
+    try:
+        best, fstype = "", None
+        with open("/proc/mounts", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3:
+                    mnt = parts[1].replace("\\040", " ")
+                    if path == mnt or path.startswith(mnt.rstrip("/") + "/"):
+                        if len(mnt) > len(best):
+                            best, fstype = mnt, parts[2]
+        return fstype
+    except OSError:
+        return None
+
+
+def _is_network_path(path: str) -> bool:
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return True
+        try:
+            import ctypes
+
+            drive = os.path.splitdrive(path)[0] + "\\"
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    fstype = _fs_type(path)
+    return fstype is not None and fstype.lower() in NETWORK_FS_TYPES
+
+
+def probe_latency(path: str, samples: int = 8) -> float:
+    """Median seconds per stat for a few entries of ``path`` (0.0 if empty)."""
+    times: List[float] = []
+    try:
+        t0 = time.perf_counter()
+        with os.scandir(path) as it:
+            names = [e.path for _, e in zip(range(samples), it)]
+        times.append(time.perf_counter() - t0)
+    except OSError:
+        return 0.0
+    for p in names:
+        t0 = time.perf_counter()
+        try:
+            os.stat(p)
+        except OSError:
+            pass
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) if times else 0.0
+
+
+def detect_remote(path: str, threshold: float = LATENCY_THRESHOLD) -> Tuple[bool, float]:
+    """``(remote, median_latency_s)``: network filesystem, or slow enough to behave like one."""
+    path = normalize_path(path)
+    latency = probe_latency(path)
+    return _is_network_path(path) or latency >= threshold, latency
+
+
+def run_adaptive(fn: Callable, items: Iterable, controller: AIMDController, max_workers: int = 64,
+                 expand: Optional[Callable[[object], Iterable]] = None,
+                 weight: Optional[Callable[[object, object], float]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[object, object]]:
+    """Yield ``(item, result)`` as ``fn(item)`` completes, keeping ``controller.limit`` in flight.
+
+    ``expand(result)`` may return more items to queue (directories found
+    while listing). ``weight(item, result)`` is what the controller counts
+    as throughput (default 1 per item). Exceptions are yielded as results.
+    """
+    queue = list(items)
+    queue.reverse()
+    inflight: Dict[Future, object] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neatcore-netio") as pool:
+        while queue or inflight:
+            if should_stop is not None and should_stop():
+                for fut in inflight:
+                    fut.cancel()
+                return
+            while queue and len(inflight) < controller.limit:
+                item = queue.pop()
+                inflight[pool.submit(fn, item)] = item
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                item = inflight.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    controller.failed()
+                    yield item, e
+                    continue
+                controller.record(weight(item, result) if weight is not None else 1)
+                if expand is not None:
+                    queue.extend(expand(result))
+                yield item, result
+
+
+# Files per stat task; a directory with many files is stat'ed by several workers
+STAT_BATCH = 32
+
+
+def _make_remote_record(path: str, name: str, st: os.stat_result) -> Dict:
+    rec = make_record(normalize_path(path), name, st)
+    rec["remote"] = True
+    return rec
+
+
+def _scan_task(task: Tuple[str, object], exclude_dir_names: List[str],
+               skip_paths: Optional[set] = None) -> Tuple[List[Dict], List[Tuple[str, object]]]:
+    """Run one listing or stat task; returns (records, follow-up tasks)."""
+    kind, arg = task
+    records: List[Dict] = []
+    follow: List[Tuple[str, object]] = []
+    if kind == "stat":
+        for path, name in arg:
+            try:
+                records.append(_make_remote_record(path, name, os.stat(path)))
+            except OSError:
+                continue
+        return records, follow
+    pending: List[Tuple[str, str]] = []
+    with os.scandir(arg) as it:
+        for e in it:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name.lower() not in exclude_dir_names:
+                        follow.append(("dir", e.path))
+                    continue
+                if e.is_symlink() and e.is_dir():
+                    # Links to folders: os.walk lists them as folders and does not follow them
+                    continue
+                if skip_paths and normalize_path(e.path) in skip_paths:
+                    continue
+                if os.name == "nt":
+                    # Windows fills DirEntry.stat from the listing itself: no extra round trip
+                    records.append(_make_remote_record(e.path, e.name, e.stat()))
+                else:
+                    pending.append((e.path, e.name))
+            except OSError:
+                continue
+    for k in range(0, len(pending), STAT_BATCH):
+        follow.append(("stat", pending[k:k + STAT_BATCH]))
+    return records, follow
+
+
+def iter_dir_adaptive(path: str, exclude_dir_names: Optional[List[str]] = None,
+                      telemetry: Optional[Telemetry] = None,
+                      controller: Optional[AIMDController] = None,
+                      should_stop: Optional[Callable[[], bool]] = None,
+                      skip_paths: Optional[set] = None) -> Iterator[Dict]:
+    """Like ``iter_dir``, but lists directories and stats files many at a time.
+
+    Records are marked ``remote`` so later stages use larger reads. Order
+    is not depth-first.
+    """
+    excluded = [n.lower() for n in (exclude_dir_names or [])]
+    controller = controller or AIMDController()
+    t_last = time.perf_counter()
+    results = run_adaptive(lambda t: _scan_task(t, excluded, skip_paths), [("dir", normalize_path(path))], controller,
+                           expand=lambda res: res[1], weight=lambda _t, res: len(res[0]) + 1,
+                           should_stop=should_stop)
+    for task, result in results:
+        if isinstance(result, Exception):
+            continue
+        if telemetry is not None:
+            now = time.perf_counter()
+            telemetry.add("scan.dirs" if task[0] == "dir" else "scan", now - t_last,
+                          items=1 if task[0] == "dir" else len(result[0]))
+            telemetry.gauge("netio.concurrency", controller.limit)
+            t_last = now
+        yield from result[0]
+
+
+def hash_files_adaptive(records: List[Dict], algo: str = "md5", telemetry: Optional[Telemetry] = None,
+                        controller: Optional[AIMDController] = None, chunk: int = REMOTE_CHUNK,
+                        should_stop: Optional[Callable[[], bool]] = None) -> None:
+    """Fill ``hash_<algo>`` for ``records`` with adaptive read concurrency (tuned on bytes/s)."""
+    key = f"hash_{algo}"
+    controller = controller or AIMDController()
+    by_path = {r["path"]: r for r in records if r.get(key) is None}
+    for path, hv in run_adaptive(lambda p: _hash_file(p, algo=algo, chunk=chunk, telemetry=telemetry,
+                                                      should_stop=should_stop),
+                                 list(by_path), controller,
+                                 weight=lambda p, _hv: by_path[p].get("size", 0) + 1,
+                                 should_stop=should_stop):
+        by_path[path][key] = None if isinstance(hv, Exception) else hv
+        if telemetry is not None:
+            telemetry.gauge("netio.read_concurrency", controller.limit)
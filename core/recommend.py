@@ -5,8 +5,12 @@ from typing import Dict, List
 
 from .utils import file_age_days, in_downloads_path, looks_temporary
 
+# Bump when a rule below changes: stored recommendations are then recomputed (see stages.py)
+RULES_VERSION = 1
 
-def recommend_for_record(rec: Dict, analysis: Dict, dup_count: int = 0) -> Dict:
+
+def recommend_for_record(rec: Dict, analysis: Dict, dup_count: int = 0, dup_probable: bool = False,
+                         dup_keeper: bool = False) -> Dict:
     reasons: List[str] = []
     primary = "ignore"
     score = 0
@@ -33,8 +37,15 @@ def recommend_for_record(rec: Dict, analysis: Dict, dup_count: int = 0) -> Dict:
         primary = "delete"
         score += 2
 
-    # Duplicates
-    if dup_count > 0:
+    # Duplicates; the kept copy of each cluster is never suggested for removal,
+    # and sampled matches are not byte-verified, so only flag them for review
+    if dup_count > 0 and dup_keeper:
+        reasons.append(f"Kept copy of {dup_count + 1} duplicates")
+    elif dup_count > 0 and dup_probable:
+        reasons.append("Probable duplicate (sampled, not verified)")
+        primary = "review-duplicates"
+        score += 2
+    elif dup_count > 0:
         reasons.append("Duplicate detected")
         primary = "delete-duplicates"
         score += 3
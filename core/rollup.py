@@ -0,0 +1,215 @@
+"""Per-directory size rollups kept current while records stream in.
+
+Every record adds its size to its folder and to each ancestor, so the totals
+(bytes, files, bytes per kind, reclaimable duplicate bytes) of any folder
+are always available and an update costs O(depth). The treemap view renders
+from these totals, not from the row list.
+
+The largest files and the folders holding the most bytes directly (their
+own files, not subfolders; every ancestor would otherwise outrank its
+children) are kept in bounded min-heaps, so top-N lists are ready at any
+point during the scan.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .dedupe import pick_keeper
+
+
+class DirNode:
+    __slots__ = ("name", "path", "parent", "children", "bytes", "files", "own_bytes", "by_kind", "reclaimable")
+
+    def __init__(self, name: str, path: str, parent: Optional["DirNode"]) -> None:
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children: Dict[str, DirNode] = {}
+        self.bytes = 0
+        self.files = 0
+        # Bytes of the files directly in this folder
+        self.own_bytes = 0
+        self.by_kind: Dict[str, int] = {}
+        self.reclaimable = 0
+
+    def dominant_kind(self) -> str:
+        return max(self.by_kind.items(), key=lambda kv: kv[1])[0] if self.by_kind else "other"
+
+
+def _split_dir(dirpath: str) -> List[str]:
+    """``/home/u/x`` -> ``["/", "home", "u", "x"]``; ``C:\\Users`` -> ``["C:\\", "Users"]``."""
+    drive, rest = os.path.splitdrive(dirpath)
+    return [drive + os.sep] + [p for p in re.split(r"[\\/]+", rest) if p]
+
+
+class SpaceTree:
+    """Folder tree of size totals. Safe to update from a worker thread while
+    the GUI reads it; hold ``lock`` when walking nodes directly."""
+
+    def __init__(self, top_n: int = 50) -> None:
+        self.top_n = top_n
+        self.lock = threading.RLock()
+        self.root = DirNode("", "", None)
+        self._dirs: Dict[str, DirNode] = {}
+        self._top_files: List[Tuple[int, str]] = []
+        self._top_file_paths: set = set()
+        # (own_bytes when pushed, path); sizes only grow while scanning, so a
+        # stale entry can only underestimate its folder and is refreshed on eviction
+        self._top_dirs: List[Tuple[int, str]] = []
+        self._top_dir_paths: set = set()
+        self._dirs_dirty = False
+
+    def _dir(self, dirpath: str) -> DirNode:
+        node = self._dirs.get(dirpath)
+        if node is not None:
+            return node
+        node = self.root
+        path = ""
+        for part in _split_dir(dirpath):
+            path = os.path.join(path, part) if path else part
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = DirNode(part, path, node)
+            node = child
+        self._dirs[dirpath] = node
+        return node
+
+    def node(self, path: str) -> Optional[DirNode]:
+        """The folder node for ``path`` ("" is the top of the tree)."""
+        return self.root if not path else self._dirs.get(path) or self._find(path)
+
+    def _find(self, path: str) -> Optional[DirNode]:
+        node = self.root
+        for part in _split_dir(path):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def start_node(self) -> DirNode:
+        """Deepest folder above every record: where a view should open."""
+        with self.lock:
+            node = self.root
+            while len(node.children) == 1 and not node.own_bytes:
+                node = next(iter(node.children.values()))
+            return node
+
+    def add(self, rec: Dict) -> None:
+        with self.lock:
+            self._apply(rec, 1)
+
+    def add_many(self, records: Iterable[Dict]) -> None:
+        with self.lock:
+            for rec in records:
+                self._apply(rec, 1)
+
+    def remove(self, rec: Dict) -> None:
+        """Undo ``add(rec)``; ``rec`` must still hold the path, size and kind it was added with."""
+        with self.lock:
+            self._apply(rec, -1)
+
+    def _apply(self, rec: Dict, sign: int) -> None:
+        size = int(rec.get("size") or 0)
+        kind = rec.get("kind") or "other"
+        leaf = self._dir(os.path.dirname(rec["path"]))
+        leaf.own_bytes += sign * size
+        node = leaf
+        while node is not None:
+            node.bytes += sign * size
+            node.files += sign
+            left = node.by_kind.get(kind, 0) + sign * size
+            if left > 0:
+                node.by_kind[kind] = left
+            else:
+                node.by_kind.pop(kind, None)
+            node = node.parent
+        if sign > 0:
+            self._push_file(size, rec["path"])
+            self._push_dir(leaf)
+        else:
+            if rec["path"] in self._top_file_paths:
+                self._top_file_paths.discard(rec["path"])
+                self._top_files = [e for e in self._top_files if e[1] != rec["path"]]
+                heapq.heapify(self._top_files)
+            # Shrinking folders break the heap's only-grows assumption
+            self._dirs_dirty = True
+
+    def _push_file(self, size: int, path: str) -> None:
+        if path in self._top_file_paths:
+            return
+        if len(self._top_files) < self.top_n:
+            heapq.heappush(self._top_files, (size, path))
+            self._top_file_paths.add(path)
+        elif size > self._top_files[0][0]:
+            _, out = heapq.heapreplace(self._top_files, (size, path))
+            self._top_file_paths.discard(out)
+            self._top_file_paths.add(path)
+
+    def _push_dir(self, node: DirNode) -> None:
+        heap = self._top_dirs
+        if node.path in self._top_dir_paths:
+            return
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, (node.own_bytes, node.path))
+            self._top_dir_paths.add(node.path)
+            return
+        while node.own_bytes > heap[0][0]:
+            stale, path = heap[0]
+            current = self._dirs[path].own_bytes
+            if current > stale:
+                # Outgrew its entry since it was pushed: refresh and look again
+                heapq.heapreplace(heap, (current, path))
+                continue
+            heapq.heapreplace(heap, (node.own_bytes, node.path))
+            self._top_dir_paths.discard(path)
+            self._top_dir_paths.add(node.path)
+            return
+
+    def _rebuild_dirs(self) -> None:
+        self._top_dirs = heapq.nlargest(self.top_n, ((n.own_bytes, p) for p, n in self._dirs.items() if n.files))
+        heapq.heapify(self._top_dirs)
+        self._top_dir_paths = {p for _, p in self._top_dirs}
+        self._dirs_dirty = False
+
+    def top_files(self, n: int = 20) -> List[Tuple[str, int]]:
+        """Largest files as ``(path, size)``. After removals the list may run short of ``top_n``."""
+        with self.lock:
+            return [(p, s) for s, p in heapq.nlargest(n, self._top_files)]
+
+    def top_dirs(self, n: int = 20) -> List[Tuple[str, int]]:
+        """Folders holding the most bytes directly, as ``(path, own_bytes)``."""
+        with self.lock:
+            if self._dirs_dirty:
+                self._rebuild_dirs()
+            current = ((self._dirs[p].own_bytes, p) for _, p in self._top_dirs)
+            return [(p, s) for s, p in heapq.nlargest(n, current) if s > 0]
+
+    def set_reclaimable(self, groups: Iterable[List[Dict]]) -> int:
+        """Recompute reclaimable bytes from duplicate ``groups``: every copy
+        but the keeper counts toward its folders. Returns the total."""
+        with self.lock:
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                node.reclaimable = 0
+                stack.extend(node.children.values())
+            for group in groups:
+                keeper = pick_keeper(group)
+                for rec in group:
+                    if rec is keeper:
+                        continue
+                    size = int(rec.get("size") or 0)
+                    node = self._dirs.get(os.path.dirname(rec["path"]))
+                    while node is not None:
+                        node.reclaimable += size
+                        node = node.parent
+            return self.root.reclaimable
+
+    def children(self, node: DirNode) -> List[DirNode]:
+        """Subfolders of ``node``, largest first."""
+        with self.lock:
+            return sorted((c for c in node.children.values() if c.files), key=lambda c: c.bytes, reverse=True)
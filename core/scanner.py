@@ -1,22 +1,111 @@
 import os
+import stat
+import time
 import hashlib
 from typing import Dict, Iterator, List, Optional, Callable
 
 from .utils import guess_kind, normalize_path
+from .telemetry import Telemetry
+from .locality import advise, sequential_opener
 
+# Heavy/system/build folders skipped in Fast Mode
+FAST_EXCLUDE_DIR_NAMES = [
+    ".git", "node_modules", ".venv", "__pycache__", "dist", "build",
+    "AppData", "Windows", "Program Files", "Program Files (x86)",
+    "$Recycle.Bin", "System Volume Information", ".Trash",
+    ".vscode", ".idea", "vendor", "packages"
+]
 
-def _hash_file(path: str, algo: str = "md5", chunk: int = 1024 * 1024) -> Optional[str]:
+
+def _hash_file(path: str, algo: str = "md5", chunk: int = 1024 * 1024,
+               telemetry: Optional[Telemetry] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+    """Hex digest of the file, or None if unreadable or stopped part way through."""
+    t0 = time.perf_counter()
+    total = 0
     try:
         h = hashlib.new(algo)
-        with open(path, "rb") as f:
+        with open(path, "rb", opener=sequential_opener) as f:
+            advise(f.fileno(), "sequential")
             while True:
+                if should_stop is not None and should_stop():
+                    return None
                 b = f.read(chunk)
                 if not b:
                     break
                 h.update(b)
+                total += len(b)
+            advise(f.fileno(), "done", total)
         return h.hexdigest()
     except Exception:
         return None
+    finally:
+        if telemetry is not None:
+            telemetry.add("hash", time.perf_counter() - t0, nbytes=total)
+
+
+# Files at least this large can be fingerprinted from sampled blocks instead of read fully
+SAMPLE_THRESHOLD = 256 * 1024 * 1024
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+
+def _sample_fingerprint(path: str, size: int, algo: str = "md5", blocks: int = SAMPLE_BLOCKS,
+                        block_size: int = SAMPLE_BLOCK_SIZE,
+                        telemetry: Optional[Telemetry] = None,
+                        should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+    """Hash of the file size plus ``blocks`` evenly spaced blocks (first and last included).
+
+    Equal fingerprints mean "probably identical": bytes between the samples
+    are never read.
+    """
+    if size <= blocks * block_size:
+        return _hash_file(path, algo=algo, telemetry=telemetry, should_stop=should_stop)
+    t0 = time.perf_counter()
+    total = 0
+    try:
+        h = hashlib.new(algo)
+        h.update(size.to_bytes(8, "little"))
+        step = (size - block_size) // (blocks - 1)
+        with open(path, "rb") as f:
+            advise(f.fileno(), "random")
+            for i in range(blocks):
+                if should_stop is not None and should_stop():
+                    return None
+                f.seek(i * step)
+                b = f.read(block_size)
+                h.update(b)
+                total += len(b)
+        return h.hexdigest()
+    except Exception:
+        return None
+    finally:
+        if telemetry is not None:
+            telemetry.add("hash.sample", time.perf_counter() - t0, nbytes=total)
+
+
+def make_record(full: str, fname: str, st: os.stat_result) -> Dict:
+    return {
+        "path": full,
+        "name": fname,
+        "ext": os.path.splitext(fname)[1].lower(),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "ctime": st.st_ctime,
+        "kind": guess_kind(full),
+    }
+
+
+def stat_record(path: str) -> Optional[Dict]:
+    """Build a record for a single file, or None if it is gone or not a file."""
+    full = normalize_path(path)
+    try:
+        st = os.stat(full)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return make_record(full, os.path.basename(full), st)
 
 
 def scan_dir(path: str,
@@ -59,29 +148,37 @@ def iter_dir(path: str,
              compute_hash: bool = False,
              hash_algo: str = "md5",
              exclude_dirs: Optional[List[str]] = None,
-             exclude_dir_names: Optional[List[str]] = None) -> Iterator[Dict]:
-    """Yield records one-by-one for streaming processing."""
+             exclude_dir_names: Optional[List[str]] = None,
+             telemetry: Optional[Telemetry] = None,
+             skip_paths: Optional[set] = None,
+             should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Dict]:
+    """Yield records one-by-one for streaming processing.
+
+    Files in ``skip_paths`` (already known, e.g. from a checkpoint) are not
+    stat'ed, hashed or yielded. ``should_stop`` is checked while hashing, so
+    a stop request does not wait for a large file to finish.
+    """
     exclude_dirs = exclude_dirs or []
     exclude_dir_names = [n.lower() for n in (exclude_dir_names or [])]
     for root, dirs, files in os.walk(path):
         dirs[:] = [d for d in dirs
                    if os.path.join(root, d) not in exclude_dirs
                    and d.lower() not in exclude_dir_names]
+        if telemetry is not None:
+            telemetry.add("scan.dirs", items=1)
         for fname in files:
             full = normalize_path(os.path.join(root, fname))
+            if skip_paths and full in skip_paths:
+                continue
+            t0 = time.perf_counter()
             try:
                 st = os.stat(full)
             except FileNotFoundError:
                 continue
-            rec = {
-                "path": full,
-                "name": fname,
-                "ext": os.path.splitext(fname)[1].lower(),
-                "size": st.st_size,
-                "mtime": st.st_mtime,
-                "ctime": st.st_ctime,
-                "kind": guess_kind(full),
-            }
+            if telemetry is not None:
+                telemetry.add("scan", time.perf_counter() - t0)
+            rec = make_record(full, fname, st)
             if compute_hash:
-                rec[f"hash_{hash_algo}"] = _hash_file(full, algo=hash_algo)
+                rec[f"hash_{hash_algo}"] = _hash_file(full, algo=hash_algo, telemetry=telemetry,
+                                                      should_stop=should_stop)
             yield rec
@@ -0,0 +1,66 @@
+"""Analysis order driven by what the user is looking at.
+
+Records are served in three tiers: the rows currently on screen, then records
+matching the active filter, then everything else in scan order. The GUI calls
+``prioritize`` whenever the viewport or filter changes; the worker keeps
+calling ``pop``. Both sides may run on different threads.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+Predicate = Callable[[Dict], bool]
+TIERS = ("visible", "filter", "background")
+
+
+class AnalysisQueue:
+    def __init__(self, records: List[Dict]) -> None:
+        self._pending: Dict[str, Dict] = {r["path"]: r for r in records}
+        self._background: Deque[str] = deque(self._pending)
+        self._visible: Deque[str] = deque()
+        # None means "rebuild from the current predicate on the next pop"
+        self._matching: Optional[Deque[str]] = deque()
+        self._predicate: Optional[Predicate] = None
+        self._lock = threading.Lock()
+        self.served = {t: 0 for t in TIERS}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def prioritize(self, visible: Iterable[str] = (), predicate: Optional[Predicate] = None) -> None:
+        """Serve ``visible`` paths next (replacing the previous set), then
+        records for which ``predicate(rec)`` is true (None: no filter)."""
+        visible = deque(visible)
+        with self._lock:
+            self._visible = visible
+            if predicate is not self._predicate:
+                self._predicate = predicate
+                self._matching = None
+
+    def visible_pending(self) -> bool:
+        with self._lock:
+            return any(p in self._pending for p in self._visible)
+
+    def pop(self) -> Optional[Tuple[Dict, str]]:
+        """Next ``(record, tier)``, or None when everything has been served."""
+        with self._lock:
+            pred = self._predicate
+            snapshot = list(self._pending.items()) if self._matching is None and pred is not None else None
+            if self._matching is None and pred is None:
+                self._matching = deque()
+        if snapshot is not None:
+            # Outside the lock: the GUI thread must never wait for a full pass
+            matching = deque(p for p, r in snapshot if pred(r))
+            with self._lock:
+                if self._predicate is pred:
+                    self._matching = matching
+        with self._lock:
+            for tier, queue in zip(TIERS, (self._visible, self._matching or (), self._background)):
+                while queue:
+                    rec = self._pending.pop(queue.popleft(), None)
+                    if rec is not None:
+                        self.served[tier] += 1
+                        return rec, tier
+            return None
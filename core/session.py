@@ -0,0 +1,289 @@
+"""Compact columnar session files (``.ncs``).
+
+Layout: ``MAGIC``, a little-endian u32 header length, a JSON header and then
+the column blobs. Every column is a zlib-compressed ``array`` (numbers), a
+NUL-joined UTF-8 string list, or dictionary-encoded codes for low-cardinality
+strings (kind, label, action, reasons). Keys not covered by a column are kept
+per record in a JSON ``extra`` column so nothing is lost.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b"NCSESS\x00\x01"
+VERSION = 1
+
+# Record keys stored in dedicated columns
+_REC_KEYS = {"path", "name", "ext", "size", "mtime", "ctime", "kind", "phash"}
+# Bit 0 of the q_flags column marks "quality present"; flags follow in this order
+_QUALITY_FLAGS = ("is_small", "is_dark", "is_low_sharpness")
+_QUALITY_KEYS = {"width", "height", "brightness", "sharpness", *_QUALITY_FLAGS}
+_ANALYSIS_KEYS = {"kind", "label", "confidence", "quality"}
+_RECO_KEYS = {"primary_action", "reasons", "score"}
+_PAYLOAD_KEYS = {"path", "analysis", "recommendation", "dup_count"}
+
+
+def _arr(code: str, values) -> bytes:
+    a = array(code, values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def _unarr(code: str, blob: bytes) -> array:
+    a = array(code)
+    a.frombytes(blob)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+def _strings(values: List[str]) -> bytes:
+    return "\x00".join(values).encode("utf-8", "surrogatepass")
+
+
+def _unstrings(blob: bytes, n: int) -> List[str]:
+    if n == 0:
+        return []
+    return blob.decode("utf-8", "surrogatepass").split("\x00")
+
+
+# Code array type by a dictionary column's "wide" value: False, True (up to 65,535 words) or 2
+_CODE_TYPES = ("B", "H", "I")
+
+
+def _dict_encode(values: List[Optional[str]]) -> Tuple[List[str], bytes, int]:
+    table: Dict[Optional[str], int] = {None: 0}
+    codes = []
+    for v in values:
+        c = table.get(v)
+        if c is None:
+            c = table[v] = len(table)
+        codes.append(c)
+    words = [k for k in table if k is not None]
+    wide = 0 if len(table) <= 256 else 1 if len(table) <= 65536 else 2
+    return words, _arr(_CODE_TYPES[wide], codes), wide
+
+
+def _dict_decode(words: List[str], blob: bytes, wide: int) -> List[Optional[str]]:
+    lookup: List[Optional[str]] = [None] + words
+    return [lookup[c] for c in _unarr(_CODE_TYPES[int(wide)], blob)]
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.columns: List[Dict] = []
+        self.blobs: List[bytes] = []
+        self.offset = 0
+
+    def add(self, name: str, raw: bytes, **meta) -> None:
+        blob = zlib.compress(raw, 6)
+        self.columns.append(dict(name=name, offset=self.offset, length=len(blob), **meta))
+        self.blobs.append(blob)
+        self.offset += len(blob)
+
+    def add_dict(self, name: str, values: List[Optional[str]]) -> None:
+        words, codes, wide = _dict_encode(values)
+        # A bool up to 65,535 words, so older versions still read the file
+        self.add(name, codes, words=words, wide=wide if wide == 2 else bool(wide))
+
+
+def save_session(path: str, records: List[Dict], analyses: Dict[str, Dict],
+                 meta: Optional[Dict] = None) -> None:
+    """Write records and their analysis payloads (keyed by path) to ``path``."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _save(path, records, analyses, meta)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _save(path: str, records: List[Dict], analyses: Dict[str, Dict], meta: Optional[Dict]) -> None:
+    n = len(records)
+    w = _Writer()
+    w.add("path", _strings([r["path"] for r in records]))
+    w.add("name", _strings([r.get("name", "") for r in records]))
+    w.add_dict("ext", [r.get("ext") for r in records])
+    w.add("size", _arr("q", (int(r.get("size", 0)) for r in records)))
+    w.add("mtime", _arr("d", (float(r.get("mtime", 0.0)) for r in records)))
+    w.add("ctime", _arr("d", (float(r.get("ctime", 0.0)) for r in records)))
+    w.add_dict("kind", [r.get("kind") for r in records])
+    w.add("phash", _arr("Q", (int(r.get("phash") or 0) for r in records)))
+
+    hash_keys = sorted({k for r in records for k in r if k.startswith("hash_")})
+    for key in hash_keys:
+        # Fixed-width digests; all-zero means "not hashed"
+        width = max((len(r[key]) // 2 for r in records if r.get(key)), default=0)
+        blank = bytes(width)
+        w.add(key, b"".join(bytes.fromhex(r[key]) if r.get(key) else blank for r in records), width=width)
+
+    payloads = [analyses.get(r["path"]) for r in records]
+    have = [p is not None for p in payloads]
+    an = [(p or {}).get("analysis") or {} for p in payloads]
+    reco = [(p or {}).get("recommendation") or {} for p in payloads]
+    quality = [a.get("quality") or {} for a in an]
+    w.add("has_analysis", _arr("B", have))
+    w.add_dict("label", [a.get("label") for a in an])
+    w.add_dict("analysis_kind", [a.get("kind") for a in an])
+    w.add("confidence", _arr("d", (float(a.get("confidence", 0.0)) for a in an)))
+    w.add("dup_count", _arr("i", (int((p or {}).get("dup_count", 0)) for p in payloads)))
+    w.add("q_width", _arr("i", (int(q.get("width", 0)) for q in quality)))
+    w.add("q_height", _arr("i", (int(q.get("height", 0)) for q in quality)))
+    w.add("q_brightness", _arr("d", (float(q.get("brightness", 0.0)) for q in quality)))
+    w.add("q_sharpness", _arr("d", (float(q.get("sharpness", 0.0)) for q in quality)))
+    # bit 0: quality present, bits 1..: flags
+    flags = []
+    for q in quality:
+        bits = 1 if q else 0
+        for i, f in enumerate(_QUALITY_FLAGS):
+            if q.get(f):
+                bits |= 1 << (i + 1)
+        flags.append(bits)
+    w.add("q_flags", _arr("B", flags))
+    w.add_dict("action", [r.get("primary_action") for r in reco])
+    w.add("score", _arr("i", (int(r.get("score", 0)) for r in reco)))
+    reasons = [r.get("reasons") or [] for r in reco]
+    w.add("reason_count", _arr("B", (len(x) for x in reasons)))
+    w.add_dict("reasons", [s for x in reasons for s in x])
+
+    # Anything not covered above, per record, as JSON (usually empty)
+    extra: Dict[int, Dict] = {}
+    rec_keys = _REC_KEYS.union(hash_keys)
+    for i, (r, p) in enumerate(zip(records, payloads)):
+        e: Dict = {}
+        # issuperset() keeps the common "nothing extra" case in C
+        if not rec_keys.issuperset(r):
+            e["r"] = {k: v for k, v in r.items() if k not in rec_keys}
+        if p is not None:
+            for tag, d, known in (("p", p, _PAYLOAD_KEYS), ("a", an[i], _ANALYSIS_KEYS),
+                                  ("q", quality[i], _QUALITY_KEYS), ("c", reco[i], _RECO_KEYS)):
+                if not known.issuperset(d):
+                    e[tag] = {k: v for k, v in d.items() if k not in known}
+        if e:
+            extra[i] = e
+    if extra:
+        w.add("extra", json.dumps(extra, default=str).encode("utf-8"))
+
+    header = json.dumps({"version": VERSION, "count": n, "meta": meta or {}, "columns": w.columns}).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for blob in w.blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+def read_header(path: str) -> Dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a NeatCore session file")
+        (hlen,) = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(hlen).decode("utf-8"))
+
+
+def load_session(path: str) -> Tuple[List[Dict], Dict[str, Dict], Dict]:
+    """Return ``(records, analyses, meta)`` from a file written by ``save_session``."""
+    # Millions of fresh dicts would otherwise trigger repeated full GC passes
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _load(path)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _load(path: str) -> Tuple[List[Dict], Dict[str, Dict], Dict]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a NeatCore session file")
+    pos = len(MAGIC)
+    (hlen,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    header = json.loads(data[pos:pos + hlen].decode("utf-8"))
+    if header.get("version", 0) > VERSION:
+        raise ValueError(f"Session file version {header['version']} is newer than supported ({VERSION})")
+    base = pos + hlen
+    n = header["count"]
+    cols = {c["name"]: c for c in header["columns"]}
+
+    def raw(name: str) -> bytes:
+        c = cols[name]
+        return zlib.decompress(data[base + c["offset"]: base + c["offset"] + c["length"]])
+
+    def dcol(name: str) -> List[Optional[str]]:
+        c = cols[name]
+        return _dict_decode(c["words"], raw(name), c["wide"])
+
+    paths = _unstrings(raw("path"), n)
+    names = _unstrings(raw("name"), n)
+    keys = ("path", "name", "ext", "size", "mtime", "ctime", "kind")
+    records: List[Dict] = [
+        dict(zip(keys, row)) for row in zip(
+            paths, names, dcol("ext"), _unarr("q", raw("size")).tolist(),
+            _unarr("d", raw("mtime")).tolist(), _unarr("d", raw("ctime")).tolist(), dcol("kind"))
+    ]
+    for rec, ph in zip(records, _unarr("Q", raw("phash")).tolist()):
+        if ph:
+            rec["phash"] = ph
+    for name, c in cols.items():
+        if not name.startswith("hash_") or not c["width"]:
+            continue
+        step = c["width"] * 2
+        hexes = raw(name).hex()
+        blank = "0" * step
+        for i, rec in enumerate(records):
+            hv = hexes[i * step:(i + 1) * step]
+            if hv != blank:
+                rec[name] = hv
+
+    extra = {int(k): v for k, v in json.loads(raw("extra")).items()} if "extra" in cols else {}
+    for i, e in extra.items():
+        if "r" in e:
+            records[i].update(e["r"])
+
+    analyses: Dict[str, Dict] = {}
+    rcount = _unarr("B", raw("reason_count")).tolist()
+    reason_words = dcol("reasons")
+    rstart = [0] * n
+    acc = 0
+    for i, k in enumerate(rcount):
+        rstart[i] = acc
+        acc += k
+    cols_an = zip(
+        range(n), paths, _unarr("B", raw("has_analysis")).tolist(), dcol("analysis_kind"), dcol("label"),
+        _unarr("d", raw("confidence")).tolist(), _unarr("i", raw("dup_count")).tolist(),
+        _unarr("i", raw("q_width")).tolist(), _unarr("i", raw("q_height")).tolist(),
+        _unarr("d", raw("q_brightness")).tolist(), _unarr("d", raw("q_sharpness")).tolist(),
+        _unarr("B", raw("q_flags")).tolist(), dcol("action"), _unarr("i", raw("score")).tolist(),
+    )
+    for i, p, have, akind, label, conf, dup, qw, qh, qb, qs, qf, action, score in cols_an:
+        if not have:
+            continue
+        quality: Dict = {}
+        if qf & 1:
+            quality = {"width": qw, "height": qh, "brightness": qb, "sharpness": qs,
+                       "is_small": bool(qf & 2), "is_dark": bool(qf & 4), "is_low_sharpness": bool(qf & 8)}
+        analysis = {"kind": akind, "label": label, "confidence": conf, "quality": quality}
+        reco = {"primary_action": action, "reasons": reason_words[rstart[i]:rstart[i] + rcount[i]], "score": score}
+        payload = {"path": p, "analysis": analysis, "recommendation": reco, "dup_count": dup}
+        e = extra.get(i)
+        if e:
+            quality.update(e.get("q", {}))
+            analysis.update(e.get("a", {}))
+            reco.update(e.get("c", {}))
+            payload.update(e.get("p", {}))
+        analyses[p] = payload
+    return records, analyses, header.get("meta", {})
@@ -0,0 +1,149 @@
+"""Identify files by their first bytes when the extension says nothing useful.
+
+Only records whose kind is "other" or whose extension is known to hide real
+content (``.dat``, ``.bin``, partial downloads, no extension…) are sniffed.
+Reads go through a small thread pool, one batch at a time, and stop once a
+per-run budget of files or seconds is spent.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .telemetry import Telemetry
+from .utils import windows_long_path
+
+# Most signatures sit in the first few dozen bytes; tar's is at offset 257
+HEAD_SIZE = 262
+
+# Extensions that often sit on files of a different real type
+SUSPICIOUS_EXTS = {"", ".dat", ".bin", ".tmp", ".download", ".crdownload", ".part", ".partial",
+                   ".file", ".unknown", ".octet-stream"}
+
+# (offset, magic, kind, ext); checked in order, first match wins
+SIGNATURES: List[Tuple[int, bytes, str, str]] = [
+    (0, b"\xff\xd8\xff", "image", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image", ".png"),
+    (0, b"GIF87a", "image", ".gif"),
+    (0, b"GIF89a", "image", ".gif"),
+    (0, b"II*\x00", "image", ".tiff"),
+    (0, b"MM\x00*", "image", ".tiff"),
+    (0, b"%PDF-", "document", ".pdf"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "document", ".doc"),  # OLE2: doc / xls / ppt
+    (0, b"{\\rtf", "document", ".rtf"),
+    (0, b"\x1a\x45\xdf\xa3", "video", ".mkv"),  # Matroska / WebM
+    (0, b"FLV\x01", "video", ".flv"),
+    (0, b"ID3", "audio", ".mp3"),
+    (0, b"fLaC", "audio", ".flac"),
+    (0, b"OggS", "audio", ".ogg"),
+    (0, b"Rar!\x1a\x07", "archive", ".rar"),
+    (0, b"7z\xbc\xaf\x27\x1c", "archive", ".7z"),
+    (0, b"\x1f\x8b", "archive", ".gz"),
+    (0, b"BZh", "archive", ".bz2"),
+    (0, b"\xfd7zXZ\x00", "archive", ".xz"),
+    (0, b"\x28\xb5\x2f\xfd", "archive", ".zst"),
+    (257, b"ustar", "archive", ".tar"),
+]
+
+_RIFF = {b"WEBP": ("image", ".webp"), b"AVI ": ("video", ".avi"), b"WAVE": ("audio", ".wav")}
+# ISO base media "ftyp" brands
+_FTYP = {
+    b"heic": ("image", ".heic"), b"heix": ("image", ".heic"), b"mif1": ("image", ".heic"),
+    b"avif": ("image", ".avif"), b"M4A ": ("audio", ".m4a"), b"qt  ": ("video", ".mov"),
+}
+
+
+def identify(head: bytes) -> Optional[Tuple[str, str]]:
+    """``(kind, ext)`` for a file starting with ``head``, or None if unknown."""
+    if head[:4] == b"RIFF" and len(head) >= 12:
+        return _RIFF.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        return _FTYP.get(head[8:12], ("video", ".mp4"))
+    if head[:4] == b"PK\x03\x04":
+        # First member name tells Office/ODF documents apart from plain zips
+        name = head[30:30 + int.from_bytes(head[26:28], "little")]
+        if name in (b"[Content_Types].xml", b"mimetype") or name.startswith((b"word/", b"xl/", b"ppt/")):
+            return "document", ".docx"
+        return "archive", ".zip"
+    for offset, magic, kind, ext in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return kind, ext
+    # MPEG audio frame sync without an ID3 tag
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06:
+        return "audio", ".mp3"
+    return None
+
+
+def needs_sniff(rec: Dict) -> bool:
+    return rec.get("kind") == "other" or rec.get("ext", "") in SUSPICIOUS_EXTS
+
+
+def _read_head(path: str) -> bytes:
+    try:
+        with open(windows_long_path(path), "rb") as f:
+            return f.read(HEAD_SIZE)
+    except OSError:
+        return b""
+
+
+class Sniffer:
+    """Per-run sniffing with a budget; call ``sniff_batch`` on each batch of records."""
+
+    def __init__(self, max_files: int = 50000, max_seconds: float = 15.0, workers: int = 8,
+                 telemetry: Optional[Telemetry] = None) -> None:
+        self.max_files = max_files
+        self.max_seconds = max_seconds
+        self.workers = workers
+        self.telemetry = telemetry
+        self.stats: Dict = {"candidates": 0, "sniffed": 0, "reclassified": 0, "over_budget": 0,
+                            "seconds": 0.0, "by_kind": {}}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self.stats["sniffed"] >= self.max_files or self.stats["seconds"] >= self.max_seconds
+
+    def sniff_batch(self, records: List[Dict]) -> int:
+        """Reclassify records in place; returns how many changed kind."""
+        todo = [r for r in records if needs_sniff(r) and r.get("size", 0) > 0]
+        if not todo:
+            return 0
+        self.stats["candidates"] += len(todo)
+        room = self.max_files - self.stats["sniffed"]
+        if self.exhausted or room <= 0:
+            self.stats["over_budget"] += len(todo)
+            return 0
+        if len(todo) > room:
+            self.stats["over_budget"] += len(todo) - room
+            todo = todo[:room]
+        t0 = time.perf_counter()
+        if len(todo) > 4:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="neatcore-sniff")
+            heads = list(self._pool.map(_read_head, [r["path"] for r in todo]))
+        else:
+            heads = [_read_head(r["path"]) for r in todo]
+        changed = 0
+        for rec, head in zip(todo, heads):
+            found = identify(head) if head else None
+            if found is None:
+                continue
+            kind, ext = found
+            rec["sniffed_ext"] = ext
+            if kind != rec.get("kind"):
+                rec["kind"] = kind
+                changed += 1
+                self.stats["by_kind"][kind] = self.stats["by_kind"].get(kind, 0) + 1
+        secs = time.perf_counter() - t0
+        self.stats["sniffed"] += len(todo)
+        self.stats["reclassified"] += changed
+        self.stats["seconds"] += secs
+        if self.telemetry is not None:
+            self.telemetry.add("sniff", secs, items=len(todo), nbytes=len(todo) * HEAD_SIZE)
+        return changed
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
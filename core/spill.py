@@ -0,0 +1,321 @@
+"""Bounded-memory record store for very large scans.
+
+Records are appended to a temporary SQLite database instead of a list, and
+exact-duplicate grouping runs as external sorts inside SQLite. Size buckets
+come from ``GROUP BY size``, and hash groups from ``ORDER BY size, hash``
+streamed one group at a time. SQLite's sorter spills to temporary files
+once its page cache (a share of the RAM budget) is full, so memory stays
+flat however many files are scanned. Only one chunk of records being hashed
+and one duplicate group are held in memory at any time. Each chunk is read
+in on-disk order (see locality.py).
+
+Every group found is ``link``ed: a union-find over record ids (an int32
+array, 4 bytes per file) joins groups into clusters, and the kinds each
+file was matched by go to the store. ``clusters`` then walks the clusters
+one at a time, picks each keeper with ``dupgraph.build_clusters`` (same
+ranking, counts and probable flags as the in-memory path) and stores them
+for ``iter_records``.
+
+    with SpillStore(memory_mb=512) as store:
+        store.add_many(iter_dir(root))
+        for kind, group in store.group_exact():
+            ...
+        for cluster in store.clusters(ranking):
+            ...
+        for rec, dup_count, probable, keeper in store.iter_records():
+            ...
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dupgraph import DEFAULT_RANKING, build_clusters
+from .duplicates import CONFIDENCE_LEVELS
+from .locality import physical_order
+from .netio import hash_files_adaptive
+from .scanner import _hash_file, _sample_fingerprint, SAMPLE_THRESHOLD
+from .telemetry import Telemetry
+
+DEFAULT_MEMORY_MB = 512
+# Rough in-memory cost of one record dict while it is being hashed
+RECORD_BYTES = 1024
+INSERT_BATCH = 5000
+
+
+class SpillStore:
+    """Records in a temporary SQLite file under ``directory`` (default: the
+    system temp folder). The file is deleted by ``close``."""
+
+    def __init__(self, memory_mb: int = DEFAULT_MEMORY_MB, directory: Optional[str] = None) -> None:
+        self.memory_mb = max(16, memory_mb)
+        self._dir = tempfile.mkdtemp(prefix="neatcore-spill-", dir=directory)
+        self.path = os.path.join(self._dir, "records.db")
+        self.conn = sqlite3.connect(self.path)
+        # Half the budget for SQLite's page cache (and so its sorter); a quarter for hash chunks
+        self.conn.executescript(f"""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            PRAGMA temp_store = FILE;
+            PRAGMA cache_size = -{self.memory_mb * 512};
+            CREATE TABLE records (id INTEGER PRIMARY KEY, size INTEGER, kind TEXT, data TEXT);
+            CREATE TABLE digests (id INTEGER PRIMARY KEY, hash TEXT, sample TEXT);
+            CREATE TABLE links (id INTEGER, kind TEXT, PRIMARY KEY (id, kind)) WITHOUT ROWID;
+            CREATE TABLE dups (id INTEGER PRIMARY KEY, count INTEGER, probable INTEGER, keeper INTEGER);
+        """)
+        self.chunk = max(1000, self.memory_mb * 1024 * 1024 // 4 // RECORD_BYTES)
+        self._pending: List[Tuple[int, str, str]] = []
+        self._count = 0
+        # Union-find parents by record id (ids start at 1)
+        self._parent = np.zeros(0, dtype=np.int32)
+
+    def __enter__(self) -> "SpillStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        finally:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def add(self, rec: Dict) -> None:
+        self._pending.append((int(rec.get("size") or 0), rec.get("kind") or "other", json.dumps(rec)))
+        if len(self._pending) >= INSERT_BATCH:
+            self.flush()
+
+    def add_many(self, records: Iterable[Dict]) -> None:
+        for rec in records:
+            self.add(rec)
+        self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            with self.conn:
+                self.conn.executemany("INSERT INTO records (size, kind, data) VALUES (?, ?, ?)", self._pending)
+            self._count += len(self._pending)
+            self._pending = []
+
+    def records(self, kind: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+        """``(id, record)`` in scan order, optionally of one kind only."""
+        self.flush()
+        sql = "SELECT id, data FROM records" + (" WHERE kind = ?" if kind else "") + " ORDER BY id"
+        for rid, data in self.conn.execute(sql, (kind,) if kind else ()):
+            yield rid, json.loads(data)
+
+    def iter_records(self) -> Iterator[Tuple[Dict, int, bool, bool]]:
+        """``(record, dup_count, probable, keeper)`` in scan order, after ``clusters``."""
+        self.flush()
+        cur = self.conn.execute(
+            "SELECT r.data, g.hash, g.sample, d.count, d.probable, d.keeper FROM records r "
+            "LEFT JOIN digests g ON g.id = r.id LEFT JOIN dups d ON d.id = r.id ORDER BY r.id")
+        for data, hv, sv, count, probable, keeper in cur:
+            yield self._load(data, hv, sv), count or 0, bool(probable), bool(keeper)
+
+    @staticmethod
+    def _load(data: str, hv: Optional[str], sv: Optional[str], algo: str = "md5") -> Dict:
+        rec = json.loads(data)
+        if hv:
+            rec[f"hash_{algo}"] = hv
+        if sv:
+            rec[f"hash_sample_{algo}"] = sv
+        return rec
+
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = int(parent[i])
+        return i
+
+    def link(self, ids: List[int], kind: str) -> None:
+        """Join ``ids``, one group matched as ``kind``, into a single cluster."""
+        top = max(ids)
+        if top >= len(self._parent):
+            grown = np.arange(max(top + 1, 2 * len(self._parent)), dtype=np.int32)
+            grown[:len(self._parent)] = self._parent
+            self._parent = grown
+        root = self._find(ids[0])
+        for i in ids[1:]:
+            other = self._find(i)
+            if other != root:
+                self._parent[other] = root
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO links (id, kind) VALUES (?, ?)", [(i, kind) for i in ids])
+
+    def clusters(self, ranking: Sequence[str] = DEFAULT_RANKING, telemetry: Optional[Telemetry] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Dict]:
+        """Clusters of every ``link``ed group, as ``dupgraph.build_clusters`` makes
+        them, one at a time (ordered by cluster, not by size). Each member's
+        duplicate count, probable flag and keeper flag are stored for ``iter_records``."""
+        conn = self.conn
+        with conn:
+            conn.execute("DELETE FROM dups")
+            conn.execute("DROP TABLE IF EXISTS roots")
+            conn.execute("CREATE TEMP TABLE roots (id INTEGER PRIMARY KEY, root INTEGER)")
+            conn.executemany("INSERT INTO roots (id, root) VALUES (?, ?)",
+                             [(rid, self._find(rid)) for (rid,) in conn.execute("SELECT DISTINCT id FROM links")])
+        cur = conn.execute(
+            "SELECT t.root, r.id, r.data, g.hash, g.sample, group_concat(l.kind) FROM roots t "
+            "JOIN records r ON r.id = t.id JOIN links l ON l.id = t.id LEFT JOIN digests g ON g.id = t.id "
+            "GROUP BY t.id ORDER BY t.root, t.id")
+        rows: List[Tuple[int, int, int, int]] = []
+        key = None
+        members: List[Tuple[int, Dict, List[str]]] = []
+        for root, rid, data, hv, sv, kinds in cur:
+            if root != key:
+                if members:
+                    if should_stop is not None and should_stop():
+                        return
+                    yield self._cluster(members, ranking, telemetry, rows)
+                key, members = root, []
+            members.append((rid, self._load(data, hv, sv), kinds.split(",")))
+            if len(rows) >= INSERT_BATCH:
+                self._store_dups(rows)
+        if members:
+            yield self._cluster(members, ranking, telemetry, rows)
+        self._store_dups(rows)
+
+    @staticmethod
+    def _cluster(members: List[Tuple[int, Dict, List[str]]], ranking: Sequence[str],
+                 telemetry: Optional[Telemetry], rows: List[Tuple[int, int, int, int]]) -> Dict:
+        # Each kind's members stay connected, so this is always a single cluster
+        by_kind: Dict[str, List[Dict]] = {}
+        for _, rec, kinds in members:
+            for kind in kinds:
+                by_kind.setdefault(kind, []).append(rec)
+        cluster = build_clusters(by_kind.items(), ranking=ranking, telemetry=telemetry)[0]
+        probable = set(cluster["probable"])
+        n = len(members) - 1
+        rows.extend((rid, n, int(rec["path"] in probable), int(rec["path"] == cluster["keeper"]))
+                    for rid, rec, _ in members)
+        return cluster
+
+    def _store_dups(self, rows: List[Tuple[int, int, int, int]]) -> None:
+        with self.conn:
+            self.conn.executemany("INSERT INTO dups (id, count, probable, keeper) VALUES (?, ?, ?, ?)", rows)
+        rows.clear()
+
+    def _chunks(self, sql: str, args: tuple = ()) -> Iterator[List[Tuple[int, Dict]]]:
+        chunk: List[Tuple[int, Dict]] = []
+        for rid, data in self.conn.execute(sql, args):
+            chunk.append((rid, json.loads(data)))
+            if len(chunk) >= self.chunk:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _hash_chunk(self, chunk: List[Tuple[int, Dict]], algo: str, telemetry: Optional[Telemetry],
+                    should_stop: Optional[Callable[[], bool]]) -> None:
+        key = f"hash_{algo}"
+        remote = [r for _, r in chunk if r.get("remote") and r.get(key) is None]
+        if remote:
+            hash_files_adaptive(remote, algo=algo, telemetry=telemetry, should_stop=should_stop)
+        rows = []
+        ids = {id(r): rid for rid, r in chunk}
+        for r in physical_order([r for _, r in chunk], telemetry, should_stop):
+            if should_stop is not None and should_stop():
+                break
+            rid = ids[id(r)]
+            hv = r.get(key)
+            if hv is None:
+                hv = _hash_file(r["path"], algo=algo, telemetry=telemetry, should_stop=should_stop)
+            if hv:
+                rows.append((rid, hv))
+        with self.conn:
+            self.conn.executemany("INSERT INTO digests (id, hash) VALUES (?, ?) "
+                                  "ON CONFLICT(id) DO UPDATE SET hash = excluded.hash", rows)
+
+    def group_exact(self, algo: str = "md5", confidence: str = "full",
+                    sample_threshold: int = SAMPLE_THRESHOLD, telemetry: Optional[Telemetry] = None,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """Same groups as ``group_by_exact_hash``, as ``("exact" | "probable", records)``,
+        streamed one at a time; each is ``link``ed for ``clusters``."""
+        if confidence not in CONFIDENCE_LEVELS:
+            raise ValueError(f"Unknown confidence level: {confidence}")
+        self.flush()
+        stop = should_stop or (lambda: False)
+        conn = self.conn
+        conn.executescript("""
+            DROP TABLE IF EXISTS dup_sizes;
+            CREATE TEMP TABLE dup_sizes (size INTEGER PRIMARY KEY);
+            INSERT INTO dup_sizes SELECT size FROM records WHERE size > 0 GROUP BY size HAVING COUNT(*) > 1;
+        """)
+        skey = f"hash_sample_{algo}"
+        full_limit = sample_threshold if confidence != "full" else None
+        # Full reads for every candidate below the sampling threshold
+        sql = ("SELECT r.id, r.data FROM records r JOIN dup_sizes s ON s.size = r.size"
+               + (" WHERE r.size < ?" if full_limit else "") + " ORDER BY r.size")
+        for chunk in self._chunks(sql, (full_limit,) if full_limit else ()):
+            if stop():
+                return
+            self._hash_chunk(chunk, algo, telemetry, should_stop)
+        if full_limit:
+            # Large files: sampled blocks first
+            for chunk in self._chunks("SELECT r.id, r.data FROM records r JOIN dup_sizes s ON s.size = r.size "
+                                      "WHERE r.size >= ? ORDER BY r.size", (full_limit,)):
+                rows = []
+                ids = {id(r): rid for rid, r in chunk}
+                for r in physical_order([r for _, r in chunk], telemetry, should_stop):
+                    if stop():
+                        return
+                    rid = ids[id(r)]
+                    sv = r.get(skey) or _sample_fingerprint(r["path"], r["size"], algo=algo, telemetry=telemetry,
+                                                            should_stop=should_stop)
+                    if sv:
+                        rows.append((rid, sv))
+                with conn:
+                    conn.executemany("INSERT INTO digests (id, sample) VALUES (?, ?) "
+                                     "ON CONFLICT(id) DO UPDATE SET sample = excluded.sample", rows)
+            if confidence == "verify":
+                # Only files whose samples agree need a full read
+                conn.executescript("""
+                    DROP TABLE IF EXISTS verify_ids;
+                    CREATE TEMP TABLE verify_ids (id INTEGER PRIMARY KEY);
+                    INSERT INTO verify_ids SELECT g.id FROM digests g JOIN records r ON r.id = g.id
+                    WHERE g.sample IS NOT NULL AND (r.size, g.sample) IN (
+                        SELECT r2.size, g2.sample FROM digests g2 JOIN records r2 ON r2.id = g2.id
+                        WHERE g2.sample IS NOT NULL GROUP BY r2.size, g2.sample HAVING COUNT(*) > 1);
+                """)
+                for chunk in self._chunks("SELECT r.id, r.data FROM records r JOIN verify_ids v ON v.id = r.id "
+                                          "ORDER BY r.size"):
+                    if stop():
+                        return
+                    self._hash_chunk(chunk, algo, telemetry, should_stop)
+
+        yield from self._stream_groups("exact", "g.hash", algo)
+        if confidence == "sampled":
+            yield from self._stream_groups("probable", "g.sample", algo)
+
+    def _stream_groups(self, kind: str, column: str, algo: str) -> Iterator[Tuple[str, List[Dict]]]:
+        # Sorted by (size, digest): each group is one run of equal keys
+        cur = self.conn.execute(
+            f"SELECT r.id, r.size, {column}, r.data, g.hash, g.sample FROM digests g JOIN records r ON r.id = g.id "
+            f"WHERE {column} IS NOT NULL" + (" AND g.hash IS NULL" if kind == "probable" else "")
+            + f" ORDER BY r.size, {column}")
+        key = None
+        ids: List[int] = []
+        group: List[Dict] = []
+        for rid, size, digest, data, hv, sv in cur:
+            if (size, digest) != key:
+                if len(ids) > 1:
+                    self.link(ids, kind)
+                    yield kind, group
+                key, ids, group = (size, digest), [], []
+            ids.append(rid)
+            group.append(self._load(data, hv, sv, algo))
+        if len(ids) > 1:
+            self.link(ids, kind)
+            yield kind, group
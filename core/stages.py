@@ -0,0 +1,67 @@
+"""Pipeline stages and the options each depends on, for reuse between runs.
+
+    scan ──► group ───┐
+      │               ├──► recommend
+      └────► analyze ─┘
+
+A stage's fingerprint hashes its own options together with the fingerprints
+of the stages it reads from. Changing an option therefore invalidates that
+stage and everything downstream of it, and nothing else. Turning AI on
+reruns analysis (and the cheap recommendations) on the records already
+loaded. The scan and duplicate groups are kept.
+
+Options that change how a stage runs but not its result (adaptive network
+I/O, thread counts) are deliberately left out.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional
+
+from .analyze import ANALYZER_VERSION
+from .dupgraph import DEFAULT_RANKING
+from .recommend import RULES_VERSION
+from .utils import normalize_path
+
+STAGES = ("scan", "group", "analyze", "recommend")
+STAGE_INPUTS = {
+    "scan": (),
+    "group": ("scan",),
+    "analyze": ("scan",),
+    "recommend": ("group", "analyze"),
+}
+# Option names read by each stage; "fast_mode" is the folder exclusion list (and perceptual limits downstream)
+STAGE_OPTIONS = {
+    "scan": ("folders", "fast_mode", "sniff"),
+    "group": ("duplicates", "dup_confidence", "hash_algo", "perceptual", "similarity", "documents",
+              "keeper_ranking"),
+    "analyze": ("ai", "analyzer_version"),
+    "recommend": ("rules_version",),
+}
+
+
+def stage_options(folders: Iterable[str], **options) -> Dict:
+    """Options dict for ``stage_fingerprints``, with the versions and defaults filled in."""
+    out = {"folders": sorted(normalize_path(f) for f in folders), "hash_algo": "md5", "similarity": "cascade",
+           "keeper_ranking": list(DEFAULT_RANKING), "analyzer_version": ANALYZER_VERSION,
+           "rules_version": RULES_VERSION}
+    out.update(options)
+    return out
+
+
+def stage_fingerprints(options: Dict) -> Dict[str, str]:
+    fps: Dict[str, str] = {}
+    for stage in STAGES:
+        own = {k: options.get(k) for k in STAGE_OPTIONS[stage]}
+        text = json.dumps([stage, own, [fps[s] for s in STAGE_INPUTS[stage]]], sort_keys=True, default=str)
+        fps[stage] = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    return fps
+
+
+def stale_stages(previous: Optional[Dict[str, str]], current: Dict[str, str]) -> List[str]:
+    """Stages to run again, in pipeline order: all of them without a previous
+    complete run, else those whose fingerprint changed."""
+    if not previous:
+        return list(STAGES)
+    return [s for s in STAGES if previous.get(s) != current[s]]
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class Telemetry:
+    """Thread-safe per-stage counters and timers for one scan/analysis run.
+
+    Stages accumulate items, bytes and seconds; gauges keep the last and peak
+    value (queue depths). Pass ``profile=True`` to capture cProfile stats from
+    every ``profiled()`` block (one block per worker thread).
+    """
+
+    def __init__(self, profile: bool = False) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.gauges: Dict[str, Dict[str, float]] = {}
+        self.meta: Dict[str, object] = {}
+        self.profile_enabled = profile
+        self._profiles: Dict[str, str] = {}
+
+    def add(self, stage: str, seconds: float = 0.0, items: int = 1, nbytes: int = 0) -> None:
+        with self._lock:
+            st = self.stages.get(stage)
+            if st is None:
+                st = self.stages[stage] = {"items": 0, "seconds": 0.0, "bytes": 0, "max_ms": 0.0}
+            st["items"] += items
+            st["seconds"] += seconds
+            st["bytes"] += nbytes
+            if items:
+                st["max_ms"] = max(st["max_ms"], seconds * 1000.0 / items)
+
+    @contextmanager
+    def timed(self, stage: str, items: int = 1, nbytes: int = 0) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0, items, nbytes)
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            g = self.gauges.get(name)
+            if g is None:
+                self.gauges[name] = {"last": value, "peak": value}
+            else:
+                g["last"] = value
+                g["peak"] = max(g["peak"], value)
+
+    def finish(self) -> None:
+        self.finished = time.time()
+
+    @contextmanager
+    def profiled(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block (current thread only) when enabled."""
+        if not self.profile_enabled:
+            yield
+            return
+        import cProfile
+        import pstats
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+            with self._lock:
+                self._profiles[name] = buf.getvalue()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {k: dict(v) for k, v in self.stages.items()}
+            gauges = {k: dict(v) for k, v in self.gauges.items()}
+            profiles = dict(self._profiles)
+        for st in stages.values():
+            secs = st["seconds"]
+            st["items_per_s"] = st["items"] / secs if secs > 0 else None
+            st["bytes_per_s"] = st["bytes"] / secs if secs > 0 and st["bytes"] else None
+            st["avg_ms"] = secs * 1000.0 / st["items"] if st["items"] else None
+        end = self.finished or time.time()
+        return {
+            "started": self.started,
+            "elapsed_s": end - self.started,
+            "meta": dict(self.meta),
+            "stages": stages,
+            "gauges": gauges,
+            "profiles": profiles,
+        }
+
+    def rows(self) -> List[Dict]:
+        """Flat per-stage rows for display, in first-seen order."""
+        snap = self.snapshot()
+        return [dict(name=k, **v) for k, v in snap["stages"].items()]
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+@contextmanager
+def maybe_timed(telemetry: Optional[Telemetry], stage: str, items: int = 1, nbytes: int = 0) -> Iterator[None]:
+    """``telemetry.timed`` that is a no-op when no collector is attached."""
+    if telemetry is None:
+        yield
+        return
+    with telemetry.timed(stage, items, nbytes):
+        yield
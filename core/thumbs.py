@@ -0,0 +1,192 @@
+"""Two-level thumbnail cache for the preview pane.
+
+Thumbnails are small JPEGs (longest side ``THUMB_SIZE``). The first level is
+an in-memory LRU holding encoded bytes up to a byte budget. The second level
+is a folder of files named by a hash of (path, size, mtime), so an edited or
+replaced file never serves a stale thumbnail. The disk level is pruned,
+oldest first, when it grows past its own budget. Everything here is
+thread-safe; the analyzer, the preview worker and the GUI share one cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from PIL import Image
+
+from .utils import safe_open_image, user_cache_dir
+
+THUMB_SIZE = 256
+JPEG_QUALITY = 82
+
+
+def thumb_key(path: str, size: int, mtime: float) -> str:
+    return hashlib.sha1(f"{path}\x00{size}\x00{mtime:.6f}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def make_thumbnail(img: Image.Image, max_side: int = THUMB_SIZE) -> bytes:
+    """Encode a downscaled copy of ``img`` as JPEG bytes (``img`` is not modified)."""
+    w, h = img.size
+    scale = min(1.0, max_side / float(max(w, h, 1)))
+    tw, th = max(1, round(w * scale)), max(1, round(h * scale))
+    if img.mode not in ("RGB", "L"):
+        if "A" in img.getbands() or img.mode == "P":
+            # Flatten transparency onto white instead of black
+            rgba = img.convert("RGBA")
+            bg = Image.new("RGB", img.size, (255, 255, 255))
+            bg.paste(rgba, mask=rgba.getchannel("A"))
+            img = bg
+        else:
+            img = img.convert("RGB")
+    # reducing_gap: cheap integer reduce first, then a proper resample
+    small = img.resize((tw, th), Image.BILINEAR, reducing_gap=2.0) if scale < 1.0 else img
+    buf = io.BytesIO()
+    small.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=False)
+    return buf.getvalue()
+
+
+class ThumbnailCache:
+    def __init__(self, memory_budget: int = 32 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_budget: int = 512 * 1024 * 1024) -> None:
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir if disk_dir is not None else user_cache_dir("thumbs")
+        self.disk_budget = disk_budget
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+        self._disk_bytes: Optional[int] = None  # unknown until the first prune
+
+    # -- memory level -------------------------------------------------------
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old)
+            self._mem[key] = data
+            self._mem_bytes += len(data)
+            while self._mem_bytes > self.memory_budget and len(self._mem) > 1:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_bytes -= len(evicted)
+
+    # -- disk level ---------------------------------------------------------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".jpg")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+                over = self._disk_bytes > self.disk_budget
+            else:
+                over = False
+        if over:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Delete the least recently written thumbnails until the folder fits
+        in 90% of ``disk_budget``; returns the number of files removed."""
+        entries = []
+        total = 0
+        try:
+            for sub in os.scandir(self.disk_dir):
+                if not sub.is_dir():
+                    continue
+                for e in os.scandir(sub.path):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        except OSError:
+            pass
+        removed = 0
+        if total > self.disk_budget:
+            entries.sort()
+            target = int(self.disk_budget * 0.9)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self._disk_bytes = total
+        return removed
+
+    # -- public -------------------------------------------------------------
+    def get(self, path: str, size: int, mtime: float) -> Optional[bytes]:
+        """Cached JPEG bytes, or None; never decodes the source image."""
+        key = thumb_key(path, size, mtime)
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits["memory"] += 1
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            self.hits["disk"] += 1
+            self._remember(key, data)
+            return data
+        self.hits["miss"] += 1
+        return None
+
+    def has(self, path: str, size: int, mtime: float) -> bool:
+        key = thumb_key(path, size, mtime)
+        with self._lock:
+            if key in self._mem:
+                return True
+        return os.path.exists(self._disk_path(key))
+
+    def put_image(self, path: str, size: int, mtime: float, img: Image.Image) -> bytes:
+        """Store a thumbnail of an already decoded image (e.g. from analysis)."""
+        data = make_thumbnail(img)
+        key = thumb_key(path, size, mtime)
+        self._remember(key, data)
+        self._write_disk(key, data)
+        return data
+
+    def load(self, path: str, size: int, mtime: float) -> Optional[bytes]:
+        """Cached thumbnail, decoding the source (with JPEG draft mode) on a miss."""
+        data = self.get(path, size, mtime)
+        if data is not None:
+            return data
+        try:
+            img = Image.open(path)
+            # JPEG: let libjpeg decode at 1/2..1/8 scale directly
+            img.draft("RGB", (THUMB_SIZE * 2, THUMB_SIZE * 2))
+            img.load()
+        except Exception:
+            img = safe_open_image(path)
+        if img is None:
+            return None
+        return self.put_image(path, size, mtime, img)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memory_items": len(self._mem), "memory_bytes": self._mem_bytes, **self.hits}
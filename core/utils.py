@@ -2,9 +2,9 @@ import os
 import math
 import mimetypes
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Callable, Optional
 
-from PIL import Image
+from PIL import Image, ImageFile
 import numpy as np
 
 
@@ -94,6 +94,15 @@ def normalize_path(p: str) -> str:
     return os.path.normpath(ap)
 
 
+def user_cache_dir(*parts: str) -> str:
+    """Per-user cache folder for NeatCore (``%LOCALAPPDATA%\\NeatCore\\Cache`` or ``~/.cache/neatcore``)."""
+    if os.name == "nt":
+        base = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "NeatCore", "Cache")
+    else:
+        base = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "neatcore")
+    return os.path.join(base, *parts)
+
+
 def windows_long_path(p: str) -> str:
     r"""Prefix with \\?\ for very long Windows paths to avoid API errors."""
     np = normalize_path(p)
@@ -102,7 +111,34 @@ def windows_long_path(p: str) -> str:
     return np
 
 
-def safe_open_image(path: str) -> Optional[Image.Image]:
+# Images larger than this are decoded incrementally so a stop request can interrupt them
+INCREMENTAL_DECODE_MIN = 32 * 1024 * 1024
+DECODE_CHUNK = 8 * 1024 * 1024
+
+
+def _decode_incremental(path: str, should_stop: Callable[[], bool]) -> Optional[Image.Image]:
+    parser = ImageFile.Parser()
+    with open(path, "rb") as f:
+        while True:
+            if should_stop():
+                return None
+            b = f.read(DECODE_CHUNK)
+            if not b:
+                break
+            parser.feed(b)
+    return parser.close()
+
+
+def safe_open_image(path: str, should_stop: Optional[Callable[[], bool]] = None) -> Optional[Image.Image]:
+    """Decoded image, or None if unreadable (or stopped while decoding a large file)."""
+    if should_stop is not None:
+        try:
+            if os.path.getsize(path) >= INCREMENTAL_DECODE_MIN:
+                return _decode_incremental(path, should_stop)
+        except Exception:
+            # Formats the incremental parser cannot handle: decode in one go
+            if should_stop():
+                return None
     try:
         img = Image.open(path)
         img.load()
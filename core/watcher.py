@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .scanner import iter_dir, stat_record
+from .utils import normalize_path
+
+# A change is {"type": "created" | "modified" | "deleted" | "moved", "path": str, "dest": str | None}
+Change = Dict[str, Optional[str]]
+
+
+def _excluded(path: str, exclude_dir_names: Iterable[str]) -> bool:
+    parts = {p.lower() for p in normalize_path(path).replace("\\", "/").split("/")[:-1]}
+    return any(n in parts for n in exclude_dir_names)
+
+
+class ChangeCoalescer:
+    """Collect raw filesystem events and release them as one merged batch.
+
+    A batch is released once no event arrived for ``quiet`` seconds, or after
+    ``max_delay`` seconds of continuous activity, so a bulk copy of 50k files
+    becomes a handful of batches instead of 50k updates. Per path, the
+    sequence of events is reduced to its net effect (created then deleted is
+    nothing, deleted then created is a modification, and so on). Renames are
+    kept apart, by source path, so a new file appearing where one was just
+    renamed away is reported on its own and the rename is not lost.
+    """
+
+    def __init__(self, quiet: float = 1.0, max_delay: float = 5.0) -> None:
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Change] = {}
+        self._moves: Dict[str, Change] = {}  # original path -> pending rename
+        self._moved_to: Dict[str, str] = {}  # rename destination -> original path
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def add(self, kind: str, path: str, dest: Optional[str] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._first is None:
+                self._first = now
+            self._last = now
+            if kind == "moved" and dest:
+                self._add_move(path, dest)
+            else:
+                self._merge(path, kind)
+
+    def _merge(self, path: str, kind: str) -> None:
+        orig = self._moved_to.get(path)
+        if orig is not None and kind == "deleted":
+            # a -> b, then b deleted: net effect is a deleted (or replaced, if a new a appeared since)
+            del self._moved_to[path]
+            del self._moves[orig]
+            prev = self._pending.get(orig)
+            if prev is not None and prev["type"] == "created":
+                prev["type"] = "modified"
+            else:
+                self._pending[orig] = {"type": "deleted", "path": orig, "dest": None}
+            return
+        if orig is not None:
+            # Content changes at the destination are picked up when it is re-stat'ed
+            return
+        prev = self._pending.get(path)
+        if prev is None:
+            if path in self._moves and kind != "created":
+                # Late event for the file that was renamed away
+                return
+            self._pending[path] = {"type": kind, "path": path, "dest": None}
+            return
+        before = prev["type"]
+        if before == "created":
+            if kind == "deleted":
+                del self._pending[path]
+            # created + modified stays created
+        elif before == "deleted":
+            if kind == "created":
+                prev["type"] = "modified"
+        elif before == "modified":
+            if kind == "deleted":
+                prev["type"] = "deleted"
+
+    def _add_move(self, src: str, dest: str) -> None:
+        orig = self._moved_to.pop(src, None)
+        if orig is not None:
+            # Rename chain a -> b -> c collapses to a -> c
+            src = orig
+            del self._moves[src]
+        else:
+            prev = self._pending.pop(src, None)
+            if prev is not None and prev["type"] == "created":
+                # Never seen by the app: it is just a new file at dest
+                self._merge(dest, "created")
+                return
+        if src == dest:
+            # Renamed back (a -> b -> a): at most the content changed
+            self._merge(src, "modified")
+            return
+        self._pending.pop(dest, None)
+        self._moves[src] = {"type": "moved", "path": src, "dest": dest}
+        self._moved_to[dest] = src
+
+    def ready(self) -> bool:
+        with self._lock:
+            if not (self._pending or self._moves) or self._last is None or self._first is None:
+                return False
+            now = time.monotonic()
+            return (now - self._last) >= self.quiet or (now - self._first) >= self.max_delay
+
+    def drain(self) -> List[Change]:
+        with self._lock:
+            out = list(self._moves.values()) + list(self._pending.values())
+            self._pending.clear()
+            self._moves.clear()
+            self._moved_to.clear()
+            self._first = self._last = None
+            return out
+
+
+class PollingWatcher:
+    """Portable fallback: periodically re-stat the roots and diff snapshots."""
+
+    backend = "polling"
+
+    def __init__(self, roots: List[str], callback: Callable[[str, str, Optional[str]], None],
+                 exclude_dir_names: Optional[List[str]] = None, interval: float = 5.0) -> None:
+        self.roots = roots
+        self.callback = callback
+        self.exclude_dir_names = exclude_dir_names or []
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snap: Dict[str, Tuple[int, float]] = {}
+
+    def _snapshot(self) -> Dict[str, Tuple[int, float]]:
+        snap = {}
+        for root in self.roots:
+            for rec in iter_dir(root, exclude_dir_names=self.exclude_dir_names):
+                snap[rec["path"]] = (rec["size"], rec["mtime"])
+        return snap
+
+    def _diff(self, old: Dict, new: Dict) -> None:
+        gone = {p: v for p, v in old.items() if p not in new}
+        # Same size+mtime appearing elsewhere is treated as a rename
+        by_sig = {v: p for p, v in gone.items()}
+        for p, v in new.items():
+            prev = old.get(p)
+            if prev is None:
+                src = by_sig.pop(v, None)
+                if src is not None:
+                    gone.pop(src, None)
+                    self.callback("moved", src, p)
+                else:
+                    self.callback("created", p, None)
+            elif prev != v:
+                self.callback("modified", p, None)
+        for p in gone:
+            self.callback("deleted", p, None)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                new = self._snapshot()
+            except Exception:
+                continue
+            self._diff(self._snap, new)
+            self._snap = new
+
+    def start(self) -> None:
+        self._snap = self._snapshot()
+        self._thread = threading.Thread(target=self._loop, name="neatcore-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+
+class NativeWatcher:
+    """inotify / ReadDirectoryChangesW / FSEvents through the optional watchdog package."""
+
+    backend = "native"
+
+    def __init__(self, roots: List[str], callback: Callable[[str, str, Optional[str]], None],
+                 exclude_dir_names: Optional[List[str]] = None) -> None:
+        from watchdog.observers import Observer  # type: ignore
+        from watchdog.events import FileSystemEventHandler  # type: ignore
+
+        excluded = [n.lower() for n in (exclude_dir_names or [])]
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                kind = event.event_type
+                if kind not in ("created", "modified", "deleted", "moved"):
+                    return
+                if kind == "modified" and event.is_directory:
+                    return
+                src = normalize_path(event.src_path)
+                if _excluded(src, excluded):
+                    return
+                dest = normalize_path(event.dest_path) if kind == "moved" else None
+                callback(kind, src, dest)
+
+        self._observer = Observer()
+        for root in roots:
+            self._observer.schedule(_Handler(), root, recursive=True)
+        self.backend = type(self._observer).__name__
+
+    def start(self) -> None:
+        self._observer.start()
+
+    def stop(self) -> None:
+        self._observer.stop()
+        self._observer.join(timeout=2)
+
+
+def create_watcher(roots: List[str], callback: Callable[[str, str, Optional[str]], None],
+                   exclude_dir_names: Optional[List[str]] = None, poll_interval: float = 5.0):
+    """Native watcher when watchdog is installed, polling otherwise."""
+    try:
+        return NativeWatcher(roots, callback, exclude_dir_names)
+    except Exception:
+        return PollingWatcher(roots, callback, exclude_dir_names, interval=poll_interval)
+
+
+def plan_updates(changes: List[Change], known: Dict[str, Dict],
+                 exclude_dir_names: Optional[List[str]] = None) -> Dict[str, List]:
+    """Turn merged changes into record-level updates against ``known`` (path -> record).
+
+    Returns ``{"removed": [path], "added": [record], "modified": [record],
+    "renamed": [(old_path, record)]}``. Directory events are expanded to the
+    files beneath them.
+    """
+    excluded = [n.lower() for n in (exclude_dir_names or [])]
+    removed: List[str] = []
+    added: List[Dict] = []
+    modified: List[Dict] = []
+    renamed: List[Tuple[str, Dict]] = []
+    seen_added = set()
+    # Paths renamed away: a file found there now is new, not the known record
+    moved_away = set()
+
+    def under(prefix: str) -> List[str]:
+        pre = prefix.rstrip("\\/") + os.sep
+        return [p for p in known if p.startswith(pre)]
+
+    def add_path(path: str) -> None:
+        if os.path.isdir(path):
+            for rec in iter_dir(path, exclude_dir_names=excluded):
+                if (rec["path"] not in known or rec["path"] in moved_away) and rec["path"] not in seen_added:
+                    seen_added.add(rec["path"])
+                    added.append(rec)
+            return
+        rec = stat_record(path)
+        if rec is None or _excluded(path, excluded):
+            return
+        if path in known and path not in moved_away:
+            modified.append(rec)
+        elif path not in seen_added:
+            seen_added.add(path)
+            added.append(rec)
+
+    # Renames first, so later events on the new path do not add it twice
+    for ch in changes:
+        path, dest = ch["path"], ch.get("dest")
+        if ch["type"] != "moved" or not dest:
+            continue
+        olds = [path] if path in known else under(path)
+        if not olds and not _excluded(dest, excluded):
+            add_path(dest)
+        for old in olds:
+            new_path = dest + old[len(path):]
+            rec = stat_record(new_path)
+            if rec is None or _excluded(new_path, excluded):
+                removed.append(old)
+                continue
+            if new_path in known and new_path != old:
+                # Rename replaced an existing file
+                removed.append(new_path)
+            seen_added.add(new_path)
+            moved_away.add(old)
+            renamed.append((old, rec))
+
+    for ch in changes:
+        kind, path = ch["type"], ch["path"]
+        if kind == "moved" or path in seen_added:
+            continue
+        if kind == "deleted":
+            removed.extend([path] if path in known else under(path))
+        elif kind == "created":
+            add_path(path)
+        elif kind == "modified":
+            if path in known and path not in moved_away:
+                rec = stat_record(path)
+                if rec is None:
+                    removed.append(path)
+                else:
+                    modified.append(rec)
+            else:
+                add_path(path)
+    return {"removed": removed, "added": added, "modified": modified, "renamed": renamed}
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QHeaderView, QPushButton, QCheckBox, QLabel, QPlainTextEdit, QFileDialog, QMessageBox
+)
+
+from core.telemetry import Telemetry
+
+
+def _fmt(val, spec: str = ".1f") -> str:
+    return "-" if val is None else format(val, spec)
+
+
+class DiagnosticsPanel(QDockWidget):
+    """Live per-stage counters for the current run, with JSON export."""
+
+    COLUMNS = ["Stage", "Items", "Time (s)", "Items/s", "MB/s", "Avg ms", "Max ms"]
+
+    def __init__(self, parent=None):
+        super().__init__("Diagnostics", parent)
+        self.setObjectName("DiagnosticsPanel")
+        self._telemetry: Optional[Telemetry] = None
+
+        body = QWidget()
+        lay = QVBoxLayout(body)
+        self.lbl_summary = QLabel("No run yet")
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(self.table.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.lbl_gauges = QLabel("")
+        self.lbl_gauges.setWordWrap(True)
+        self.profile_text = QPlainTextEdit()
+        self.profile_text.setReadOnly(True)
+        self.profile_text.setVisible(False)
+
+        controls = QHBoxLayout()
+        self.chk_profile = QCheckBox("Capture profile (cProfile) on next run")
+        self.btn_export = QPushButton("Export JSON…")
+        self.btn_export.clicked.connect(self.on_export)
+        controls.addWidget(self.chk_profile)
+        controls.addStretch(1)
+        controls.addWidget(self.btn_export)
+
+        lay.addWidget(self.lbl_summary)
+        lay.addWidget(self.table, 1)
+        lay.addWidget(self.lbl_gauges)
+        lay.addWidget(self.profile_text, 1)
+        lay.addLayout(controls)
+        self.setWidget(body)
+
+        # Refresh only while visible; stats are cheap to snapshot
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(lambda vis: self._timer.start() if vis else self._timer.stop())
+
+    def profile_requested(self) -> bool:
+        return self.chk_profile.isChecked()
+
+    def set_telemetry(self, telemetry: Optional[Telemetry]):
+        self._telemetry = telemetry
+        self.refresh()
+
+    def refresh(self):
+        t = self._telemetry
+        if t is None:
+            return
+        snap = t.snapshot()
+        state = "finished" if t.finished else "running"
+        self.lbl_summary.setText(f"Run {state}: {snap['elapsed_s']:.1f} s elapsed")
+        rows = t.rows()
+        self.table.setRowCount(len(rows))
+        for i, st in enumerate(rows):
+            mbps = st["bytes_per_s"] / (1024 * 1024) if st["bytes_per_s"] else None
+            vals = [
+                st["name"], str(int(st["items"])), _fmt(st["seconds"], ".2f"),
+                _fmt(st["items_per_s"]), _fmt(mbps), _fmt(st["avg_ms"], ".2f"), _fmt(st["max_ms"], ".1f"),
+            ]
+            for col, v in enumerate(vals):
+                item = QTableWidgetItem(v)
+                if col:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(i, col, item)
+        gauges = [f"{k}: {int(g['last'])} (peak {int(g['peak'])})" for k, g in snap["gauges"].items()]
+        self.lbl_gauges.setText("Queues — " + ", ".join(gauges) if gauges else "")
+        profiles = snap["profiles"]
+        self.profile_text.setVisible(bool(profiles))
+        if profiles:
+            self.profile_text.setPlainText("\n".join(f"== {k} ==\n{v}" for k, v in profiles.items()))
+
+    def on_export(self):
+        if self._telemetry is None:
+            QMessageBox.information(self, "Diagnostics", "No run to export yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export diagnostics", "neatcore-run.json", "JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            self._telemetry.export_json(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Export Error", str(e))
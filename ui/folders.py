@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeWidget, QTreeWidgetItem,
+)
+
+from core.utils import human_size
+
+
+class DuplicateFoldersPanel(QDockWidget):
+    """Folder-level duplicate groups: one collapsed entry per set of copies,
+    the kept folder first. "Select Copies" ticks the files of the other
+    copies whose exact content is also in the kept folder."""
+
+    select_copies = Signal(list)  # [(keeper folder, [copy folders])]
+
+    def __init__(self, parent=None):
+        super().__init__("Duplicate Folders", parent)
+        self.setObjectName("DuplicateFoldersPanel")
+        self._groups: List[Dict] = []
+
+        body = QWidget()
+        lay = QVBoxLayout(body)
+        self.summary = QLabel("No duplicate folders")
+        self.summary.setWordWrap(True)
+        lay.addWidget(self.summary)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Folders", "Files", "Size", "Reclaimable"])
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSelectionMode(QTreeWidget.ExtendedSelection)
+        lay.addWidget(self.tree, 1)
+        bar = QHBoxLayout()
+        self.btn_select = QPushButton("Select Copies")
+        self.btn_select.setToolTip("Tick the files of every copy except the kept (oldest) folder")
+        self.btn_select.clicked.connect(self._on_select)
+        bar.addStretch(1)
+        bar.addWidget(self.btn_select)
+        lay.addLayout(bar)
+        self.setWidget(body)
+
+    def set_groups(self, groups: List[Dict]):
+        self._groups = groups
+        self.tree.clear()
+        items = []
+        for i, g in enumerate(groups):
+            n = len(g["folders"])
+            if g["kind"] == "similar":
+                title = f"Similar folders ({g['similarity']:.0%} alike)"
+            else:
+                title = f"{n} {'probably ' if g['kind'] == 'probable' else ''}identical folders"
+            top = QTreeWidgetItem([title, str(g["files"]), human_size(g["bytes"]), human_size(g["reclaimable"])])
+            top.setData(0, Qt.UserRole, i)
+            for j, path in enumerate(g["folders"]):
+                child = QTreeWidgetItem([path + ("  (keep)" if j == 0 else ""), "", "", ""])
+                child.setToolTip(0, path)
+                top.addChild(child)
+            items.append(top)
+        self.tree.addTopLevelItems(items)
+        for col in (1, 2, 3):
+            self.tree.resizeColumnToContents(col)
+        total = sum(g["reclaimable"] for g in groups)
+        self.summary.setText(
+            f"{len(groups)} folder groups, {human_size(total)} reclaimable" if groups else "No duplicate folders")
+        self.btn_select.setEnabled(bool(groups))
+
+    def clear(self):
+        self.set_groups([])
+
+    def _on_select(self):
+        picked = set()
+        for item in self.tree.selectedItems():
+            top = item.parent() or item
+            picked.add(top.data(0, Qt.UserRole))
+        if not picked:
+            # Nothing selected: every identical group (never probable or similar ones)
+            picked = {i for i, g in enumerate(self._groups) if g["kind"] == "identical"}
+        self.select_copies.emit([(self._groups[i]["folders"][0], self._groups[i]["folders"][1:])
+                                 for i in sorted(picked)])
@@ -1,26 +1,57 @@
 from __future__ import annotations
 
 import os
-import zipfile
+import time
+from collections import deque
 from typing import List, Dict
 
 from PySide6.QtCore import Qt, QTimer, QEasingCurve, QPropertyAnimation
-from PySide6.QtGui import QAction, QColor, QBrush, QLinearGradient, QGradient
+from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox,
-    QMessageBox, QProgressBar, QComboBox, QApplication, QFrame
+    QFileDialog, QTableView, QHeaderView, QCheckBox,
+    QMessageBox, QProgressBar, QComboBox, QApplication, QFrame, QInputDialog, QSlider
 )
 
 from qt_material import apply_stylesheet
 # Charts removed; keep guard variables to avoid NameError in legacy calls
 _HAS_CHARTS = False
 from PySide6.QtWidgets import QGraphicsOpacityEffect
-from send2trash import send2trash
 
-from core.utils import human_size, normalize_path, windows_long_path
-from .workers import ScanWorker, AnalyzeWorker
+from core.utils import human_size, normalize_path, in_downloads_path
+from core.telemetry import Telemetry, maybe_timed
+from core.scanner import FAST_EXCLUDE_DIR_NAMES
+from core.watcher import plan_updates
+from core.compress import available_methods
+from core.dedupe import exact_groups, pick_keeper
+from core.thumbs import ThumbnailCache
+from core.docsim import SignatureCache
+from core.memo import AnalysisCache
+from core.dupgraph import MAX_EDGE_BITS, build_clusters
+from core.checkpoint import Checkpoint, checkpoint_key
+from core.rollup import SpaceTree
+from core.stages import stage_fingerprints, stage_options, stale_stages
+from .workers import ScanWorker, AnalyzeWorker, SessionWorker, WatchWorker, ActionWorker, ThumbWorker, build_payload
 from .indicators import BusyIndicator
+from .diagnostics import DiagnosticsPanel
+from .preview import PreviewPanel
+from .treemap import SpacePanel
+from .folders import DuplicateFoldersPanel
+from .results import ResultsModel, ROW_FILTERS, COL_DUPS, reco_text
+
+
+def _is_image(rec: Dict) -> bool:
+    return rec.get("kind") == "image"
+
+
+# Record-level stand-ins for the table filters: matching files are analysed first
+_FILTER_PRIORITY = {
+    "Images": _is_image,
+    "Documents": lambda rec: rec.get("kind") == "document",
+    "Screenshots": _is_image,
+    "Low Quality": _is_image,
+    "Old Downloads": lambda rec: in_downloads_path(rec.get("path", "")),
+}
 
 
 class MainWindow(QMainWindow):
@@ -31,6 +62,7 @@ class MainWindow(QMainWindow):
 
         self._records: List[Dict] = []
         self._analyses: Dict[str, Dict] = {}
+        self._telemetry: Telemetry | None = None
 
         # Theming (apply to the QApplication instance)
         app = QApplication.instance()
@@ -65,12 +97,47 @@ class MainWindow(QMainWindow):
         self.filter_combo = QComboBox()
         self.filter_combo.addItems(["All", "Images", "Documents", "Screenshots", "Low Quality", "Old Downloads", "Recommended Delete"])
         self.chk_duplicates = QCheckBox("Find Duplicates")
+        self.chk_duplicates.setChecked(True)
+        # Confidence level for large files (see core.duplicates.CONFIDENCE_LEVELS)
+        self.dup_mode_combo = QComboBox()
+        self.dup_mode_combo.addItem("Exact (read all)", "full")
+        self.dup_mode_combo.addItem("Probable (sample large files)", "sampled")
+        self.dup_mode_combo.addItem("Sample + verify", "verify")
+        self.dup_mode_combo.setToolTip(
+            "How files over 256 MB are compared: fully hashed, matched on sampled blocks only\n"
+            "(fast, marked as probable duplicates), or sampled first and fully verified when samples match")
         self.chk_perceptual = QCheckBox("Similar Images (pHash)")
+        # Similar-image threshold; regroups from the stored neighbour graph, no re-run
+        self.sim_slider = QSlider(Qt.Horizontal)
+        self.sim_slider.setRange(0, MAX_EDGE_BITS)
+        self.sim_slider.setValue(5)
+        self.sim_slider.setFixedWidth(90)
+        self.sim_slider.setEnabled(False)
+        self.sim_slider.setToolTip("How many pHash bits similar images may differ in (lower is stricter).\n"
+                                   "Available after a run with Similar Images; regroups instantly")
+        self.lbl_sim = QLabel("≤5 bits")
+        # Duplicate groups and the similar-image graph of the last analysis (see on_dup_graph)
+        self._dup_state: Dict | None = None
+        self._sim_threshold: int | None = None
+        self.chk_documents = QCheckBox("Similar Documents")
+        self.chk_documents.setToolTip(
+            "Find re-saved or lightly edited copies of documents by their text\n"
+            "(txt, md, rtf, docx, xlsx, pptx; pdf when pypdf is installed)")
         self.chk_ai = QCheckBox("Enable AI (CLIP)")
         self.btn_scan = QPushButton("Scan")
         self.btn_stop = QPushButton("Stop")
+        self.btn_pause = QPushButton("Pause")
+        self.btn_pause.setToolTip("Pause scanning/analysis (takes effect inside large files too)")
         self.chk_fast = QCheckBox("Fast Mode")
         self.chk_fast.setChecked(True)
+        self.chk_netio = QCheckBox("Adaptive I/O")
+        self.chk_netio.setChecked(True)
+        self.chk_netio.setToolTip("Detect network shares / high-latency folders and scan them with many parallel requests")
+        self.chk_sniff = QCheckBox("Sniff Content")
+        self.chk_sniff.setChecked(False)
+        self.chk_sniff.setToolTip("Identify files with unknown or generic extensions (.dat, .bin, none) by their first bytes")
+        self.chk_watch = QCheckBox("Watch Changes")
+        self.chk_watch.setToolTip("Keep results current when files are added, changed or removed")
         self.btn_quick = QPushButton("Quick Suggest")
         self.busy_indicator = BusyIndicator()
         self.busy_indicator.setVisible(False)
@@ -85,20 +152,28 @@ class MainWindow(QMainWindow):
         top_l.addWidget(QLabel("Filter:"))
         top_l.addWidget(self.filter_combo)
         top_l.addWidget(self.chk_duplicates)
+        top_l.addWidget(self.dup_mode_combo)
         top_l.addWidget(self.chk_perceptual)
+        top_l.addWidget(self.sim_slider)
+        top_l.addWidget(self.lbl_sim)
+        top_l.addWidget(self.chk_documents)
         top_l.addWidget(self.chk_ai)
         top_l.addWidget(self.chk_fast)
+        top_l.addWidget(self.chk_netio)
+        top_l.addWidget(self.chk_sniff)
+        top_l.addWidget(self.chk_watch)
         top_l.addWidget(self.busy_indicator)
         top_l.addWidget(self.btn_scan)
         top_l.addWidget(self.btn_stop)
+        top_l.addWidget(self.btn_pause)
         top_l.addWidget(self.btn_quick)
         top_l.addWidget(self.progress)
 
-        # Table
-        self.table = QTableWidget(0, 8)
-        self.table.setHorizontalHeaderLabels([
-            "Select", "Path", "Type", "Size", "Modified", "Classification", "Duplicates", "Recommendation"
-        ])
+        # Table: rows come from the model as they are drawn (see ui/results.py)
+        self.results = ResultsModel(self._analyses_get, self)
+        self.table = QTableView()
+        self.table.setModel(self.results)
+        self.table.verticalHeader().setDefaultSectionSize(30)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(self.table.SelectionBehavior.SelectRows)
         self.table.setEditTriggers(self.table.EditTrigger.NoEditTriggers)
@@ -120,7 +195,7 @@ class MainWindow(QMainWindow):
             """
         )
         # Hide the Duplicates column completely
-        self.table.setColumnHidden(6, True)
+        self.table.setColumnHidden(COL_DUPS, True)
 
         # Bottom action bar
         bottom = QWidget()
@@ -129,10 +204,13 @@ class MainWindow(QMainWindow):
         self.btn_delete = QPushButton("Delete Selected")
         self.btn_move = QPushButton("Move Selected")
         self.btn_compress = QPushButton("Compress Selected")
+        self.btn_link = QPushButton("Link Duplicates")
+        self.btn_link.setToolTip("Replace exact duplicates with reflinks/hardlinks to one kept copy")
         bottom_l.addWidget(self.btn_select_reco)
         bottom_l.addWidget(self.btn_delete)
         bottom_l.addWidget(self.btn_move)
         bottom_l.addWidget(self.btn_compress)
+        bottom_l.addWidget(self.btn_link)
         bottom_l.addStretch(1)
 
         # Central layout (main content) — Overview removed per request
@@ -150,16 +228,29 @@ class MainWindow(QMainWindow):
         self.btn_delete.clicked.connect(self.on_delete_selected)
         self.btn_move.clicked.connect(self.on_move_selected)
         self.btn_compress.clicked.connect(self.on_compress_selected)
+        self.btn_link.clicked.connect(self.on_link_duplicates)
         self.btn_clear.clicked.connect(self.on_clear_folders)
         self.filter_combo.currentTextChanged.connect(self.apply_filter)
         self.btn_stop.clicked.connect(self.on_stop)
+        self.btn_pause.clicked.connect(self.on_pause)
         self.btn_quick.clicked.connect(self.on_quick_suggest)
+        self.chk_watch.toggled.connect(self._update_watch)
 
         # Workers
         self._scan_worker = None
         self._analyze_worker = None
         self._folders: list[str] = []
-        self._chunk_buffer: list[Dict] = []
+        self._chunk_buffer: deque[Dict] = deque()
+        self._session_worker = None
+        self._watch_worker = None
+        self._action_worker = None
+        self._checkpoint = None
+        # Stage fingerprints of the last complete run, and of the one in progress (see core.stages)
+        self._stage_fps: Dict[str, str] | None = None
+        self._run_fps: Dict[str, str] | None = None
+        self._pending_changes: list[Dict] = []
+        # Files a running file operation has already handled
+        self._action_removed: set = set()
         self._flush_timer = QTimer(self)
         self._flush_timer.setInterval(300)  # Збільшено інтервал для кращої продуктивності
         self._flush_timer.timeout.connect(self._flush_rows)
@@ -179,12 +270,6 @@ class MainWindow(QMainWindow):
         self._progress_anim.setEndValue(1.0)
         self._progress_anim.setEasingCurve(QEasingCurve.InOutQuad)
 
-        # Row animation queue
-        self._row_anim_timer = QTimer(self)
-        self._row_anim_timer.setInterval(30)
-        self._row_anim_timer.timeout.connect(self._tick_row_fade)
-        self._fading_rows = {}  # row -> step (0..10)
-
         # State
         self._stopped = False
         self.btn_stop.setEnabled(False)
@@ -201,6 +286,67 @@ class MainWindow(QMainWindow):
         self.menuBar().addAction(theme_action)
         self._is_dark = True
 
+        # Session save/load (skip re-scanning and re-analysis)
+        session_menu = self.menuBar().addMenu("Session")
+        open_action = QAction("Open Session…", self)
+        open_action.triggered.connect(self.on_open_session)
+        save_action = QAction("Save Session…", self)
+        save_action.triggered.connect(self.on_save_session)
+        session_menu.addAction(open_action)
+        session_menu.addAction(save_action)
+
+        # Diagnostics panel (per-stage timings), hidden until requested
+        self.diagnostics = DiagnosticsPanel(self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.diagnostics)
+        self.diagnostics.setVisible(False)
+        diag_action = self.diagnostics.toggleViewAction()
+        diag_action.setText("Diagnostics")
+        self.menuBar().addAction(diag_action)
+
+        # Preview pane; thumbnails come from the shared two-level cache
+        self._thumbs = ThumbnailCache()
+        # MinHash signatures of documents by content hash, kept across runs
+        self._doc_sigs = SignatureCache()
+        # Image analysis results by content hash, kept across runs
+        self._analysis_cache = AnalysisCache()
+        self.preview = PreviewPanel(self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.preview)
+        preview_action = self.preview.toggleViewAction()
+        preview_action.setText("Preview")
+        self.menuBar().addAction(preview_action)
+        self._thumb_worker = ThumbWorker(self._thumbs)
+        self._thumb_worker.ready.connect(self.preview.set_thumbnail)
+        self._thumb_worker.start()
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
+
+        # Space usage: treemap and largest files/folders from per-folder rollups
+        self._space = SpaceTree()
+        self.space_panel = SpacePanel(self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.space_panel)
+        self.space_panel.setVisible(False)
+        self.space_panel.set_tree(self._space)
+        space_action = self.space_panel.toggleViewAction()
+        space_action.setText("Space")
+        self.menuBar().addAction(space_action)
+        self._space_timer = QTimer(self)
+        self._space_timer.setInterval(1000)
+        self._space_timer.timeout.connect(self.space_panel.refresh)
+
+        self._regroup_timer = QTimer(self)
+        self._regroup_timer.setSingleShot(True)
+        self._regroup_timer.setInterval(150)
+        self._regroup_timer.timeout.connect(self._regroup_similar)
+        self.sim_slider.valueChanged.connect(self._on_sim_slider)
+
+        # Whole folders that are copies of each other, collapsed to one entry per group
+        self.folder_panel = DuplicateFoldersPanel(self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.folder_panel)
+        self.folder_panel.setVisible(False)
+        folder_action = self.folder_panel.toggleViewAction()
+        folder_action.setText("Duplicate Folders")
+        self.menuBar().addAction(folder_action)
+        self.folder_panel.select_copies.connect(self.on_select_folder_copies)
+
         # Loading overlay for long analysis phase
         self._overlay_dismissed = False
         self._loading_overlay = QWidget(self)
@@ -241,6 +387,14 @@ class MainWindow(QMainWindow):
         self._overlay_timer.setSingleShot(True)
         self._overlay_timer.timeout.connect(lambda: self._show_loading_overlay(True))
 
+        # Tell the analysis worker which rows are on screen (debounced while scrolling)
+        self._viewport_timer = QTimer(self)
+        self._viewport_timer.setSingleShot(True)
+        self._viewport_timer.setInterval(120)
+        self._viewport_timer.timeout.connect(self._report_viewport)
+        self.table.verticalScrollBar().valueChanged.connect(self._viewport_timer.start)
+        self.filter_combo.currentTextChanged.connect(self._viewport_timer.start)
+
     def _dismiss_overlay(self):
         # Hide and mark dismissed to avoid re-showing during this analysis session
         self._overlay_dismissed = True
@@ -270,35 +424,121 @@ class MainWindow(QMainWindow):
         self.lbl_folder.setText("No folders selected")
 
     def on_scan(self):
+        self._stop_watch()
         # Reset overlay dismissal for new run
         self._overlay_dismissed = False
         # Reset seen paths to avoid stale duplicates across runs
         self._seen_paths = set()
         # Cancel previous runs if any
+        # Cancellation is checked inside hashing/decoding, so these return promptly
         if self._scan_worker and self._scan_worker.isRunning():
-            self._scan_worker.cancel(); self._scan_worker.wait(500)
+            self._scan_worker.cancel(); self._scan_worker.wait()
         if self._analyze_worker and self._analyze_worker.isRunning():
-            self._analyze_worker.cancel(); self._analyze_worker.wait(500)
+            self._analyze_worker.cancel(); self._analyze_worker.wait()
 
         if not self._folders:
             QMessageBox.warning(self, "Select Folders", "Please add at least one folder to scan.")
             return
+        settings = self._run_settings()
+        # Options changed but not what is scanned: rerun only the invalidated stages on the loaded
+        # records. Scan with nothing changed is a full refresh.
+        self._run_fps = stage_fingerprints(stage_options(self._folders, **settings))
+        stale = stale_stages(self._stage_fps, self._run_fps)
+        self._stage_fps = None
+        if self._records and stale and "scan" not in stale:
+            self._rerun_stages(stale, settings)
+            return
+        self._checkpoint = Checkpoint(checkpoint_key(self._folders, settings))
+        resume = self._ask_resume(self._checkpoint)
         self._stopped = False
         self._set_busy(True)
-        self.table.setRowCount(0)
+        self._clear_table()
         # Indeterminate progress during scanning
         self.progress.setRange(0, 0)
         self._records = []
         self._analyses = {}
         self._chunk_buffer.clear()
+        self._reset_space()
+        self.folder_panel.clear()
+        self._reset_similar()
 
-        self._scan_worker = ScanWorker(self._folders, compute_hash=self.chk_duplicates.isChecked(), fast_mode=self.chk_fast.isChecked())
+        self._telemetry = Telemetry(profile=self.diagnostics.profile_requested())
+        self._telemetry.meta.update({
+            "folders": list(self._folders),
+            **settings,
+            "adaptive_io": self.chk_netio.isChecked(),
+        })
+        self.diagnostics.set_telemetry(self._telemetry)
+
+        # Grouping hashes only files that share a size, in on-disk order (core.locality);
+        # hashing during the walk would read every byte in directory order
+        self._scan_worker = ScanWorker(self._folders, compute_hash=False,
+                                       fast_mode=self.chk_fast.isChecked(), telemetry=self._telemetry,
+                                       sniff=self.chk_sniff.isChecked(), adaptive_io=self.chk_netio.isChecked(),
+                                       checkpoint=self._checkpoint, resume_checkpoint=resume,
+                                       space=self._space)
         self._scan_worker.progress.connect(self.on_scan_progress)
         self._scan_worker.chunk.connect(self.on_scan_chunk)
         self._scan_worker.done.connect(self.on_scan_done)
         self._scan_worker.error.connect(self._on_worker_error)
         self._scan_worker.start()
         self._flush_timer.start()
+        self._space_timer.start()
+
+    def _run_settings(self) -> Dict:
+        return {
+            "duplicates": self.chk_duplicates.isChecked(),
+            "dup_confidence": self.dup_mode_combo.currentData(),
+            "perceptual": self.chk_perceptual.isChecked(),
+            "documents": self.chk_documents.isChecked(),
+            "ai": self.chk_ai.isChecked(),
+            "fast_mode": self.chk_fast.isChecked(),
+            "sniff": self.chk_sniff.isChecked(),
+        }
+
+    def _rerun_stages(self, stale: List[str], settings: Dict):
+        regroup = "group" in stale
+        self._overlay_dismissed = False
+        self._stopped = False
+        self._checkpoint = None
+        self._set_busy(True)
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        previous = dict(self._analyses)
+        if regroup:
+            self.folder_panel.clear()
+            self._reset_similar()
+        self._telemetry = Telemetry(profile=self.diagnostics.profile_requested())
+        self._telemetry.meta.update({
+            "folders": list(self._folders),
+            **settings,
+            "stages_run": stale,
+        })
+        self.diagnostics.set_telemetry(self._telemetry)
+        self.statusBar().showMessage(f"Options changed: re-running {', '.join(stale)} on {len(self._records)} files",
+                                     5000)
+        self._overlay_timer.start(800)
+        self._start_analysis(self._records,
+                             resume_from=None if "analyze" in stale else previous,
+                             dup_from=None if regroup else previous)
+
+    def _ask_resume(self, checkpoint: Checkpoint) -> bool:
+        """Offer to continue an interrupted run of the same folders and options."""
+        info = checkpoint.info()
+        if info is None:
+            return False
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(info.get("saved", 0)))
+        stage = "analysis" if info.get("stage") == "analyze" else "scan"
+        answer = QMessageBox.question(
+            self, "Resume Run",
+            f"An unfinished {stage} of these folders was saved on {when}: "
+            f"{info.get('count', 0)} files scanned, {info.get('analysed', 0)} analysed.\n\n"
+            "Resume from there? Choose No to start a fresh scan.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if answer == QMessageBox.Yes:
+            return True
+        checkpoint.clear()
+        return False
 
     def on_scan_progress(self, val: int):
         if val == 0:
@@ -320,9 +560,15 @@ class MainWindow(QMainWindow):
         self._chunk_buffer.append(rec)
 
     def on_scan_done(self, records: List[Dict]):
-        # Finish any pending UI updates
+        # Finish any pending UI updates; a large remainder (e.g. rows restored
+        # from a checkpoint) keeps draining on the timer
         self._flush_rows()
-        self._flush_timer.stop()
+        if self._chunk_buffer:
+            self._flush_timer.start()
+        else:
+            self._flush_timer.stop()
+        self._space_timer.stop()
+        self.space_panel.refresh()
         if self._stopped:
             # User stopped; do not start analysis
             self._set_busy(False)
@@ -333,191 +579,107 @@ class MainWindow(QMainWindow):
         self.progress.setRange(0, 100)
         self.progress.setValue(0)
         self._records = records
+        sniffer = self._scan_worker.sniffer if self._scan_worker is not None else None
+        if sniffer is not None:
+            self._telemetry.meta["sniff"] = dict(sniffer.stats)
+            st = sniffer.stats
+            if st["reclassified"] or st["over_budget"]:
+                skipped = f", {st['over_budget']} skipped (budget)" if st["over_budget"] else ""
+                self.statusBar().showMessage(
+                    f"Content sniffing: {st['reclassified']} of {st['sniffed']} unknown files reclassified{skipped}", 8000)
         # Start analysis
         # Schedule the loading overlay to avoid flicker on quick runs
         self._overlay_timer.start(800)
+        self._start_analysis(records, self._scan_worker.resumed_analyses if self._scan_worker is not None else None)
+
+    def _start_analysis(self, records: List[Dict], resume_from: Dict[str, Dict] | None = None,
+                        dup_from: Dict[str, Dict] | None = None):
         self._analyze_worker = AnalyzeWorker(
             records=records,
             enable_ai=self.chk_ai.isChecked(),
             use_perceptual=self.chk_perceptual.isChecked(),
+            use_documents=self.chk_documents.isChecked(),
+            doc_cache=self._doc_sigs,
+            analysis_cache=self._analysis_cache,
             fast_mode=self.chk_fast.isChecked(),
+            use_exact=self.chk_duplicates.isChecked(),
+            telemetry=self._telemetry,
+            confidence=self.dup_mode_combo.currentData(),
+            thumbs=self._thumbs,
+            checkpoint=self._checkpoint,
+            resume_from=resume_from,
+            dup_from=dup_from,
+            folder_roots=list(self._folders),
         )
+        self._analyze_worker.folder_groups.connect(self.on_folder_groups)
+        self._analyze_worker.dup_graph.connect(self.on_dup_graph)
         self._analyze_worker.progress.connect(self.progress.setValue)
         self._analyze_worker.analyzed.connect(self.on_analyzed)
         self._analyze_worker.analyzed_batch.connect(self.on_analyzed_batch)
         self._analyze_worker.done.connect(self.on_analysis_done)
         self._analyze_worker.error.connect(self._on_worker_error)
         self._analyze_worker.start()
+        self._report_viewport()
+
+    def _report_viewport(self):
+        worker = self._analyze_worker
+        if worker is None or not worker.isRunning() or self.results.rowCount() == 0:
+            return
+        n = self.results.rowCount()
+        first = max(0, self.table.rowAt(0))
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = n - 1
+        # The screen plus one more screen below it, so scrolling lands on analysed rows
+        want = 2 * (last - first + 1)
+        paths: List[str] = []
+        row = first
+        while row < n and len(paths) < want:
+            paths.append(self.results.path_at(row))
+            row += 1
+        worker.prioritize(paths, _FILTER_PRIORITY.get(self.filter_combo.currentText()))
+
+    def _analyses_get(self, path: str) -> Dict | None:
+        return self._analyses.get(path)
 
-    def _add_table_row(self, rec: Dict):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        # Select checkbox
-        chk = QCheckBox()
-        chk.setChecked(False)
-        # Make checkbox cell transparent to avoid white stripes
-        chk.setAttribute(Qt.WA_TranslucentBackground, True)
-        chk.setStyleSheet("QCheckBox{background: transparent;} QCheckBox::indicator{border:0;background:transparent;}")
-        self.table.setCellWidget(row, 0, chk)
-
-        # Path
-        self.table.setItem(row, 1, QTableWidgetItem(rec.get("path", "")))
-        # Type
-        self.table.setItem(row, 2, QTableWidgetItem(rec.get("kind", "")))
-        # Size
-        self.table.setItem(row, 3, QTableWidgetItem(human_size(rec.get("size", 0))))
-        # Modified
-        self.table.setItem(row, 4, QTableWidgetItem(str(int(rec.get("mtime", 0)))))
-        # Classification
-        self.table.setItem(row, 5, QTableWidgetItem("-"))
-        # Duplicates
-        self.table.setItem(row, 6, QTableWidgetItem("0"))
-        # Recommendation
-        self.table.setItem(row, 7, QTableWidgetItem("-"))
-        # Initial color by kind
-        # Apply initial muted style, then schedule animated reveal
-        self._apply_row_style(row, kind=rec.get("kind", "other"), analysis=None, dup_count=0, reco=None)
-        # Register for fade effect
-        self._fading_rows[row] = 0
-        if not self._row_anim_timer.isActive():
-            self._row_anim_timer.start()
-        self._update_chart()
+    def _clear_table(self):
+        self.results.clear()
 
     def on_analyzed(self, payload: Dict):
         if self._stopped:
             return
         path = payload.get("path")
         self._analyses[path] = payload
-        # Find row by path
-        for row in range(self.table.rowCount()):
-            if self.table.item(row, 1).text() == path:
-                analysis = payload.get("analysis", {})
-                reco = payload.get("recommendation", {})
-                dup_count = payload.get("dup_count", 0)
-                self.table.setItem(row, 5, QTableWidgetItem(f"{analysis.get('label','-')} ({analysis.get('confidence',0):.2f})"))
-                self.table.setItem(row, 6, QTableWidgetItem(str(dup_count)))
-                self.table.setItem(row, 7, QTableWidgetItem(
-                    f"{reco.get('primary_action','-')}: "+"; ".join(reco.get('reasons', []))
-                ))
-                self._apply_row_style(row, kind=self.table.item(row, 2).text(), analysis=analysis, dup_count=dup_count, reco=reco)
-                break
-
-        # Update filter visibility and chart after analysis comes in
-        self.apply_filter()
+        # Repaints the row, and shows or hides it where the filter result changed
+        self.results.refresh([path])
 
     def on_analyzed_batch(self, payloads: List[Dict]):
         if self._stopped:
             return
-        # Відключити оновлення UI для швидшого batch update
-        self.table.setUpdatesEnabled(False)
-        try:
-            # Batch update rows for speed
-            for payload in payloads:
-                path = payload.get("path")
-                self._analyses[path] = payload
-            # Build an index map from path to row
-            index = {}
-            for row in range(self.table.rowCount()):
-                index[self.table.item(row, 1).text()] = row
-            for payload in payloads:
-                path = payload.get("path")
-                row = index.get(path)
-                if row is None:
-                    continue
-                analysis = payload.get("analysis", {})
-                reco = payload.get("recommendation", {})
-                dup_count = payload.get("dup_count", 0)
-                self.table.setItem(row, 5, QTableWidgetItem(f"{analysis.get('label','-')} ({analysis.get('confidence',0):.2f})"))
-                self.table.setItem(row, 6, QTableWidgetItem(str(dup_count)))
-                self.table.setItem(row, 7, QTableWidgetItem(
-                    f"{reco.get('primary_action','-')}: "+"; ".join(reco.get('reasons', []))
-                ))
-                self._apply_row_style(row, kind=self.table.item(row, 2).text(), analysis=analysis, dup_count=dup_count, reco=reco)
-            self.apply_filter()
-        finally:
-            # Увімкнути оновлення UI назад
-            self.table.setUpdatesEnabled(True)
+        for payload in payloads:
+            self._analyses[payload.get("path")] = payload
+        with maybe_timed(self._telemetry, "ui.refresh", items=len(payloads)):
+            self.results.refresh(payload.get("path") for payload in payloads)
 
     def on_analysis_done(self):
+        if not self._stopped:
+            self._stage_fps = self._run_fps
         self.statusBar().showMessage("Analysis complete", 5000)
+        self._update_reclaimable()
+        self.diagnostics.refresh()
+        self._update_watch()
         self._set_busy(False)
         self._overlay_timer.stop()
         self._show_loading_overlay(False)
 
-    def _update_chart(self):
-        # Charts are disabled - skip chart updates
-        pass
-
-    def _apply_row_style(self, row: int, kind: str, analysis: Dict|None, dup_count: int, reco: Dict|None):
-        # Gradient mapping per type for full-row banding - ЗЕЛЕНО-СИНЯ СХЕМА
-        def grad(base: QColor, accent: QColor) -> QBrush:
-            g = QLinearGradient(0, 0, 1, 0)
-            g.setCoordinateMode(QGradient.ObjectBoundingMode)
-            g.setColorAt(0.0, base)
-            g.setColorAt(0.6, base)
-            g.setColorAt(1.0, accent)
-            return QBrush(g)
-
-        label = (analysis or {}).get("label", kind)
-        q = (analysis or {}).get("quality", {})
-        primary = (reco or {}).get("primary_action", "")
-        if label == "screenshot":
-            brush = grad(QColor(180, 220, 240), QColor(140, 200, 230))  # Блакитний
-        elif label == "photo":
-            brush = grad(QColor(200, 240, 230), QColor(160, 230, 210))  # М'ятний
-        elif kind == "document":
-            brush = grad(QColor(210, 250, 220), QColor(180, 240, 200))  # Світло-зелений
-        elif kind == "video":
-            brush = grad(QColor(190, 230, 240), QColor(160, 215, 230))  # Блакитний
-        elif kind == "audio":
-            brush = grad(QColor(200, 235, 245), QColor(175, 220, 235))  # Світло-синій
-        elif kind == "archive":
-            brush = grad(QColor(180, 240, 235), QColor(150, 225, 220))  # Бірюзовий
-        elif dup_count > 0:
-            brush = grad(QColor(160, 220, 210), QColor(130, 200, 190))  # Темно-м'ятний
-        elif q.get("is_low_sharpness") or q.get("is_dark") or q.get("is_small") or primary == "delete":
-            brush = grad(QColor(255, 200, 180), QColor(245, 180, 160))  # Помаранчевий (для попередження)
-        else:
-            brush = grad(QColor(235, 245, 245), QColor(225, 240, 240))  # Нейтральний світлий
-        # Color all columns, including the checkbox cell
-        for col in range(self.table.columnCount()):
-            item = self.table.item(row, col)
-            if item is not None:
-                item.setBackground(brush)
-            else:
-                w = self.table.cellWidget(row, col)
-                if w is not None:
-                    # Approximate background for widget cell
-                    try:
-                        pal = w.palette()
-                        pal.setColor(w.backgroundRole(), QColor(235, 235, 235))
-                        w.setAutoFillBackground(True)
-                        w.setPalette(pal)
-                    except Exception:
-                        pass
-
-        # Increase row height slightly for nicer banding
-        self.table.setRowHeight(row, max(self.table.rowHeight(row), 30))
-
-        # Tooltip with explanation for AI decision
-        reasons = (reco or {}).get("reasons", [])
-        tip_lines = [f"Type: {kind}", f"Class: {label}"]
-        if dup_count:
-            tip_lines.append(f"Duplicates: {dup_count}")
-        qv = (analysis or {}).get("quality", {})
-        if qv:
-            try:
-                tip_lines.append(f"Quality: {qv.get('width','?')}x{qv.get('height','?')}, bright={float(qv.get('brightness',0)):.1f}, sharp={float(qv.get('sharpness',0)):.1f}")
-            except Exception:
-                pass
-        if reasons:
-            tip_lines.append("Reasons: " + "; ".join(reasons))
-        tooltip = "\n".join(tip_lines)
-        for col in range(1, self.table.columnCount()):
-            itm = self.table.item(row, col)
-            if itm:
-                itm.setToolTip(tooltip)
+    def _reset_space(self):
+        self._space = SpaceTree()
+        self.space_panel.set_tree(self._space)
+
+    def _update_reclaimable(self):
+        # Exact groups only: probable (sampled) matches are not counted as reclaimable
+        self._space.set_reclaimable(exact_groups(self._records))
+        self.space_panel.refresh()
 
     def on_quick_suggest(self):
         # Scan common user folders without manual selection and immediately analyze
@@ -540,73 +702,163 @@ class MainWindow(QMainWindow):
         self.on_scan()
 
     def apply_filter(self):
-        mode = self.filter_combo.currentText()
-        for row in range(self.table.rowCount()):
-            kind = self.table.item(row, 2).text()
-            dup = int(self.table.item(row, 6).text()) if self.table.item(row, 6) else 0
-            label_text = self.table.item(row, 5).text()
-            reco_text = self.table.item(row, 7).text()
-            show = True
-            if mode == "Images":
-                show = (kind == "image")
-            elif mode == "Documents":
-                show = (kind == "document")
-            elif mode == "Screenshots":
-                show = label_text.startswith("screenshot")
-            elif mode == "Low Quality":
-                show = ("Low-quality" in reco_text)
-            elif mode == "Old Downloads":
-                show = ("Downloads" in reco_text)
-            elif mode == "Recommended Delete":
-                show = reco_text.lower().startswith("delete")
-            self.table.setRowHidden(row, not show)
+        with maybe_timed(self._telemetry, "ui.filter", items=len(self._records)):
+            self.results.set_filter(ROW_FILTERS.get(self.filter_combo.currentText()))
 
     def on_select_recommended_deletes(self):
-        # Tick checkboxes for rows recommended for delete
-        count = 0
-        for row in range(self.table.rowCount()):
-            reco_text = self.table.item(row, 7).text().lower() if self.table.item(row, 7) else ""
-            if reco_text.startswith("delete"):
-                w = self.table.cellWidget(row, 0)
-                if isinstance(w, QCheckBox):
-                    if not w.isChecked():
-                        w.setChecked(True)
-                        count += 1
+        # Tick rows recommended for delete, including those not scrolled to yet
+        count = self.results.check_paths(p for p, payload in self._analyses.items()
+                                         if reco_text(payload).lower().startswith("delete"))
         if count == 0:
             self.statusBar().showMessage("No recommended deletes to select", 4000)
         else:
             self.statusBar().showMessage(f"Selected {count} recommended deletes", 4000)
 
+    def on_folder_groups(self, groups: List[Dict]):
+        self.folder_panel.set_groups(groups)
+        if groups and not self.folder_panel.isVisible():
+            total = sum(g["reclaimable"] for g in groups)
+            self.statusBar().showMessage(
+                f"{len(groups)} duplicate folder groups ({human_size(total)} reclaimable): see Duplicate Folders", 8000)
+
+    def _reset_similar(self):
+        self._regroup_timer.stop()
+        self._dup_state = None
+        self._sim_threshold = None
+        self.sim_slider.setEnabled(False)
+
+    def on_dup_graph(self, state: Dict):
+        self._dup_state = state
+        self.sim_slider.blockSignals(True)
+        self.sim_slider.setValue(min(state["threshold"], MAX_EDGE_BITS))
+        self.sim_slider.blockSignals(False)
+        self.lbl_sim.setText(f"≤{self.sim_slider.value()} bits")
+        self.sim_slider.setEnabled(state["graph"] is not None and not self.btn_stop.isEnabled())
+
+    def _on_sim_slider(self, value: int):
+        self.lbl_sim.setText(f"≤{value} bits")
+        if self._dup_state is not None and self._dup_state["graph"] is not None:
+            self._regroup_timer.start()
+
+    def _regroup_similar(self):
+        state = self._dup_state
+        if state is None or state["graph"] is None:
+            return
+        if self._analyze_worker is not None and self._analyze_worker.isRunning():
+            # An incremental run is writing rows; regroup once it is done
+            self._regroup_timer.start()
+            return
+        threshold = self.sim_slider.value()
+        t0 = time.perf_counter()
+        with maybe_timed(self._telemetry, "ui.regroup", items=len(state["graph"])):
+            similar = state["graph"].groups(threshold)
+            clusters = build_clusters(state["groups"] + [("perceptual", g) for g in similar],
+                                      ranking=state["ranking"], features=state["features"])
+            counts: Dict[str, int] = {}
+            keepers = set()
+            probable = set()
+            cluster_of: Dict[str, str] = {}
+            for c in clusters:
+                keepers.add(c["keeper"])
+                probable.update(c["probable"])
+                for r in c["members"]:
+                    counts[r["path"]] = len(c["members"]) - 1
+                    cluster_of[r["path"]] = c["id"]
+            records = {r["path"]: r for r in self._records}
+            changed = []
+            for path, payload in self._analyses.items():
+                count, keeper, cid = counts.get(path, 0), path in keepers, cluster_of.get(path)
+                if (count == payload.get("dup_count", 0) and keeper == bool(payload.get("dup_keeper"))
+                        and cid == payload.get("dup_cluster")):
+                    continue
+                rec = records.get(path)
+                if rec is not None:
+                    changed.append(build_payload(rec, payload.get("analysis") or {}, count, path in probable,
+                                                 keeper, cid))
+        if changed:
+            self.on_analyzed_batch(changed)
+        self._sim_threshold = threshold
+        state["threshold"] = threshold
+        self.statusBar().showMessage(
+            f"Similar images within {threshold} bits: {len(similar)} groups, {len(changed)} rows updated "
+            f"({(time.perf_counter() - t0) * 1000:.0f} ms)", 6000)
+
+    def on_select_folder_copies(self, picks: List[tuple]):
+        # Tick files inside the copies whose exact content is also in the kept folder
+        def under(path: str, folder: str) -> bool:
+            return path.startswith(folder.rstrip("\\/") + os.sep)
+
+        wanted = set()
+        for keeper, copies in picks:
+            kept = {r["hash_md5"] for r in self._records if r.get("hash_md5") and under(r["path"], keeper)}
+            wanted.update(r["path"] for r in self._records
+                          if r.get("hash_md5") in kept and any(under(r["path"], c) for c in copies))
+        count = self.results.check_paths(wanted)
+        self.statusBar().showMessage(f"Selected {count} files in duplicate folders", 4000)
+
+    def on_current_row_changed(self, current, previous):
+        row = current.row()
+        if row < 0 or row == previous.row() or not self.preview.isVisible():
+            return
+        rec = self.results.record_at(row)
+        if rec is None:
+            return
+        path, kind = rec["path"], rec.get("kind") or "other"
+        self.preview.show_file(path, kind, human_size(rec.get("size", 0)), str(int(rec.get("mtime", 0))),
+                               self._analyses.get(path))
+        if kind != "image":
+            return
+        # Warm the cache for the rows the user is most likely to move to next
+        ahead = []
+        for r in (row + 1, row + 2, row - 1):
+            nxt = self.results.record_at(r)
+            if nxt is not None and nxt.get("kind") == "image":
+                ahead.append(nxt["path"])
+        self._thumb_worker.request(path, ahead)
+
     def closeEvent(self, event):
         # Gracefully stop workers to avoid QThread destruction errors
+        self._stop_watch()
         try:
+            self._thumb_worker.cancel()
+            self._thumb_worker.wait(2000)
+            if self._action_worker and self._action_worker.isRunning():
+                self._action_worker.cancel()
+                self._action_worker.wait(5000)
+            # Both stop inside the current file and write a checkpoint before exiting
             if self._scan_worker and self._scan_worker.isRunning():
                 self._scan_worker.cancel()
-                self._scan_worker.wait(2000)
+                self._scan_worker.wait()
             if self._analyze_worker and self._analyze_worker.isRunning():
                 self._analyze_worker.cancel()
-                self._analyze_worker.wait(2000)
+                self._analyze_worker.wait()
+            self._analysis_cache.close()
         except Exception:
             pass
         super().closeEvent(event)
 
     def _flush_rows(self):
-        # Add up to N rows per tick to keep UI responsive
-        N = 500  # Збільшено для кращої продуктивності
+        # Hand the rows scanned since the last tick to the table in one go
         if not self._chunk_buffer:
+            if not (self._scan_worker and self._scan_worker.isRunning()):
+                self._flush_timer.stop()
             return
-        # Відключити оновлення під час пакетного додавання
-        self.table.setUpdatesEnabled(False)
-        try:
-            added = 0
-            while self._chunk_buffer and added < N:
-                rec = self._chunk_buffer.pop(0)
-                self._add_table_row(rec)
-                added += 1
-        finally:
-            self.table.setUpdatesEnabled(True)
+        if self._telemetry is not None:
+            self._telemetry.gauge("ui.row_buffer", len(self._chunk_buffer))
+        t0 = time.perf_counter()
+        rows, self._chunk_buffer = self._chunk_buffer, deque()
+        self.results.append(rows)
+        if self._telemetry is not None:
+            self._telemetry.add("ui.flush", time.perf_counter() - t0, items=len(rows))
+        if self._pending_changes and not (self._analyze_worker is not None and self._analyze_worker.isRunning()):
+            self._apply_pending_changes()
 
     def on_stop(self):
+        if self._action_worker is not None and self._action_worker.isRunning():
+            # Stop the file operation only; keep the current results
+            self._action_worker.cancel()
+            return
+        self._stop_watch()
         try:
             if self._scan_worker and self._scan_worker.isRunning():
                 self._scan_worker.cancel()
@@ -617,13 +869,18 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
         self._stopped = True
+        self._stage_fps = None
         self._flush_timer.stop()
+        self._space_timer.stop()
         self._set_busy(False)
         self.progress.setRange(0, 100)
         self.progress.setValue(0)
+        self._reset_space()
+        self.folder_panel.clear()
+        self._reset_similar()
         # Clear current view and state to avoid showing previous files
         try:
-            self.table.setRowCount(0)
+            self._clear_table()
             self._chunk_buffer.clear()
             self._records = []
             self._analyses = {}
@@ -633,13 +890,38 @@ class MainWindow(QMainWindow):
             self._show_loading_overlay(False)
         except Exception:
             pass
+        if self._checkpoint is not None and self._checkpoint.exists():
+            self.statusBar().showMessage("Stopped. Progress is saved: scan the same folders again to resume.", 8000)
+
+    def on_pause(self):
+        workers = [w for w in (self._scan_worker, self._analyze_worker) if w is not None and w.isRunning()]
+        if not workers:
+            return
+        if any(w.paused for w in workers):
+            for w in workers:
+                w.resume()
+            self.btn_pause.setText("Pause")
+            self.busy_indicator.start()
+            self.statusBar().clearMessage()
+        else:
+            for w in workers:
+                w.pause()
+            self.btn_pause.setText("Resume")
+            self.busy_indicator.stop()
+            self.statusBar().showMessage("Paused")
 
     def _set_busy(self, busy: bool):
         self.btn_stop.setEnabled(busy)
+        self.btn_pause.setEnabled(busy)
+        self.btn_pause.setText("Pause")
         self.btn_scan.setEnabled(not busy)
         enabled = not busy
-        for w in [self.btn_folder, self.btn_clear, self.chk_duplicates, self.chk_perceptual, self.chk_ai, self.chk_fast, self.filter_combo]:
+        # The filter stays usable during a run: it also steers what gets analysed first
+        # Options are fingerprinted when Scan is pressed (core.stages): none may change until the run ends
+        for w in [self.btn_folder, self.btn_clear, self.chk_duplicates, self.dup_mode_combo, self.chk_perceptual,
+                  self.chk_documents, self.chk_ai, self.chk_fast, self.chk_sniff, self.chk_netio]:
             w.setEnabled(enabled)
+        self.sim_slider.setEnabled(enabled and bool(self._dup_state and self._dup_state["graph"] is not None))
         if busy:
             self.busy_indicator.start()
             self.busy_indicator.setVisible(True)
@@ -662,6 +944,8 @@ class MainWindow(QMainWindow):
                 self._loading_overlay.setGeometry(self.rect())
         except Exception:
             pass
+        if hasattr(self, "_viewport_timer"):
+            self._viewport_timer.start()
         super().resizeEvent(event)
 
     def _on_worker_error(self, msg: str):
@@ -690,36 +974,6 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-    def _tick_row_fade(self):
-        if not self._fading_rows:
-            self._row_anim_timer.stop()
-            return
-        finished = []
-        for row, step in list(self._fading_rows.items()):
-            # Increase opacity effect by overlaying a white->none fade (simulate by adjusting alpha of base color)
-            factor = min(step / 10.0, 1.0)
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    bg = item.background()
-                    # Convert gradient to solid color interpolation end value (rough approximation)
-                    # We just adjust transparency by painting a composite color.
-                    # Extract first color
-                    color = QColor(255, 255, 255, int((1 - factor) * 140))
-                    # Store overlay using background role via stylesheet-rich text: not perfect but subtle.
-                    # PySide doesn't support per-item opacity directly, so we skip if factor reached.
-                    if factor >= 1:
-                        # Done
-                        pass
-            if step >= 10:
-                finished.append(row)
-            else:
-                self._fading_rows[row] = step + 1
-        for r in finished:
-            self._fading_rows.pop(r, None)
-
-
-
     def _inject_styles(self):
         # Extend existing material theme with custom green-blue gradients
         base = """
@@ -750,7 +1004,7 @@ class MainWindow(QMainWindow):
             background: qlineargradient(x1:0,y1:0,x2:1,y2:0, stop:0 #00ff9f, stop:0.5 #00d4ff, stop:1 #1e90ff); 
             border-radius:6px; 
         }
-        QTableWidget { 
+        QTableView { 
             background: transparent; 
             gridline-color: transparent;
         }
@@ -774,13 +1028,205 @@ class MainWindow(QMainWindow):
         """
         self.setStyleSheet(self.styleSheet() + base)
 
+    # Live watching
+    def _watch_excludes(self) -> List[str]:
+        return FAST_EXCLUDE_DIR_NAMES if self.chk_fast.isChecked() else []
+
+    def _update_watch(self, *_):
+        busy = (self._scan_worker is not None and self._scan_worker.isRunning())
+        want = self.chk_watch.isChecked() and bool(self._folders) and bool(self._records) and not busy
+        running = self._watch_worker is not None and self._watch_worker.isRunning()
+        if want and not running:
+            self._watch_worker = WatchWorker(list(self._folders), exclude_dir_names=self._watch_excludes())
+            self._watch_worker.changes.connect(self.on_watch_changes)
+            self._watch_worker.backend.connect(
+                lambda name: self.statusBar().showMessage(f"Watching for changes ({name})", 4000))
+            self._watch_worker.error.connect(self._on_worker_error)
+            self._watch_worker.start()
+        elif not want and running:
+            self._stop_watch()
+
+    def _stop_watch(self):
+        self._pending_changes.clear()
+        if self._watch_worker is not None and self._watch_worker.isRunning():
+            self._watch_worker.cancel()
+            self._watch_worker.wait(3000)
+        self._watch_worker = None
+
+    def on_watch_changes(self, changes: List[Dict]):
+        self._pending_changes.extend(changes)
+        # Apply between analysis runs so workers never see records change under them
+        if self._analyze_worker is not None and self._analyze_worker.isRunning():
+            return
+        self._apply_pending_changes()
+
+    def _apply_pending_changes(self):
+        if not self._pending_changes or self._chunk_buffer:
+            # Rows still queued for the table: _flush_rows applies the changes once they are in
+            return
+        changes, self._pending_changes = self._pending_changes, []
+        known = {r["path"]: r for r in self._records}
+        plan = plan_updates(changes, known, exclude_dir_names=self._watch_excludes())
+        removed = set(plan["removed"])
+        renamed = dict(plan["renamed"])  # old path -> new record
+        if not (removed or renamed or plan["added"] or plan["modified"]):
+            return
+
+        self._remove_paths(removed)
+        self._update_reclaimable()
+        for old, rec in renamed.items():
+            cur = known.get(old)
+            if cur is None:
+                continue
+            same = cur.get("size") == rec["size"] and cur.get("mtime") == rec["mtime"]
+            if not same:
+                # Content changed too: cached digests are stale
+                for k in [k for k in cur if k.startswith("hash_") or k in ("phash", "ahash", "dhash")]:
+                    cur.pop(k)
+            self._space.remove(cur)
+            cur.update(rec)
+            self._space.add(cur)
+            payload = self._analyses.pop(old, None)
+            if payload is not None:
+                payload["path"] = rec["path"]
+                self._analyses[rec["path"]] = payload
+            self._seen_paths.discard(old)
+            self._seen_paths.add(rec["path"])
+            self.results.rename(old, cur)
+        for rec in plan["modified"]:
+            cur = known.get(rec["path"])
+            if cur is None:
+                continue
+            for k in [k for k in cur if k.startswith("hash_") or k in ("phash", "ahash", "dhash")]:
+                cur.pop(k)
+            self._space.remove(cur)
+            cur.update(rec)
+            self._space.add(cur)
+        self.results.refresh(r["path"] for r in plan["modified"])
+        added = []
+        for rec in plan["added"]:
+            if rec["path"] in self._seen_paths:
+                continue
+            self._seen_paths.add(rec["path"])
+            self._records.append(rec)
+            self._space.add(rec)
+            added.append(rec)
+        self.results.append(added)
+
+        targets = {r["path"] for r in plan["added"]} | {r["path"] for r in plan["modified"]}
+        targets |= {r["path"] for r in renamed.values()}
+        prev_dup = {p: pl.get("dup_count", 0) for p, pl in self._analyses.items()}
+        prev_keepers = {p for p, pl in self._analyses.items() if pl.get("dup_keeper")}
+        self.statusBar().showMessage(
+            f"Updated: +{len(plan['added'])} ~{len(plan['modified']) + len(renamed)} -{len(removed)}", 4000)
+        if self._stage_fps != stage_fingerprints(stage_options(self._folders, **self._run_settings())):
+            # Changed files are analysed with the options now set: the rows no longer match one run
+            self._stage_fps = None
+        regroup_from = None
+        state = self._dup_state
+        if (self._stage_fps is not None and state is not None
+                and (state["graph"] is not None or not self.chk_perceptual.isChecked())):
+            # Same grouping options as the last run: regroup only around the changed files
+            changed = targets | removed | set(renamed)
+            regroup_from = (state, changed)
+        self._analyze_worker = AnalyzeWorker(
+            records=list(self._records),
+            enable_ai=self.chk_ai.isChecked(),
+            use_perceptual=self.chk_perceptual.isChecked(),
+            use_documents=self.chk_documents.isChecked(),
+            doc_cache=self._doc_sigs,
+            analysis_cache=self._analysis_cache,
+            fast_mode=self.chk_fast.isChecked(),
+            use_exact=self.chk_duplicates.isChecked(),
+            telemetry=self._telemetry,
+            targets=targets,
+            prev_dup=prev_dup,
+            prev_keepers=prev_keepers,
+            perceptual_threshold=self._sim_threshold,
+            confidence=self.dup_mode_combo.currentData(),
+            thumbs=self._thumbs,
+            folder_roots=list(self._folders),
+            regroup_from=regroup_from,
+        )
+        self._analyze_worker.folder_groups.connect(self.on_folder_groups)
+        self._analyze_worker.dup_graph.connect(self.on_dup_graph)
+        self._analyze_worker.analyzed_batch.connect(self.on_analyzed_batch)
+        self._analyze_worker.done.connect(self._update_reclaimable)
+        self._analyze_worker.done.connect(self._apply_pending_changes)
+        self._analyze_worker.error.connect(self._on_worker_error)
+        self._analyze_worker.start()
+
+    def on_save_session(self):
+        if not self._records:
+            QMessageBox.information(self, "Save Session", "Nothing to save yet. Run a scan first.")
+            return
+        if self._session_worker and self._session_worker.isRunning():
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Session", "scan.ncs", "NeatCore Session (*.ncs)")
+        if not path:
+            return
+        meta = {
+            "folders": list(self._folders),
+            "saved": time.time(),
+            "duplicates": self.chk_duplicates.isChecked(),
+            "dup_confidence": self.dup_mode_combo.currentData(),
+            "perceptual": self.chk_perceptual.isChecked(),
+            "documents": self.chk_documents.isChecked(),
+            "ai": self.chk_ai.isChecked(),
+            "fast_mode": self.chk_fast.isChecked(),
+        }
+        self.statusBar().showMessage("Saving session…")
+        # Snapshot containers so the worker never sees them mutate
+        self._session_worker = SessionWorker(path, records=list(self._records), analyses=dict(self._analyses), meta=meta)
+        self._session_worker.saved.connect(lambda p: self.statusBar().showMessage(f"Session saved to {p}", 5000))
+        self._session_worker.error.connect(lambda msg: QMessageBox.critical(self, "Save Session", msg))
+        self._session_worker.start()
+
+    def on_open_session(self):
+        if self._session_worker and self._session_worker.isRunning():
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Open Session", "", "NeatCore Session (*.ncs)")
+        if not path:
+            return
+        # Stop any running scan/analysis first; the session replaces the view
+        self.on_stop()
+        self.statusBar().showMessage("Loading session…")
+        self._session_worker = SessionWorker(path)
+        self._session_worker.loaded.connect(self.on_session_loaded)
+        self._session_worker.error.connect(lambda msg: QMessageBox.critical(self, "Open Session", msg))
+        self._session_worker.start()
+
+    def on_session_loaded(self, records: List[Dict], analyses: Dict[str, Dict], meta: Dict):
+        self._stopped = False
+        self._stage_fps = None
+        self._clear_table()
+        self._records = records
+        self._analyses = analyses
+        self._seen_paths = {r["path"] for r in records}
+        self._reset_space()
+        self._space.add_many(records)
+        self._update_reclaimable()
+        folders = meta.get("folders") or []
+        if folders:
+            self._folders = list(folders)
+            self.lbl_folder.setText(
+                ", ".join(self._folders[-3:]) if len(self._folders) <= 3 else f"{len(self._folders)} folders selected"
+            )
+        for key, chk in (("duplicates", self.chk_duplicates), ("perceptual", self.chk_perceptual),
+                         ("documents", self.chk_documents), ("ai", self.chk_ai), ("fast_mode", self.chk_fast)):
+            if key in meta:
+                chk.setChecked(bool(meta[key]))
+        if not records:
+            self.statusBar().showMessage("Session is empty", 5000)
+            return
+        # Rows (with their stored analysis) are fetched by the table as it scrolls
+        self._chunk_buffer.clear()
+        self.results.set_records(records)
+        self.statusBar().showMessage(f"Session loaded: {len(records)} files", 5000)
+        self._update_watch()
+
     def _iter_selected_paths(self) -> List[str]:
-        sel: List[str] = []
-        for row in range(self.table.rowCount()):
-            w = self.table.cellWidget(row, 0)
-            if isinstance(w, QCheckBox) and w.isChecked():
-                sel.append(self.table.item(row, 1).text())
-        return sel
+        return self.results.checked_paths()
 
     def on_delete_selected(self):
         paths = self._iter_selected_paths()
@@ -789,17 +1235,7 @@ class MainWindow(QMainWindow):
             return
         if QMessageBox.question(self, "Delete", f"Send {len(paths)} files to Recycle Bin?") != QMessageBox.Yes:
             return
-        errs = []
-        for p in paths:
-            try:
-                np = windows_long_path(p)
-                send2trash(np)
-            except Exception as e:
-                errs.append(f"{p}: {e}")
-        if errs:
-            QMessageBox.warning(self, "Some errors", "\n".join(errs[:10]))
-        else:
-            QMessageBox.information(self, "Done", "Selected files deleted (Recycle Bin)")
+        self._start_action("delete", paths)
 
     def on_move_selected(self):
         paths = self._iter_selected_paths()
@@ -809,24 +1245,7 @@ class MainWindow(QMainWindow):
         dest = QFileDialog.getExistingDirectory(self, "Select destination folder")
         if not dest:
             return
-        import shutil
-        errs = []
-        for p in paths:
-            try:
-                base = os.path.basename(p)
-                target = os.path.join(dest, base)
-                i = 1
-                while os.path.exists(target):
-                    name, ext = os.path.splitext(base)
-                    target = os.path.join(dest, f"{name} ({i}){ext}")
-                    i += 1
-                shutil.move(windows_long_path(p), windows_long_path(target))
-            except Exception as e:
-                errs.append(f"{p}: {e}")
-        if errs:
-            QMessageBox.warning(self, "Some errors", "\n".join(errs[:10]))
-        else:
-            QMessageBox.information(self, "Done", "Selected files moved")
+        self._start_action("move", paths, dest)
 
     def on_compress_selected(self):
         paths = self._iter_selected_paths()
@@ -836,26 +1255,136 @@ class MainWindow(QMainWindow):
         zip_path, _ = QFileDialog.getSaveFileName(self, "Save ZIP", "archive.zip", "ZIP Files (*.zip)")
         if not zip_path:
             return
-        errs = []
-        try:
-            with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-                for p in paths:
-                    try:
-                        np = windows_long_path(p)
-                        # Try normal write first
-                        try:
-                            zf.write(np, arcname=os.path.basename(p))
-                        except Exception:
-                            # Fallback: read bytes and write directly to zip to avoid path issues
-                            with open(np, 'rb') as fh:
-                                data = fh.read()
-                            zf.writestr(os.path.basename(p), data)
-                    except Exception as e:
-                        errs.append(f"{p}: {e}")
-        except Exception as e:
-            QMessageBox.critical(self, "Zip Error", str(e))
+        methods = available_methods()
+        labels = {"deflate": "Deflate (fast, opens everywhere)", "zstd": "Zstandard (fast, smaller)",
+                  "lzma": "LZMA (smallest, slow)", "bzip2": "bzip2"}
+        choice, ok = QInputDialog.getItem(self, "Compression", "Method:",
+                                          [labels.get(m, m) for m in methods], 0, False)
+        if not ok:
+            return
+        method = methods[[labels.get(m, m) for m in methods].index(choice)]
+        self._start_action("compress", paths, zip_path, {"method": method})
+
+    def on_link_duplicates(self):
+        groups = exact_groups(self._records)
+        # With rows ticked, only their groups; otherwise every exact group
+        selected = set(self._iter_selected_paths())
+        if selected:
+            groups = [g for g in groups if any(r["path"] in selected for r in g)]
+        if not groups:
+            QMessageBox.information(self, "Link Duplicates",
+                                    "No exact duplicates found. Run a scan with duplicate detection first.")
             return
+        keepers = [pick_keeper(g) for g in groups]
+        dups = [r["path"] for g, k in zip(groups, keepers) for r in g if r is not k]
+        saved = sum(k.get("size", 0) * (len(g) - 1) for g, k in zip(groups, keepers))
+        modes = {"Reflink where supported, else hardlink": "auto",
+                 "Hardlinks only": "hardlink", "Reflinks only (copy-on-write)": "reflink"}
+        choice, ok = QInputDialog.getItem(
+            self, "Link Duplicates",
+            f"Replace {len(dups)} duplicates in {len(groups)} groups with links to one copy "
+            f"(frees up to {human_size(saved)}).\nContents are compared byte for byte first.\n\nMethod:",
+            list(modes), 0, False)
+        if not ok:
+            return
+        self._start_action("link", dups, None, {"groups": groups, "mode": modes[choice]})
+
+    def _start_action(self, action: str, paths: List[str], target: str | None = None,
+                      options: Dict | None = None):
+        if self._action_worker is not None and self._action_worker.isRunning():
+            QMessageBox.information(self, "Busy", "Another file operation is still running.")
+            return
+        self._set_action_busy(True)
+        self.progress.setRange(0, len(paths))
+        self.progress.setValue(0)
+        self._action_worker = ActionWorker(action, paths, target, options)
+        self._action_worker.progress.connect(self.on_action_progress)
+        self._action_worker.applied.connect(self.on_action_applied)
+        self._action_worker.done.connect(self.on_action_done)
+        self._action_worker.error.connect(self.on_action_error)
+        self._action_worker.start()
+
+    def _set_action_busy(self, busy: bool):
+        for w in [self.btn_delete, self.btn_move, self.btn_compress, self.btn_link, self.btn_select_reco,
+                  self.btn_scan, self.btn_quick]:
+            w.setEnabled(not busy)
+        # Stop cancels the running file operation
+        self.btn_stop.setEnabled(busy)
+        if busy:
+            self.busy_indicator.start()
+            self.busy_indicator.setVisible(True)
+        else:
+            self.busy_indicator.stop()
+            self.busy_indicator.setVisible(False)
+
+    def on_action_progress(self, processed: int, total: int):
+        self.progress.setRange(0, max(1, total))
+        self.progress.setValue(processed)
+
+    def on_action_applied(self, paths: List[str]):
+        # Files are gone from their old location: drop their rows now, the rest of their state once done
+        self._action_removed.update(paths)
+        self.results.remove_paths(paths)
+
+    def _finish_action(self):
+        removed, self._action_removed = self._action_removed, set()
+        self._remove_paths(removed)
+        self._update_reclaimable()
+
+    def on_action_done(self, summary: Dict):
+        self._set_action_busy(False)
+        self._finish_action()
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        errs = [f"{p}: {e}" for p, e in summary.get("errors", [])]
+        action = summary.get("action")
         if errs:
             QMessageBox.warning(self, "Some errors", "\n".join(errs[:10]))
+        elif summary.get("cancelled"):
+            self.statusBar().showMessage(f"Cancelled after {summary.get('ok', 0)} files", 5000)
+        elif action == "delete":
+            QMessageBox.information(self, "Done", "Selected files deleted (Recycle Bin)")
+        elif action == "move":
+            st = summary.get("stats") or {}
+            detail = ""
+            if st.get("copied"):
+                detail = (f"\n{st['renamed']} renamed in place, {st['copied']} copied across volumes "
+                          f"({human_size(st['bytes_copied'])}, {st['mb_per_s']:.1f} MB/s)")
+            QMessageBox.information(self, "Done", f"Selected files moved{detail}")
+        elif action == "link":
+            st = summary.get("stats") or {}
+            QMessageBox.information(
+                self, "Done",
+                f"Linked {st.get('reflinked', 0) + st.get('hardlinked', 0)} duplicates "
+                f"({st.get('reflinked', 0)} reflinks, {st.get('hardlinked', 0)} hardlinks, "
+                f"{st.get('already_linked', 0)} already linked); "
+                f"{human_size(st.get('bytes_reclaimed', 0))} reclaimed")
         else:
-            QMessageBox.information(self, "Done", f"Saved {len(paths)} files to {zip_path}")
+            st = summary.get("stats") or {}
+            detail = ""
+            if st.get("bytes_in"):
+                detail = (f"\n{human_size(st['bytes_in'])} → {human_size(st['archive_bytes'])} "
+                          f"({st['ratio'] * 100:.1f}%), {st['mb_per_s']:.1f} MB/s, "
+                          f"{st['stored']} stored uncompressed")
+            QMessageBox.information(self, "Done", f"Saved {summary.get('ok', 0)} files to {summary.get('target')}{detail}")
+
+    def on_action_error(self, msg: str):
+        self._set_action_busy(False)
+        self._finish_action()
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        QMessageBox.critical(self, "Error", msg)
+
+    def _remove_paths(self, removed: set):
+        if not removed:
+            return
+        self.results.remove_paths(removed)
+        for r in self._records:
+            if r["path"] in removed:
+                self._space.remove(r)
+        self._records = [r for r in self._records if r["path"] not in removed]
+        if self.preview.current_path in removed:
+            self.preview.clear()
+        for p in removed:
+            self._analyses.pop(p, None)
+            self._seen_paths.discard(p)
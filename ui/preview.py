@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+from typing import Dict, Optional
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPixmap
+from PySide6.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QLabel, QSizePolicy
+
+from core.thumbs import THUMB_SIZE
+
+
+class PreviewPanel(QDockWidget):
+    """Thumbnail and details for the current row; images are decoded by ThumbWorker."""
+
+    def __init__(self, parent=None):
+        super().__init__("Preview", parent)
+        self.setObjectName("PreviewPanel")
+        self._path: Optional[str] = None
+
+        body = QWidget()
+        lay = QVBoxLayout(body)
+        self.image = QLabel("Select a file")
+        self.image.setAlignment(Qt.AlignCenter)
+        self.image.setMinimumSize(THUMB_SIZE, THUMB_SIZE)
+        self.image.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.details = QLabel("")
+        self.details.setWordWrap(True)
+        self.details.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.details.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        lay.addWidget(self.image, 1)
+        lay.addWidget(self.details)
+        self.setWidget(body)
+
+    @property
+    def current_path(self) -> Optional[str]:
+        return self._path
+
+    def show_file(self, path: str, kind: str, size_text: str, modified_text: str, payload: Optional[Dict]):
+        self._path = path
+        lines = [f"<b>{os.path.basename(path)}</b>", f"{kind} · {size_text} · {modified_text}"]
+        if payload:
+            an = payload.get("analysis") or {}
+            q = an.get("quality") or {}
+            if q.get("width"):
+                lines.append(f"{q['width']}×{q['height']} px")
+            lines.append(f"Class: {an.get('label', '-')} ({an.get('confidence', 0):.2f})")
+            if payload.get("dup_count"):
+                probable = " (probable)" if payload.get("dup_probable") else ""
+                kept = ", kept copy" if payload.get("dup_keeper") else ""
+                lines.append(f"Duplicates: {payload['dup_count']}{probable}{kept}")
+            reco = payload.get("recommendation") or {}
+            if reco:
+                lines.append(f"{reco.get('primary_action', '-')}: " + "; ".join(reco.get("reasons", [])))
+        self.details.setText("<br>".join(lines))
+        self.image.setPixmap(QPixmap())
+        self.image.setText("Loading…" if kind == "image" else "No preview")
+
+    def set_thumbnail(self, path: str, data: Optional[bytes]):
+        if path != self._path:
+            # A newer selection already replaced this one
+            return
+        pix = QPixmap()
+        if not data or not pix.loadFromData(data):
+            self.image.setText("Preview unavailable")
+            return
+        self.image.setText("")
+        self.image.setPixmap(pix)
+
+    def clear(self):
+        self._path = None
+        self.image.setPixmap(QPixmap())
+        self.image.setText("Select a file")
+        self.details.setText("")
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QBrush, QColor, QGradient, QLinearGradient
+
+from core.utils import human_size
+
+COLUMNS = ["Select", "Path", "Type", "Size", "Modified", "Classification", "Duplicates", "Recommendation"]
+COL_SELECT, COL_PATH, COL_KIND, COL_SIZE, COL_MTIME, COL_LABEL, COL_DUPS, COL_RECO = range(len(COLUMNS))
+# Rows handed to the view at first and per fetchMore as it scrolls down
+FETCH_ROWS = 1000
+
+
+def label_text(payload: Optional[Dict]) -> str:
+    if payload is None:
+        return "-"
+    analysis = payload.get("analysis") or {}
+    return f"{analysis.get('label', '-')} ({analysis.get('confidence', 0):.2f})"
+
+
+def reco_text(payload: Optional[Dict]) -> str:
+    if payload is None:
+        return "-"
+    reco = payload.get("recommendation") or {}
+    return f"{reco.get('primary_action', '-')}: " + "; ".join(reco.get("reasons", []))
+
+
+# Filter combo entries -> row test on (record, analysis payload or None)
+ROW_FILTERS: Dict[str, Callable[[Dict, Optional[Dict]], bool]] = {
+    "Images": lambda rec, p: rec.get("kind") == "image",
+    "Documents": lambda rec, p: rec.get("kind") == "document",
+    "Screenshots": lambda rec, p: label_text(p).startswith("screenshot"),
+    "Low Quality": lambda rec, p: "Low-quality" in reco_text(p),
+    "Old Downloads": lambda rec, p: "Downloads" in reco_text(p),
+    "Recommended Delete": lambda rec, p: reco_text(p).lower().startswith("delete"),
+}
+
+
+def _grad(base: QColor, accent: QColor) -> QBrush:
+    g = QLinearGradient(0, 0, 1, 0)
+    g.setCoordinateMode(QGradient.ObjectBoundingMode)
+    g.setColorAt(0.0, base)
+    g.setColorAt(0.6, base)
+    g.setColorAt(1.0, accent)
+    return QBrush(g)
+
+
+# Row banding by type, then duplicates, then quality warnings - green-blue scheme
+_BANDS = {
+    "screenshot": ((180, 220, 240), (140, 200, 230)),
+    "photo": ((200, 240, 230), (160, 230, 210)),
+    "document": ((210, 250, 220), (180, 240, 200)),
+    "video": ((190, 230, 240), (160, 215, 230)),
+    "audio": ((200, 235, 245), (175, 220, 235)),
+    "archive": ((180, 240, 235), (150, 225, 220)),
+    "duplicate": ((160, 220, 210), (130, 200, 190)),
+    "warning": ((255, 200, 180), (245, 180, 160)),
+    "neutral": ((235, 245, 245), (225, 240, 240)),
+}
+
+
+class ResultsModel(QAbstractTableModel):
+    """The results table: one row per record passing the current filter, in
+    scan order. Cells are read from the record and its analysis payload when
+    drawn, so there is no item per cell and analysis updates only repaint.
+
+    Only the first ``FETCH_ROWS`` rows are exposed; the view asks for more
+    (``canFetchMore``/``fetchMore``) as it is scrolled towards the end, so a
+    large scan or session never builds rows nobody looks at. Ticked rows are
+    kept by path and survive filtering and refetching."""
+
+    def __init__(self, analysis_of: Callable[[str], Optional[Dict]], parent=None):
+        super().__init__(parent)
+        self._analysis_of = analysis_of
+        self._records: List[Optional[Dict]] = []  # None where a record was removed
+        self._index: Dict[str, int] = {}  # path -> position in _records
+        self._shown: List[int] = []  # positions in _records passing the filter, ascending
+        self._loaded = 0
+        self._removed = 0
+        self._filter: Optional[Callable[[Dict, Optional[Dict]], bool]] = None
+        self._checked: set = set()
+        self._brushes: Dict[str, QBrush] = {}
+
+    # Qt model interface
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._loaded < len(self._shown)
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        if parent.isValid():
+            return
+        n = min(FETCH_ROWS, len(self._shown) - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    def flags(self, index):
+        if index.column() == COL_SELECT:
+            return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        rec = self._records[self._shown[index.row()]]
+        col = index.column()
+        if role == Qt.DisplayRole:
+            return self._text(rec, col) if col != COL_SELECT else None
+        if role == Qt.CheckStateRole and col == COL_SELECT:
+            return Qt.Checked if rec["path"] in self._checked else Qt.Unchecked
+        if role == Qt.BackgroundRole:
+            return self._brush(rec)
+        if role == Qt.ToolTipRole and col != COL_SELECT:
+            return self._tooltip(rec)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole) -> bool:
+        if role != Qt.CheckStateRole or index.column() != COL_SELECT or index.row() >= self._loaded:
+            return False
+        path = self._records[self._shown[index.row()]]["path"]
+        if Qt.CheckState(value) == Qt.Checked:
+            self._checked.add(path)
+        else:
+            self._checked.discard(path)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    # Cells
+    def _text(self, rec: Dict, col: int) -> str:
+        if col == COL_PATH:
+            return rec.get("path", "")
+        if col == COL_KIND:
+            return rec.get("kind", "")
+        if col == COL_SIZE:
+            return human_size(rec.get("size", 0))
+        if col == COL_MTIME:
+            return str(int(rec.get("mtime", 0)))
+        payload = self._analysis_of(rec["path"])
+        if col == COL_LABEL:
+            return label_text(payload)
+        if col == COL_DUPS:
+            return str((payload or {}).get("dup_count", 0))
+        return reco_text(payload)
+
+    def _brush(self, rec: Dict) -> QBrush:
+        payload = self._analysis_of(rec["path"]) or {}
+        analysis = payload.get("analysis") or {}
+        kind = rec.get("kind", "other")
+        label = analysis.get("label", kind)
+        q = analysis.get("quality", {})
+        primary = (payload.get("recommendation") or {}).get("primary_action", "")
+        if label in ("screenshot", "photo"):
+            band = label
+        elif kind in ("document", "video", "audio", "archive"):
+            band = kind
+        elif payload.get("dup_count", 0) > 0:
+            band = "duplicate"
+        elif q.get("is_low_sharpness") or q.get("is_dark") or q.get("is_small") or primary == "delete":
+            band = "warning"
+        else:
+            band = "neutral"
+        brush = self._brushes.get(band)
+        if brush is None:
+            base, accent = _BANDS[band]
+            brush = self._brushes[band] = _grad(QColor(*base), QColor(*accent))
+        return brush
+
+    def _tooltip(self, rec: Dict) -> str:
+        payload = self._analysis_of(rec["path"]) or {}
+        analysis = payload.get("analysis") or {}
+        kind = rec.get("kind", "other")
+        lines = [f"Type: {kind}", f"Class: {analysis.get('label', kind)}"]
+        if payload.get("dup_count"):
+            lines.append(f"Duplicates: {payload['dup_count']}")
+        qv = analysis.get("quality", {})
+        if qv:
+            try:
+                lines.append(f"Quality: {qv.get('width','?')}x{qv.get('height','?')}, "
+                             f"bright={float(qv.get('brightness',0)):.1f}, sharp={float(qv.get('sharpness',0)):.1f}")
+            except Exception:
+                pass
+        reasons = (payload.get("recommendation") or {}).get("reasons", [])
+        if reasons:
+            lines.append("Reasons: " + "; ".join(reasons))
+        return "\n".join(lines)
+
+    # Rows
+    def _passes(self, rec: Dict) -> bool:
+        return self._filter is None or self._filter(rec, self._analysis_of(rec["path"]))
+
+    def _row_of(self, pos: int) -> Optional[int]:
+        row = bisect_left(self._shown, pos)
+        return row if row < len(self._shown) and self._shown[row] == pos else None
+
+    def record_at(self, row: int) -> Optional[Dict]:
+        return self._records[self._shown[row]] if 0 <= row < self._loaded else None
+
+    def path_at(self, row: int) -> str:
+        rec = self.record_at(row)
+        return rec["path"] if rec is not None else ""
+
+    def row_of(self, path: str) -> Optional[int]:
+        pos = self._index.get(path)
+        row = self._row_of(pos) if pos is not None else None
+        return row if row is not None and row < self._loaded else None
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._records, self._index, self._shown = [], {}, []
+        self._loaded = self._removed = 0
+        self._checked = set()
+        self.endResetModel()
+
+    def set_records(self, records: List[Dict]) -> None:
+        """Replace every row with ``records``."""
+        self.beginResetModel()
+        self._records = list(records)
+        self._index = {r["path"]: i for i, r in enumerate(self._records)}
+        self._shown = [i for i, r in enumerate(self._records) if self._passes(r)]
+        self._loaded = min(FETCH_ROWS, len(self._shown))
+        self._removed = 0
+        self._checked = set()
+        self.endResetModel()
+
+    def append(self, records: Iterable[Dict]) -> None:
+        start = len(self._records)
+        for rec in records:
+            self._index[rec["path"]] = len(self._records)
+            self._records.append(rec)
+        new = [i for i in range(start, len(self._records)) if self._passes(self._records[i])]
+        self._shown.extend(new)
+        # Rows past what the view has fetched wait for fetchMore
+        if new and self._loaded == len(self._shown) - len(new) and self._loaded < FETCH_ROWS:
+            self.fetchMore()
+
+    def set_filter(self, predicate: Optional[Callable[[Dict, Optional[Dict]], bool]]) -> None:
+        self.beginResetModel()
+        self._filter = predicate
+        self._shown = [i for i, r in enumerate(self._records) if r is not None and self._passes(r)]
+        self._loaded = min(max(self._loaded, FETCH_ROWS), len(self._shown))
+        self.endResetModel()
+
+    def refresh(self, paths: Iterable[str]) -> None:
+        """Repaint the rows of ``paths`` after their record or analysis changed,
+        adding or dropping them where that changes the filter result."""
+        first = last = None
+        for path in paths:
+            pos = self._index.get(path)
+            if pos is None:
+                continue
+            row = self._row_of(pos)
+            show = self._passes(self._records[pos])
+            if row is not None and not show:
+                self._drop_row(row)
+            elif row is None and show:
+                self._insert_row(pos)
+            elif row is not None and row < self._loaded:
+                first = row if first is None else min(first, row)
+                last = row if last is None else max(last, row)
+        if first is not None:
+            # Rows added or dropped after a repaint was noted may have shifted it: repaint to the end
+            self.dataChanged.emit(self.index(first, 0), self.index(self._loaded - 1, len(COLUMNS) - 1))
+
+    def _insert_row(self, pos: int) -> None:
+        row = bisect_left(self._shown, pos)
+        if row < self._loaded:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._shown.insert(row, pos)
+            self._loaded += 1
+            self.endInsertRows()
+        else:
+            self._shown.insert(row, pos)
+
+    def _drop_row(self, row: int) -> None:
+        if row < self._loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._shown[row]
+            self._loaded -= 1
+            self.endRemoveRows()
+        else:
+            del self._shown[row]
+
+    def rename(self, old: str, rec: Dict) -> None:
+        """``rec`` (the record formerly at ``old``) now lives at ``rec["path"]``."""
+        pos = self._index.pop(old, None)
+        if pos is None:
+            return
+        self._index[rec["path"]] = pos
+        if old in self._checked:
+            self._checked.discard(old)
+            self._checked.add(rec["path"])
+        self.refresh([rec["path"]])
+
+    def remove_paths(self, paths: Iterable[str]) -> None:
+        """Drop the rows of ``paths``; each costs a lookup, not a pass over the table."""
+        for path in paths:
+            pos = self._index.pop(path, None)
+            if pos is None:
+                continue
+            self._checked.discard(path)
+            row = self._row_of(pos)
+            if row is not None:
+                self._drop_row(row)
+            self._records[pos] = None
+            self._removed += 1
+        if self._removed > 1000 and self._removed * 2 > len(self._records):
+            self._compact()
+
+    def _compact(self) -> None:
+        # Row order is unchanged: only positions in _records move
+        keep = [i for i, r in enumerate(self._records) if r is not None]
+        new_pos = {old: new for new, old in enumerate(keep)}
+        self._records = [self._records[i] for i in keep]
+        self._index = {r["path"]: i for i, r in enumerate(self._records)}
+        self._shown = [new_pos[i] for i in self._shown]
+        self._removed = 0
+
+    # Ticked rows
+    def check_paths(self, paths: Iterable[str]) -> int:
+        """Tick ``paths`` (loaded or not); returns how many were not ticked yet."""
+        before = len(self._checked)
+        self._checked.update(p for p in paths if p in self._index)
+        added = len(self._checked) - before
+        if added and self._loaded:
+            self.dataChanged.emit(self.index(0, COL_SELECT), self.index(self._loaded - 1, COL_SELECT),
+                                  [Qt.CheckStateRole])
+        return added
+
+    def checked_paths(self) -> List[str]:
+        """Ticked paths in table order."""
+        return [r["path"] for r in self._records if r is not None and r["path"] in self._checked]
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from PySide6.QtCore import Qt, QRectF, Signal
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTabWidget,
+    QTreeWidget, QTreeWidgetItem, QToolTip, QSizePolicy,
+)
+
+from core.rollup import DirNode, SpaceTree
+from core.utils import human_size
+
+KIND_COLORS = {
+    "image": QColor("#2e9d8f"),
+    "video": QColor("#c0577a"),
+    "audio": QColor("#8a6cc4"),
+    "document": QColor("#3f7fc4"),
+    "archive": QColor("#d08a35"),
+    "other": QColor("#6f7f86"),
+}
+RECLAIM_COLOR = QColor(220, 60, 60, 200)
+# Blocks smaller than this (px) are not split into their subfolders or labelled
+MIN_NEST = 48
+MIN_LABEL = 28
+
+
+def squarify(values: List[float], x: float, y: float, w: float, h: float) -> List[Tuple[float, float, float, float]]:
+    """Squarified treemap layout (Bruls et al.) of ``values`` (sorted largest
+    first, all positive) into the rectangle; one ``(x, y, w, h)`` per value."""
+    total = sum(values)
+    if total <= 0 or w <= 0 or h <= 0:
+        return [(x, y, 0.0, 0.0)] * len(values)
+    scale = w * h / total
+    areas = [v * scale for v in values]
+    rects: List[Tuple[float, float, float, float]] = []
+
+    def worst(row: List[float], side: float) -> float:
+        s = sum(row)
+        return max(max(side * side * a / (s * s), s * s / (side * side * a)) for a in row)
+
+    i = 0
+    while i < len(areas):
+        side = min(w, h)
+        row = [areas[i]]
+        i += 1
+        while i < len(areas) and worst(row + [areas[i]], side) <= worst(row, side):
+            row.append(areas[i])
+            i += 1
+        s = sum(row)
+        if w >= h:
+            # Lay the row out as a column along the left edge
+            cw = s / h if h else 0.0
+            cy = y
+            for a in row:
+                rh = a / cw if cw else 0.0
+                rects.append((x, cy, cw, rh))
+                cy += rh
+            x += cw
+            w -= cw
+        else:
+            rh = s / w if w else 0.0
+            cx = x
+            for a in row:
+                rw = a / rh if rh else 0.0
+                rects.append((cx, y, rw, rh))
+                cx += rw
+            y += rh
+            h -= rh
+    return rects
+
+
+class _Block:
+    __slots__ = ("rect", "node", "name", "bytes", "files", "reclaimable", "kind", "depth")
+
+    def __init__(self, rect: QRectF, node: Optional[DirNode], name: str, nbytes: int, files: int,
+                 reclaimable: int, kind: str, depth: int) -> None:
+        self.rect = rect
+        # None for the "files in this folder" block
+        self.node = node
+        self.name = name
+        self.bytes = nbytes
+        self.files = files
+        self.reclaimable = reclaimable
+        self.kind = kind
+        self.depth = depth
+
+
+class TreemapView(QWidget):
+    """Two levels of a SpaceTree as a squarified treemap. Click a folder to
+    open it, right-click to go up. Colour is the kind holding most bytes;
+    the red band at the bottom of a block is its reclaimable share."""
+
+    opened = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.setMinimumSize(200, 160)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self._tree: Optional[SpaceTree] = None
+        self._node: Optional[DirNode] = None
+        # Folder the user opened; None follows the tree's start node as it grows
+        self._opened: Optional[DirNode] = None
+        self._blocks: List[_Block] = []
+
+    @property
+    def current(self) -> Optional[DirNode]:
+        return self._node
+
+    def set_tree(self, tree: Optional[SpaceTree]):
+        self._tree = tree
+        self._opened = None
+        self.refresh()
+
+    def open_path(self, path: str):
+        if self._tree is None:
+            return
+        with self._tree.lock:
+            node = self._tree.node(path)
+        if node is not None:
+            self._open(node)
+
+    def _open(self, node: DirNode):
+        self._opened = node
+        self.refresh()
+        self.opened.emit(self._node.path)
+
+    def go_up(self):
+        if self._node is None or self._tree is None or self._node is self._tree.start_node():
+            return
+        if self._node.parent is not None:
+            self._open(self._node.parent)
+
+    def refresh(self):
+        self._blocks = []
+        if self._tree is not None:
+            with self._tree.lock:
+                if self._opened is not None and self._opened.files <= 0:
+                    self._opened = None
+                self._node = self._opened or self._tree.start_node()
+                self._layout(self._node, QRectF(self.rect()).adjusted(1, 1, -1, -1), 0)
+        self.update()
+
+    def _entries(self, node: DirNode) -> List[Tuple[Optional[DirNode], str, int, int, int, str]]:
+        out = [(c, c.name, c.bytes, c.files, c.reclaimable, c.dominant_kind()) for c in self._tree.children(node)]
+        own_files = node.files - sum(c.files for c in node.children.values())
+        if node.own_bytes > 0:
+            # Reclaimable bytes of the folder's own files are whatever its subfolders don't account for
+            own_reclaim = node.reclaimable - sum(c.reclaimable for c in node.children.values())
+            kind = _own_kind(node)
+            out.append((None, "(files)", node.own_bytes, own_files, own_reclaim, kind))
+            out.sort(key=lambda e: e[2], reverse=True)
+        return [e for e in out if e[2] > 0]
+
+    def _layout(self, node: DirNode, area: QRectF, depth: int):
+        entries = self._entries(node)
+        rects = squarify([float(e[2]) for e in entries], area.x(), area.y(), area.width(), area.height())
+        for (child, name, nbytes, files, reclaim, kind), (x, y, w, h) in zip(entries, rects):
+            rect = QRectF(x, y, w, h)
+            self._blocks.append(_Block(rect, child, name, nbytes, files, reclaim, kind, depth))
+            if depth == 0 and child is not None and w >= MIN_NEST and h >= MIN_NEST:
+                # Leave a title strip, then show the folder's own contents
+                self._layout(child, rect.adjusted(3, 16, -3, -3), 1)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+    def paintEvent(self, _event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), self.palette().window())
+        if not self._blocks:
+            p.setPen(self.palette().text().color())
+            p.drawText(self.rect(), Qt.AlignCenter, "Scan a folder to see where space goes")
+            return
+        border = QPen(QColor(0, 0, 0, 90))
+        for b in self._blocks:
+            color = KIND_COLORS.get(b.kind, KIND_COLORS["other"])
+            p.fillRect(b.rect, color.lighter(115 + 20 * b.depth) if b.depth else color)
+            if b.reclaimable > 0 and b.bytes > 0:
+                band = b.rect.height() * min(1.0, b.reclaimable / b.bytes)
+                p.fillRect(QRectF(b.rect.x(), b.rect.bottom() - band, b.rect.width(), band), RECLAIM_COLOR)
+            p.setPen(border)
+            p.drawRect(b.rect)
+            if b.rect.width() >= MIN_LABEL * 2 and b.rect.height() >= MIN_LABEL / 2:
+                p.setPen(QColor("#ffffff"))
+                text = f"{b.name}  {human_size(b.bytes)}"
+                p.drawText(b.rect.adjusted(3, 1, -3, -1), Qt.AlignLeft | Qt.AlignTop,
+                           p.fontMetrics().elidedText(text, Qt.ElideRight, int(b.rect.width()) - 6))
+        p.end()
+
+    def _block_at(self, pos) -> Optional[_Block]:
+        # Nested blocks follow their parent, so the last hit is the innermost
+        hit = None
+        for b in self._blocks:
+            if b.rect.contains(pos):
+                hit = b
+        return hit
+
+    def mouseMoveEvent(self, event):
+        b = self._block_at(event.position())
+        if b is None:
+            QToolTip.hideText()
+            return
+        where = b.node.path if b.node is not None else f"Files directly in {self._node.path}"
+        tip = f"{where}\n{human_size(b.bytes)} in {b.files} files"
+        if b.reclaimable > 0:
+            tip += f"\n{human_size(b.reclaimable)} reclaimable (duplicates)"
+        QToolTip.showText(event.globalPosition().toPoint(), tip, self)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.go_up()
+            return
+        b = self._block_at(event.position())
+        if b is not None and b.node is not None:
+            self._open(b.node)
+
+
+def _own_kind(node: DirNode) -> str:
+    """Dominant kind of the files directly in ``node`` (its totals minus its subfolders')."""
+    own = dict(node.by_kind)
+    for c in node.children.values():
+        for k, v in c.by_kind.items():
+            own[k] = own.get(k, 0) - v
+    own = {k: v for k, v in own.items() if v > 0}
+    return max(own.items(), key=lambda kv: kv[1])[0] if own else "other"
+
+
+class SpacePanel(QDockWidget):
+    """Space usage: treemap of folder rollups plus the largest files and folders."""
+
+    def __init__(self, parent=None):
+        super().__init__("Space", parent)
+        self.setObjectName("SpacePanel")
+        self._tree: Optional[SpaceTree] = None
+
+        body = QWidget()
+        lay = QVBoxLayout(body)
+        bar = QHBoxLayout()
+        self.btn_up = QPushButton("Up")
+        self.btn_up.clicked.connect(self._go_up)
+        self.crumb = QLabel("")
+        self.crumb.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        bar.addWidget(self.btn_up)
+        bar.addWidget(self.crumb, 1)
+        lay.addLayout(bar)
+
+        self.treemap = TreemapView()
+        self.treemap.opened.connect(lambda _p: self._update_crumb())
+        lay.addWidget(self.treemap, 3)
+
+        self.tabs = QTabWidget()
+        self.top_files = self._make_list()
+        self.top_dirs = self._make_list()
+        self.top_dirs.itemDoubleClicked.connect(lambda item, _c: self.treemap.open_path(item.text(1)))
+        self.tabs.addTab(self.top_files, "Largest Files")
+        self.tabs.addTab(self.top_dirs, "Largest Folders")
+        lay.addWidget(self.tabs, 2)
+        self.setWidget(body)
+
+    @staticmethod
+    def _make_list() -> QTreeWidget:
+        w = QTreeWidget()
+        w.setHeaderLabels(["Size", "Path"])
+        w.setRootIsDecorated(False)
+        w.setUniformRowHeights(True)
+        return w
+
+    def set_tree(self, tree: Optional[SpaceTree]):
+        self._tree = tree
+        self.treemap.set_tree(tree)
+        self.refresh()
+
+    def refresh(self):
+        """Redraw from the current totals; cheap enough to call every second while scanning."""
+        if not self.isVisible():
+            return
+        self.treemap.refresh()
+        self._update_crumb()
+        tree = self._tree
+        for widget, rows in ((self.top_files, tree.top_files() if tree else []),
+                             (self.top_dirs, tree.top_dirs() if tree else [])):
+            widget.clear()
+            widget.addTopLevelItems([QTreeWidgetItem([human_size(size), path]) for path, size in rows])
+            widget.resizeColumnToContents(0)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def _go_up(self):
+        self.treemap.go_up()
+        self._update_crumb()
+
+    def _update_crumb(self):
+        node = self.treemap.current
+        if node is None or self._tree is None or node.files <= 0:
+            self.crumb.setText("")
+            self.btn_up.setEnabled(False)
+            return
+        with self._tree.lock:
+            text = f"{node.path or 'All folders'} · {human_size(node.bytes)} in {node.files} files"
+            if node.reclaimable:
+                text += f" · {human_size(node.reclaimable)} reclaimable"
+            self.btn_up.setEnabled(node is not self._tree.start_node())
+        self.crumb.setText(text)
@@ -1,87 +1,523 @@
 from __future__ import annotations
 
-from typing import List, Dict, Optional
+import os
+import threading
+from contextlib import nullcontext
+from typing import Callable, List, Dict, Optional, Sequence
 
 from PySide6.QtCore import QThread, Signal
 
-from core.scanner import scan_dir, iter_dir
+from core.scanner import scan_dir, iter_dir, FAST_EXCLUDE_DIR_NAMES
 from core.analyze import Analyzer
-from core.duplicates import group_by_exact_hash, group_by_perceptual_hash
+from core.duplicates import build_dup_map, update_dup_map
+from core.dupgraph import DEFAULT_RANKING
+from core.dirdups import find_duplicate_folders
 from core.utils import human_size
 from core.recommend import recommend_for_record
+from core.session import load_session, save_session
+from core.checkpoint import Checkpoint
+from core.scheduler import AnalysisQueue
+from core.rollup import SpaceTree
+from core.watcher import ChangeCoalescer, create_watcher
+from core.actions import trash_files
+from core.compress import compress_files
+from core.moves import move_files
+from core.dedupe import link_duplicates
+from core.thumbs import ThumbnailCache
+from core.docsim import SignatureCache
+from core.memo import AnalysisCache
+from core.sniff import Sniffer
+from core.netio import detect_remote, iter_dir_adaptive
+from core.telemetry import Telemetry, maybe_timed
 
 
-class ScanWorker(QThread):
+def _profiled(telemetry: Optional[Telemetry], name: str):
+    return telemetry.profiled(name) if telemetry is not None else nullcontext()
+
+
+class RunControl:
+    """Stop and pause flags for one run.
+
+    Calling the instance is the ``should_stop`` check handed to core loops
+    (hashing, decoding, grouping): it blocks while paused and returns True
+    once cancelled, so both take effect inside long operations.
+    """
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self._running.set()  # wake a paused run so it can exit
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def __call__(self) -> bool:
+        self._running.wait()
+        return self.cancelled
+
+
+class _PausableWorker(QThread):
+    def __init__(self):
+        super().__init__()
+        self.control = RunControl()
+
+    def cancel(self):
+        self.control.cancel()
+
+    def pause(self):
+        self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    @property
+    def paused(self) -> bool:
+        return self.control.paused
+
+
+class ScanWorker(_PausableWorker):
     progress = Signal(int)  # percentage (0-100; 0 for indeterminate)
     chunk = Signal(dict)    # emit each record as found
     done = Signal(list)     # final records list
     error = Signal(str)
 
-    def __init__(self, paths: list[str], compute_hash: bool, fast_mode: bool = True):
+    def __init__(self, paths: list[str], compute_hash: bool, fast_mode: bool = True,
+                 telemetry: Optional[Telemetry] = None, sniff: bool = False, adaptive_io: bool = True,
+                 checkpoint: Optional[Checkpoint] = None, resume_checkpoint: bool = False,
+                 space: Optional[SpaceTree] = None):
         super().__init__()
         self.paths = paths
+        # Detect high-latency (network) roots and scan them with adaptive concurrency
+        self.adaptive_io = adaptive_io
         self.compute_hash = compute_hash
         self.fast_mode = fast_mode
-        self._cancel = False
-
-    def cancel(self):
-        self._cancel = True
+        self.telemetry = telemetry
+        # Content sniffing of unknown/suspicious files; stats are read after ``done``
+        self.sniffer = Sniffer(telemetry=telemetry) if sniff else None
+        # Progress is checkpointed periodically; with ``resume_checkpoint`` the run continues from it.
+        # Analysis payloads found there are read from ``resumed_analyses`` after ``done``.
+        self.checkpoint = checkpoint
+        self.resume_checkpoint = resume_checkpoint
+        self.resumed_analyses: Dict[str, Dict] = {}
+        # Folder rollups are updated here, as records are emitted, so the treemap never walks the rows
+        self.space = space
 
     def run(self):
         try:
-            out: list[dict] = []
-            # Indeterminate progress start
-            self.progress.emit(0)
-            # Fast-mode directory name exclusions - РОЗШИРЕНИЙ СПИСОК
-            exclude_names = [
-                ".git", "node_modules", ".venv", "__pycache__", "dist", "build",
-                "AppData", "Windows", "Program Files", "Program Files (x86)",
-                "$Recycle.Bin", "System Volume Information", ".Trash",
-                ".vscode", ".idea", "vendor", "packages"
-            ] if self.fast_mode else []
-
-            batch_size = 100  # Емітувати пакетами для кращої продуктивності
-            batch_count = 0
-            
-            for base in self.paths:
-                if self._cancel:
-                    break
-                for rec in iter_dir(base, compute_hash=self.compute_hash, exclude_dir_names=exclude_names):
-                    if self._cancel:
-                        break
-                    out.append(rec)
-                    batch_count += 1
-                    # Емітувати кожні 100 файлів замість кожного
-                    if batch_count >= batch_size:
-                        for r in out[-batch_size:]:
-                            self.chunk.emit(r)
-                        batch_count = 0
-            
-            # Емітувати залишок
-            remaining = batch_count
-            for r in out[-remaining:] if remaining > 0 else []:
-                self.chunk.emit(r)
-            
-            # Complete
-            self.progress.emit(100)
-            self.done.emit(out)
+            with _profiled(self.telemetry, "scan"):
+                self._scan()
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            if self.sniffer is not None:
+                self.sniffer.close()
+
+    def _save_checkpoint(self, out: List[Dict], complete: bool):
+        with maybe_timed(self.telemetry, "checkpoint"):
+            self.checkpoint.save(out, {}, {"stage": "scan", "scan_complete": complete})
+
+    def _scan(self):
+        out: list[dict] = []
+        stop = self.control
+        # Indeterminate progress start
+        self.progress.emit(0)
+        # Fast-mode directory name exclusions - РОЗШИРЕНИЙ СПИСОК
+        exclude_names = FAST_EXCLUDE_DIR_NAMES if self.fast_mode else []
 
+        batch_size = 100  # Емітувати пакетами для кращої продуктивності
+        batch_count = 0
+        # Files already in the checkpoint are not stat'ed or hashed again
+        known: set = set()
+        paths = self.paths
+        state = self.checkpoint.load() if self.resume_checkpoint and self.checkpoint is not None else None
+        if state is not None:
+            prev, self.resumed_analyses, meta = state
+            if self.telemetry is not None:
+                self.telemetry.meta["resumed"] = {"files": len(prev), "analysed": len(self.resumed_analyses)}
+            out.extend(prev)
+            if self.space is not None:
+                self.space.add_many(prev)
+            for r in prev:
+                self.chunk.emit(r)
+            known = {r["path"] for r in prev}
+            if meta.get("scan_complete"):
+                paths = []
+
+        for base in paths:
+            if stop():
+                break
+            records = None
+            if self.adaptive_io:
+                remote, latency = detect_remote(base)
+                if remote:
+                    if self.telemetry is not None:
+                        self.telemetry.meta.setdefault("remote_roots", {})[base] = round(latency * 1000, 2)
+                    # Hashing happens later, concurrently, for duplicate candidates only
+                    records = iter_dir_adaptive(base, exclude_dir_names=exclude_names, telemetry=self.telemetry,
+                                                should_stop=stop, skip_paths=known)
+            if records is None:
+                records = iter_dir(base, compute_hash=self.compute_hash, exclude_dir_names=exclude_names,
+                                   telemetry=self.telemetry, skip_paths=known, should_stop=stop)
+            for rec in records:
+                if stop():
+                    break
+                out.append(rec)
+                batch_count += 1
+                # Емітувати кожні 100 файлів замість кожного
+                if batch_count >= batch_size:
+                    if self.sniffer is not None:
+                        self.sniffer.sniff_batch(out[-batch_size:])
+                    if self.space is not None:
+                        # After sniffing: kinds may have changed
+                        self.space.add_many(out[-batch_size:])
+                    for r in out[-batch_size:]:
+                        self.chunk.emit(r)
+                    batch_count = 0
+                    if self.checkpoint is not None and self.checkpoint.due():
+                        self._save_checkpoint(out, complete=False)
+        
+        # Емітувати залишок
+        remaining = batch_count
+        if remaining and self.sniffer is not None:
+            self.sniffer.sniff_batch(out[-remaining:])
+        if remaining and self.space is not None:
+            self.space.add_many(out[-remaining:])
+        for r in out[-remaining:] if remaining > 0 else []:
+            self.chunk.emit(r)
+        if self.checkpoint is not None:
+            # A finished scan is saved too: analysis may run for hours after it
+            self._save_checkpoint(out, complete=not stop.cancelled)
+        
+        # Complete
+        self.progress.emit(100)
+        self.done.emit(out)
 
-class AnalyzeWorker(QThread):
+
+def build_payload(rec: Dict, analysis: Dict, dup_count: int, dup_probable: bool = False,
+                  dup_keeper: bool = False, dup_cluster: Optional[str] = None) -> Dict:
+    """Row payload: analysis plus the recommendation for this duplicate state."""
+    reco = recommend_for_record(rec, analysis, dup_count=dup_count, dup_probable=dup_probable, dup_keeper=dup_keeper)
+    payload = {
+        "path": rec["path"],
+        "analysis": analysis,
+        "recommendation": reco,
+        "dup_count": dup_count,
+    }
+    if dup_probable:
+        payload["dup_probable"] = True
+    if dup_count:
+        payload["dup_cluster"] = dup_cluster
+        if dup_keeper:
+            payload["dup_keeper"] = True
+    return payload
+
+
+class AnalyzeWorker(_PausableWorker):
     progress = Signal(int)
-    analyzed = Signal(dict)  # path -> {analysis, recommendation, dup_count}
+    analyzed = Signal(dict)  # path -> {analysis, recommendation, dup_count[, dup_cluster, dup_keeper]}
     analyzed_batch = Signal(list)
+    folder_groups = Signal(list)  # duplicate/similar folders, see core.dirdups
+    dup_graph = Signal(dict)  # {groups, graph, features, threshold}: regroup similar images without a re-run
     done = Signal()
     error = Signal(str)
 
-    def __init__(self, records: List[Dict], enable_ai: bool, use_perceptual: bool, fast_mode: bool = True):
+    def __init__(self, records: List[Dict], enable_ai: bool, use_perceptual: bool, fast_mode: bool = True,
+                 use_exact: bool = True,
+                 telemetry: Optional[Telemetry] = None, targets: Optional[set] = None,
+                 prev_dup: Optional[Dict[str, int]] = None, confidence: str = "full",
+                 thumbs: Optional[ThumbnailCache] = None, checkpoint: Optional[Checkpoint] = None,
+                 resume_from: Optional[Dict[str, Dict]] = None, folder_roots: Optional[List[str]] = None,
+                 use_documents: bool = False, doc_cache: Optional[SignatureCache] = None,
+                 prev_keepers: Optional[set] = None, keeper_ranking: Sequence[str] = DEFAULT_RANKING,
+                 perceptual_threshold: Optional[int] = None, analysis_cache: Optional[AnalysisCache] = None,
+                 dup_from: Optional[Dict[str, Dict]] = None, regroup_from: Optional[tuple] = None):
         super().__init__()
         self.records = records
+        # Scan roots: duplicate folders are looked for at or below them (None: skip)
+        self.folder_roots = folder_roots
+        self.confidence = confidence
+        self.thumbs = thumbs
+        # Image results by content hash, shared by copies and kept across runs
+        self.analysis_cache = analysis_cache
+        # Incremental mode: re-analyse only ``targets`` plus records whose
+        # duplicate count differs from ``prev_dup`` (path -> previous count)
+        # or that gained or lost being a cluster's kept copy (``prev_keepers``)
+        self.targets = targets
+        self.prev_dup = prev_dup or {}
+        self.prev_keepers = prev_keepers or set()
+        self.keeper_ranking = keeper_ranking
+        # None: 4 bits in fast mode, else 5
+        self.perceptual_threshold = perceptual_threshold
         self.enable_ai = enable_ai
+        # Exact (and sampled) duplicates and the duplicate folders built on their hashes
+        self.use_exact = use_exact
         self.use_perceptual = use_perceptual
+        self.use_documents = use_documents
+        self.doc_cache = doc_cache
         self.fast_mode = fast_mode
+        self.telemetry = telemetry
+        # Payloads finished before an interruption (path -> payload) are reused, not recomputed
+        self.checkpoint = checkpoint
+        self.resume_from = resume_from or {}
+        # Grouping options unchanged since these payloads (path -> payload) were made:
+        # their duplicate state is reused and no grouping runs (see core.stages)
+        self.dup_from = dup_from
+        # ``(dup_graph state, changed paths)``: files changed since that state was
+        # emitted; only their buckets are grouped again (see update_dup_map)
+        self.regroup_from = regroup_from
+        self._payloads: Dict[str, Dict] = {}
+        self._thread_id: Optional[int] = None
+        # Visible rows and the active filter go first (see prioritize)
+        self._queue: Optional[AnalysisQueue] = None
+        self._priority: Optional[tuple] = None
+
+    def prioritize(self, visible: List[str], predicate: Optional[Callable[[Dict], bool]] = None):
+        """Analyse ``visible`` paths next, then records matching ``predicate``; safe from the GUI thread."""
+        self._priority = (visible, predicate)
+        if self._queue is not None:
+            self._queue.prioritize(visible, predicate)
+
+    def run(self):
+        try:
+            with _profiled(self.telemetry, "analyze"):
+                self._analyze()
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def _save_checkpoint(self):
+        with maybe_timed(self.telemetry, "checkpoint"):
+            self.checkpoint.save(self.records, self._payloads, {"stage": "analyze", "scan_complete": True})
+
+    def _should_stop(self) -> bool:
+        if self.control():
+            return True
+        # Also called from hashing pool threads; only this thread owns the records
+        if self.checkpoint is not None and self.checkpoint.due() and threading.get_ident() == self._thread_id:
+            self._save_checkpoint()
+        return False
+
+    def _group(self, probable: set, keepers: set) -> tuple:
+        """Duplicate grouping: ``(dup_map, cluster_of)``; emits ``dup_graph`` and ``folder_groups``."""
+        stop = self._should_stop
+        clusters: List[Dict] = []
+        groups: List[tuple] = []
+        graphs: List = []
+        features: Dict = {}
+        options = dict(use_exact=self.use_exact, use_perceptual=self.use_perceptual, fast_mode=self.fast_mode,
+                       telemetry=self.telemetry, confidence=self.confidence, probable=probable, should_stop=stop,
+                       thumbs=self.thumbs, use_documents=self.use_documents, doc_cache=self.doc_cache,
+                       keepers=keepers, clusters_out=clusters, keeper_ranking=self.keeper_ranking,
+                       groups_out=groups, perceptual_threshold=self.perceptual_threshold,
+                       graph_out=graphs if self.use_perceptual else None)
+        if self.regroup_from is not None:
+            state, changed = self.regroup_from
+            features.update(state["features"])
+            dup_map = update_dup_map(self.records, changed, state["groups"], state["graph"], features=features,
+                                     **options)
+        else:
+            dup_map = build_dup_map(self.records, features=features, **options)
+        if not stop():
+            threshold = self.perceptual_threshold
+            if threshold is None:
+                threshold = 4 if self.fast_mode else 5
+            self.dup_graph.emit({"groups": [(k, g) for k, g in groups if k != "perceptual"],
+                                 "graph": graphs[0] if graphs else None, "features": features,
+                                 "threshold": threshold, "ranking": tuple(self.keeper_ranking)})
+        cluster_of = {r["path"]: c["id"] for c in clusters for r in c["members"]}
+        if self.folder_roots is not None and not stop():
+            # Needs only the hashes grouping just filled in
+            with maybe_timed(self.telemetry, "folders"):
+                folder_groups = find_duplicate_folders(self.records, self.folder_roots) if self.use_exact else []
+            self.folder_groups.emit(folder_groups)
+        return dup_map, cluster_of
+
+    def _analyze(self):
+        self._thread_id = threading.get_ident()
+        stop = self._should_stop
+        analyzer = Analyzer(enable_ai=self.enable_ai, telemetry=self.telemetry, thumbs=self.thumbs,
+                            cache=self.analysis_cache)
+
+        probable: set = set()
+        keepers: set = set()
+        if self.dup_from is not None:
+            dup_map = {p: pl["dup_count"] for p, pl in self.dup_from.items() if pl.get("dup_count")}
+            probable = {p for p, pl in self.dup_from.items() if pl.get("dup_probable")}
+            keepers = {p for p, pl in self.dup_from.items() if pl.get("dup_keeper")}
+            cluster_of = {p: pl["dup_cluster"] for p, pl in self.dup_from.items() if pl.get("dup_cluster")}
+        else:
+            dup_map, cluster_of = self._group(probable, keepers)
+
+        todo = self.records
+        if self.targets is not None:
+            prev = self.prev_dup
+            flipped = keepers ^ self.prev_keepers
+            todo = [r for r in self.records
+                    if r["path"] in self.targets or r["path"] in flipped
+                    or dup_map.get(r["path"], 0) != prev.get(r["path"], 0)]
+
+        total = len(todo)
+        batch: List[Dict] = []
+        progress_step = max(1, total // 100)  # Оновлювати прогрес максимум 100 разів
+        self._queue = AnalysisQueue(todo)
+        if self._priority is not None:
+            self._queue.prioritize(*self._priority)
+        
+        idx = -1
+        while True:
+            if stop():
+                break
+            item = self._queue.pop()
+            if item is None:
+                break
+            rec, tier = item
+            idx += 1
+            earlier = self.resume_from.get(rec["path"])
+            if earlier is not None:
+                analysis = earlier["analysis"]
+            else:
+                with maybe_timed(self.telemetry, "analyze"):
+                    analysis = analyzer.analyze_record(rec, should_stop=stop)
+                if self.control.cancelled:
+                    # Interrupted part way: not a real result
+                    break
+            path = rec["path"]
+            with maybe_timed(self.telemetry, "recommend"):
+                payload = build_payload(rec, analysis, dup_map.get(path, 0), path in probable,
+                                        path in keepers, cluster_of.get(path))
+            if self.checkpoint is not None:
+                self._payloads[rec["path"]] = payload
+            batch.append(payload)
+            # Збільшено розмір батчу до 100 для кращої продуктивності;
+            # the rows on screen are sent as soon as they are all done
+            if len(batch) >= 100 or (tier == "visible" and not self._queue.visible_pending()):
+                self.analyzed_batch.emit(batch)
+                batch = []
+            # Оновлювати прогрес рідше
+            if total and (idx % progress_step == 0):
+                self.progress.emit(int((idx + 1) * 100 / total))
+                if self.telemetry is not None:
+                    self.telemetry.gauge("analyze.pending", total - idx - 1)
+        if batch:
+            self.analyzed_batch.emit(batch)
+        if self.analysis_cache is not None:
+            self.analysis_cache.flush()
+        if self.telemetry is not None:
+            self.telemetry.meta["analysis_order"] = dict(self._queue.served)
+            if self.analysis_cache is not None:
+                self.telemetry.meta["analysis_cache"] = dict(self.analysis_cache.hits)
+        if self.checkpoint is not None:
+            if self.control.cancelled:
+                self._save_checkpoint()
+            else:
+                self.checkpoint.clear()
+        if self.telemetry is not None:
+            self.telemetry.finish()
+        self.done.emit()
+
+
+class SessionWorker(QThread):
+    """Save or load a session file off the GUI thread."""
+    loaded = Signal(object, object, object)  # records, analyses (path -> payload), meta
+    saved = Signal(str)
+    error = Signal(str)
+
+    def __init__(self, path: str, records: Optional[List[Dict]] = None,
+                 analyses: Optional[Dict[str, Dict]] = None, meta: Optional[Dict] = None):
+        super().__init__()
+        self.path = path
+        self.records = records
+        self.analyses = analyses
+        self.meta = meta
+
+    def run(self):
+        try:
+            if self.records is None:
+                records, analyses, meta = load_session(self.path)
+                self.loaded.emit(records, analyses, meta)
+            else:
+                save_session(self.path, self.records, self.analyses or {}, self.meta)
+                self.saved.emit(self.path)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class ThumbWorker(QThread):
+    """Load preview thumbnails off the GUI thread.
+
+    Only the newest request is served: while the user scrolls, intermediate
+    rows are skipped. When idle, the rows around the selection are prefetched
+    into the cache without being emitted.
+    """
+    ready = Signal(str, object)  # path, JPEG bytes or None
+
+    def __init__(self, cache: ThumbnailCache):
+        super().__init__()
+        self.cache = cache
+        self._cond = threading.Condition()
+        self._request: Optional[str] = None
+        self._prefetch: List[str] = []
+        self._cancel = False
+
+    def request(self, path: str, prefetch: Optional[List[str]] = None):
+        with self._cond:
+            self._request = path
+            self._prefetch = list(prefetch or [])
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._cancel = True
+            self._cond.notify()
+
+    def _load(self, path: str) -> Optional[bytes]:
+        # Stat here, not in the GUI: the key must match the file as it is now
+        try:
+            st = os.stat(path)
+            return self.cache.load(path, st.st_size, st.st_mtime)
+        except Exception:
+            return None
+
+    def run(self):
+        self.cache.prune_disk()
+        while True:
+            with self._cond:
+                while self._request is None and not self._prefetch and not self._cancel:
+                    self._cond.wait()
+                if self._cancel:
+                    return
+                path, self._request = self._request, None
+                if path is None:
+                    ahead = self._prefetch.pop(0)
+            if path is not None:
+                self.ready.emit(path, self._load(path))
+            else:
+                self._load(ahead)
+
+
+class WatchWorker(QThread):
+    """Watch scanned roots and emit debounced, coalesced change batches."""
+    changes = Signal(object)  # list of change dicts (see core.watcher)
+    backend = Signal(str)
+    error = Signal(str)
+
+    def __init__(self, roots: List[str], exclude_dir_names: Optional[List[str]] = None,
+                 quiet: float = 1.0, max_delay: float = 5.0):
+        super().__init__()
+        self.roots = roots
+        self.exclude_dir_names = exclude_dir_names or []
+        self.coalescer = ChangeCoalescer(quiet=quiet, max_delay=max_delay)
         self._cancel = False
 
     def cancel(self):
@@ -89,51 +525,69 @@ class AnalyzeWorker(QThread):
 
     def run(self):
         try:
-            analyzer = Analyzer(enable_ai=self.enable_ai)
-
-            # Duplicates: exact
-            exact_groups = group_by_exact_hash(self.records, algo="md5")
-            dup_map: Dict[str, int] = {}
-            for grp in exact_groups:
-                for r in grp:
-                    dup_map[r["path"]] = len(grp) - 1
-
-            # Perceptual duplicates (optional, image-only); limit for speed if fast_mode
-            if self.use_perceptual:
-                subset = self.records
-                if self.fast_mode and len(self.records) > 3000:
-                    subset = [r for i, r in enumerate(self.records) if r.get("kind") == "image" and (i % 2 == 0)][:3000]
-                p_groups = group_by_perceptual_hash(subset, threshold=4 if self.fast_mode else 5)
-                for grp in p_groups:
-                    for r in grp:
-                        dup_map[r["path"]] = max(dup_map.get(r["path"], 0), len(grp) - 1)
-
-            total = len(self.records)
-            batch: List[Dict] = []
-            progress_step = max(1, total // 100)  # Оновлювати прогрес максимум 100 разів
-            
-            for idx, rec in enumerate(self.records):
-                if self._cancel:
-                    break
-                analysis = analyzer.analyze_record(rec)
-                dup_count = dup_map.get(rec["path"], 0)
-                reco = recommend_for_record(rec, analysis, dup_count=dup_count)
-                payload = {
-                    "path": rec["path"],
-                    "analysis": analysis,
-                    "recommendation": reco,
-                    "dup_count": dup_count,
-                }
-                batch.append(payload)
-                # Збільшено розмір батчу до 100 для кращої продуктивності
-                if len(batch) >= 100:
-                    self.analyzed_batch.emit(batch)
-                    batch = []
-                # Оновлювати прогрес рідше
-                if total and (idx % progress_step == 0):
-                    self.progress.emit(int((idx + 1) * 100 / total))
-            if batch:
-                self.analyzed_batch.emit(batch)
-            self.done.emit()
+            watcher = create_watcher(self.roots, self.coalescer.add, self.exclude_dir_names)
+            watcher.start()
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.backend.emit(watcher.backend)
+        try:
+            while not self._cancel:
+                self.msleep(200)
+                if self.coalescer.ready():
+                    self.changes.emit(self.coalescer.drain())
+        finally:
+            watcher.stop()
+
+
+class ActionWorker(QThread):
+    """Run delete/move/compress/link on selected files off the GUI thread."""
+    progress = Signal(int, int)   # processed, total
+    applied = Signal(object)      # paths that no longer exist at their old location
+    done = Signal(dict)           # {"action", "ok", "errors": [(path, msg)], "cancelled", "target", "stats"}
+    error = Signal(str)
+
+    def __init__(self, action: str, paths: List[str], target: Optional[str] = None,
+                 options: Optional[Dict] = None):
+        super().__init__()
+        self.action = action
+        self.paths = paths
+        self.target = target
+        self.options = options or {}
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def run(self):
+        stop = lambda: self._cancel
+        stats: Dict = {}
+        try:
+            if self.action == "delete":
+                steps = trash_files(self.paths, should_stop=stop)
+            elif self.action == "move":
+                steps = move_files(self.paths, self.target, should_stop=stop, stats=stats)
+            elif self.action == "compress":
+                steps = compress_files(self.paths, self.target, should_stop=stop, stats=stats,
+                                       **self.options)
+            elif self.action == "link":
+                steps = link_duplicates(self.options["groups"], self.options.get("mode", "auto"),
+                                        should_stop=stop, stats=stats)
+            else:
+                raise ValueError(f"Unknown action: {self.action}")
+            ok = 0
+            errors: List = []
+            processed = 0
+            total = len(self.paths)
+            for done_paths, errs in steps:
+                ok += len(done_paths)
+                errors.extend(errs)
+                processed += len(done_paths) + len(errs)
+                # Compressed and linked files stay where they are
+                if done_paths and self.action in ("delete", "move"):
+                    self.applied.emit(done_paths)
+                self.progress.emit(processed, total)
+            self.done.emit({"action": self.action, "ok": ok, "errors": errors,
+                            "cancelled": self._cancel, "target": self.target, "stats": stats})
         except Exception as e:
             self.error.emit(str(e))